@@ -0,0 +1,267 @@
+# weather_predictor/app/collector.py
+"""
+Collecteur de fond : récupère périodiquement les prévisions et les conditions actuelles d'une
+liste de villes et les enregistre dans la base d'observations, sans interface.
+
+    python -m app.collector run                      # en continu (toutes les 3 h par défaut)
+    python -m app.collector run --once --cities Lyon,Paris
+    python -m app.collector status
+
+À chaque cycle, pour chaque ville :
+- les prévisions J+1..J+max_horizon deviennent des observations (temp_predite_modele = prévision
+  de l'API, temp_observee_api vide) ;
+- les conditions actuelles alimentent la table `actuals` (extrêmes du jour local) ;
+- une fois le jour terminé et relevé assez souvent (--min-samples), temp_observee_api reçoit la
+  température réellement relevée.
+
+Avec --predict, les jours collectés sont aussi prédits par le modèle courant (global ou de la
+ville) ; ces prédictions sont comparées aux relevés réels à la fin de chaque cycle (erreurs par
+ville et horizon, voir training/evaluate.py).
+
+Les villes sont traitées par tranches ; chaque tranche est écrite en une transaction avec la
+position atteinte dans le cycle (table meta). Après un arrêt brutal, le cycle reprend à la
+tranche suivante, sans doublons.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import date, datetime
+
+from app import telemetry
+from app.features import MAX_HORIZON
+from app.observation_store import BASE_DIR, MIN_ACTUAL_SAMPLES, open_default_store
+from app.weather_api import RateLimiter, fetch_current_batch, fetch_weather_batch
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_FILE = os.path.join(BASE_DIR, 'data', 'watchlist.txt')
+
+# Clés de la table meta
+META_WATCHLIST = 'collector:watchlist'
+META_CURSOR = 'collector:cursor'
+META_CYCLE_STARTED = 'collector:cycle_started'
+META_CYCLE_COMPLETED = 'collector:cycle_completed'
+
+
+def load_watchlist(path=WATCHLIST_FILE):
+    """Villes du fichier (une par ligne, lignes vides et commentaires # ignorés), sans doublons."""
+    with open(path, encoding='utf-8') as f:
+        cities = [line.split('#', 1)[0].strip() for line in f]
+    return list(dict.fromkeys(city for city in cities if city))
+
+
+def _watchlist_signature(cities):
+    return hashlib.sha1('\n'.join(cities).encode('utf-8')).hexdigest()
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class Collector:
+    """
+    Collecte par cycles pour `cities`.
+
+    - interval : durée (s) entre le début de deux cycles ; jitter : fraction de `interval`
+      ajoutée au hasard à chaque attente, pour ne pas synchroniser plusieurs collecteurs.
+    - max_workers / rate_limit : requêtes simultanées et requêtes/s maximum (RateLimiter partagé
+      par tous les appels d'un cycle).
+    - chunk_size : villes par tranche (une transaction et un point de reprise par tranche).
+    - max_horizon : dernier jour de prévision enregistré (J+1..J+max_horizon).
+    - engine : ForecastEngine (app/forecast.py) dont le modèle prédit les jours collectés, pour
+      l'évaluation continue (None = aucune prédiction enregistrée).
+    - min_samples : relevés d'un jour nécessaires pour résoudre ses observations et prédictions
+      (None = MIN_ACTUAL_SAMPLES, ramené aux cycles possibles en une journée si `interval` est long).
+    """
+    def __init__(self, store, cities, interval=3 * 3600, jitter=0.1, max_workers=8, rate_limit=None,
+                 chunk_size=50, max_horizon=MAX_HORIZON, client=None, engine=None, min_samples=None):
+        self.store = store
+        self.cities = list(dict.fromkeys(cities))
+        self.interval = interval
+        self.jitter = jitter
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_limit, burst=max_workers) if rate_limit else None
+        self.chunk_size = chunk_size
+        self.max_horizon = max_horizon
+        self.client = client
+        self.engine = engine
+        if min_samples is None:
+            min_samples = max(1, min(MIN_ACTUAL_SAMPLES, int(86400 // interval)))
+        self.min_samples = min_samples
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _resume_position(self):
+        """Position de départ : reprise d'un cycle interrompu sur la même liste, sinon 0."""
+        signature = _watchlist_signature(self.cities)
+        started = self.store.get_meta(META_CYCLE_STARTED)
+        completed = self.store.get_meta(META_CYCLE_COMPLETED)
+        interrupted = started is not None and (completed is None or completed < started)
+        if interrupted and self.store.get_meta(META_WATCHLIST) == signature:
+            return int(self.store.get_meta(META_CURSOR, 0))
+        self.store.write_batch(meta={META_WATCHLIST: signature, META_CURSOR: 0, META_CYCLE_STARTED: _now()})
+        return 0
+
+    def _observation_rows(self, city, data):
+        recorded_at = _now()
+        return [
+            [recorded_at, city, jour['date'], jour['temp_max'], None,
+             jour['humidity'], jour['pressure'], jour['wind_speed']]
+            for jour in data.get('jours', [])
+            if 1 <= jour['horizon'] <= self.max_horizon and jour['temp_max'] is not None
+        ]
+
+    def _prediction_rows(self, city, data):
+        jours = [jour for jour in data.get('jours', [])
+                 if 1 <= jour['horizon'] <= self.max_horizon and jour['temp_max'] is not None]
+        predictor, source = self.engine.predictor_for(city)
+        if predictor is None or not jours:
+            return []
+        try:
+            temps = predictor.predict_rows([
+                (jour['temp_max'], date.fromisoformat(jour['date']), jour['humidity'], jour['pressure'],
+                 jour['wind_speed'], jour['horizon'])
+                for jour in jours
+            ])
+        except Exception as e:
+            logger.error("Erreur lors de la prédiction pour %s : %s", city, e, extra={"city": city})
+            return []
+        model = self.engine.model_name(predictor, source)
+        return [(None, city, jour['date'], jour['horizon'], model, temp, jour['temp_max'])
+                for jour, temp in zip(jours, temps)]
+
+    def run_cycle(self):
+        """Un cycle complet (ou la fin d'un cycle interrompu). Retourne ses statistiques."""
+        start = time.perf_counter()
+        position = self._resume_position()
+        if position:
+            logger.info("Reprise du cycle interrompu à la ville %d/%d.", position, len(self.cities))
+        stats = {'cities': len(self.cities) - position, 'observations': 0, 'actuals': 0, 'errors': 0}
+
+        while position < len(self.cities) and not self._stop.is_set():
+            chunk = self.cities[position:position + self.chunk_size]
+            with telemetry.span("collector_fetch"):
+                forecasts = fetch_weather_batch(chunk, self.max_workers, rate_limiter=self.rate_limiter,
+                                                use_cache=False, client=self.client)
+                currents = fetch_current_batch(chunk, self.max_workers, rate_limiter=self.rate_limiter,
+                                               client=self.client)
+            rows, actuals, predictions = [], [], []
+            for city in chunk:
+                forecast, current = forecasts[city], currents[city]
+                if forecast['data']:
+                    rows.extend(self._observation_rows(city, forecast['data']))
+                    if self.engine is not None:
+                        predictions.extend(self._prediction_rows(city, forecast['data']))
+                if current['data']:
+                    day = current['data']
+                    actuals.append((city, day['date'], day['temp_max'], day['temp_min']))
+                if forecast['error'] or current['error']:
+                    stats['errors'] += 1
+                    telemetry.incr("collector_errors")
+                    logger.warning("%s : %s", city, forecast['error'] or current['error'], extra={"city": city})
+
+            position += len(chunk)
+            self.store.write_batch(rows, actuals, meta={META_CURSOR: position}, predictions=predictions)
+            stats['observations'] += len(rows)
+            stats['actuals'] += len(actuals)
+
+        if position >= len(self.cities):
+            stats['resolved'] = self.store.resolve_observations(self.min_samples)
+            stats['evaluated'] = self.store.evaluate_predictions(min_samples=self.min_samples)['evaluated']
+            self.store.set_meta(META_CYCLE_COMPLETED, _now())
+        stats['seconds'] = round(time.perf_counter() - start, 2)
+        logger.info("Cycle : %s", stats, extra=stats)
+        return stats
+
+    def _next_delay(self):
+        """Attente avant le prochain cycle : reste de l'intervalle depuis le dernier début, plus le jitter."""
+        delay = 0.0
+        completed = self.store.get_meta(META_CYCLE_COMPLETED)
+        started = self.store.get_meta(META_CYCLE_STARTED)
+        if completed is not None and started is not None and completed >= started:
+            elapsed = (datetime.now() - datetime.strptime(started, '%Y-%m-%d %H:%M:%S')).total_seconds()
+            delay = max(0.0, self.interval - elapsed)
+        return delay + random.uniform(0, self.jitter * self.interval)
+
+    def run_forever(self):
+        """Enchaîne les cycles jusqu'à `stop()` ; un redémarrage respecte l'intervalle en cours."""
+        while not self._stop.is_set():
+            delay = self._next_delay()
+            if delay:
+                logger.info("Prochain cycle dans %.1f min.", delay / 60)
+            if self._stop.wait(delay):
+                break
+            try:
+                self.run_cycle()
+            except Exception as e:
+                # La tranche en cours n'a pas été validée : elle sera reprise au prochain cycle
+                logger.exception("Erreur du collecteur : %s", e)
+                self._stop.wait(min(self.interval, 60))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collecte périodique des observations pour une liste de villes.")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--watchlist", default=WATCHLIST_FILE, help="Fichier des villes (une par ligne)")
+    parser.add_argument("--cities", default=None, help="Villes séparées par des virgules (remplace --watchlist)")
+    parser.add_argument("--once", action="store_true", help="Un seul cycle, puis quitter")
+    parser.add_argument("--interval", type=float, default=3 * 3600, help="Secondes entre deux cycles")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Fraction aléatoire ajoutée à l'attente")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requêtes/s maximum")
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--max-horizon", type=int, default=MAX_HORIZON, help="Jours de prévision enregistrés (J+1..J+N)")
+    parser.add_argument("--predict", action="store_true",
+                        help="Prédire aussi les jours collectés avec le modèle courant (évaluation continue)")
+    parser.add_argument("--min-samples", type=int, default=None,
+                        help=f"Relevés d'un jour nécessaires avant de le résoudre (défaut : {MIN_ACTUAL_SAMPLES}, "
+                             "moins si l'intervalle ne le permet pas)")
+    args = parser.parse_args()
+    telemetry.configure_from_env()
+
+    store = open_default_store()
+    if args.command == "status":
+        for key in (META_CYCLE_STARTED, META_CYCLE_COMPLETED, META_CURSOR):
+            print(f"{key:<28} {store.get_meta(key)}")
+        print(f"{store.count()} observations, {len(store.read_actuals())} relevés réels")
+        store.close()
+        return
+
+    cities = [c.strip() for c in args.cities.split(',') if c.strip()] if args.cities else load_watchlist(args.watchlist)
+    engine = None
+    if args.predict:
+        from app.forecast import ForecastEngine
+        from app.inference import FastPredictor
+        from app.model_artifacts import MODELS_DIR
+        from app.model_registry import ModelRegistry
+        from app.model_shards import ModelRouter
+
+        registry = ModelRegistry(MODELS_DIR, prepare=FastPredictor)
+        registry.refresh()
+        registry.start()  # Un modèle réentraîné est pris en compte au cycle suivant
+        engine = ForecastEngine(registry, router=ModelRouter(registry, os.path.join(MODELS_DIR, 'shards'),
+                                                             prepare=FastPredictor))
+    collector = Collector(store, cities, args.interval, args.jitter, args.workers, args.rate_limit,
+                          args.chunk_size, args.max_horizon, engine=engine, min_samples=args.min_samples)
+    signal.signal(signal.SIGTERM, lambda *_: collector.stop())
+    logger.info("Collecteur : %d villes, un cycle toutes les %.1f h.", len(cities), args.interval / 3600)
+    try:
+        if args.once:
+            collector.run_cycle()
+        else:
+            collector.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Arrêt du collecteur.")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
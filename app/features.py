@@ -0,0 +1,146 @@
+# weather_predictor/app/features.py
+"""
+Construction des features du modèle, partagée par l'entraînement (lots, DataFrame) et
+l'inférence (quelques lignes, tampon NumPy) : mêmes colonnes, même ordre, mêmes calculs.
+
+Les features calendaires viennent d'une table précalculée (une ligne par jour de
+CALENDAR_START à CALENDAR_END) : une date devient un indice, sans timetuple() ni accesseur
+pandas .dt. Les dates hors de la table sont calculées à la volée, à l'identique.
+
+L'horizon (jours entre l'enregistrement de la prévision et le jour prévu, 1 à MAX_HORIZON)
+est une feature : un seul modèle prédit tous les jours renvoyés par l'API (J+1..J+5), en un
+seul appel, en tenant compte de l'incertitude qui croît avec l'échéance.
+
+FEATURE_SCHEMA_VERSION change dès que les colonnes ou leur calcul changent ; il est enregistré
+avec le modèle (attribut feature_schema_ et manifeste) et vérifié au chargement.
+"""
+from datetime import date
+
+import numpy as np
+
+FEATURE_SCHEMA_VERSION = 2
+
+# Colonnes issues de l'API (dans l'ordre attendu par le modèle), colonnes calendaires, horizon
+API_COLUMNS = ['temp_predite_modele', 'humidity_api', 'pressure_api', 'wind_speed_api']
+CALENDAR_COLUMNS = ['day_of_year', 'month', 'day_of_week']
+HORIZON_COLUMN = 'horizon'
+FEATURE_COLUMNS = API_COLUMNS + CALENDAR_COLUMNS + [HORIZON_COLUMN]
+# Schéma 1 (sans horizon) : préfixe de FEATURE_COLUMNS, ces modèles restent utilisables
+LEGACY_FEATURE_COLUMNS = API_COLUMNS + CALENDAR_COLUMNS
+SCHEMA_COLUMNS = {FEATURE_SCHEMA_VERSION: FEATURE_COLUMNS, 1: LEGACY_FEATURE_COLUMNS}
+
+MAX_HORIZON = 5  # L'API /forecast couvre 5 jours
+
+CALENDAR_START = date(2000, 1, 1)
+CALENDAR_END = date(2100, 1, 1)
+_START_ORDINAL = CALENDAR_START.toordinal()
+_START_DAY = np.datetime64(CALENDAR_START, 'D')
+
+
+def _compute_calendar(days):
+    """(jour de l'année 1-366, mois 1-12, jour de la semaine 0=lundi) pour un tableau datetime64[D]."""
+    days = np.asarray(days, dtype='datetime64[D]')
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64) + 1
+    month = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    day_of_week = (days.astype(np.int64) + 3) % 7  # Le 1970-01-01 était un jeudi
+    return np.column_stack([day_of_year, month, day_of_week]).astype(np.float32)
+
+
+# Table calendaire : ligne i = CALENDAR_START + i jours
+CALENDAR_TABLE = _compute_calendar(np.arange(_START_DAY, np.datetime64(CALENDAR_END, 'D')))
+CALENDAR_TABLE.setflags(write=False)
+
+
+def calendar_features(dates):
+    """Features calendaires (n, 3) float32 d'un lot de dates (datetime64, Series, liste de date...)."""
+    days = np.asarray(dates, dtype='datetime64[D]')
+    index = (days - _START_DAY).astype(np.int64)
+    in_table = (index >= 0) & (index < len(CALENDAR_TABLE))
+    if in_table.all():
+        return CALENDAR_TABLE[index]
+    result = np.empty((len(days), len(CALENDAR_COLUMNS)), dtype=np.float32)
+    result[in_table] = CALENDAR_TABLE[index[in_table]]
+    result[~in_table] = _compute_calendar(days[~in_table])
+    return result
+
+
+def calendar_row(day):
+    """Features calendaires d'une seule date (date ou datetime) : une lecture dans la table."""
+    index = day.toordinal() - _START_ORDINAL
+    if 0 <= index < len(CALENDAR_TABLE):
+        return CALENDAR_TABLE[index]
+    return _compute_calendar([np.datetime64(day, 'D')])[0]
+
+
+def add_calendar_features(df, date_column='date_prevision'):
+    """Copie de `df` avec les colonnes CALENDAR_COLUMNS calculées depuis `date_column` (sans valeurs manquantes)."""
+    calendar = calendar_features(df[date_column].to_numpy(dtype='datetime64[D]'))
+    return df.assign(**{column: calendar[:, i] for i, column in enumerate(CALENDAR_COLUMNS)})
+
+
+def forecast_horizons(recorded, forecast_dates):
+    """
+    Horizons (float32) d'un lot : jours entre la date d'enregistrement et la date prévue,
+    bornés à 1..MAX_HORIZON. Une date d'enregistrement inconnue (NaT) donne l'horizon 1.
+    """
+    recorded = np.asarray(recorded, dtype='datetime64[D]')
+    forecast_dates = np.asarray(forecast_dates, dtype='datetime64[D]')
+    known = ~np.isnat(recorded)
+    days = np.ones(len(recorded), dtype=np.int64)
+    days[known] = (forecast_dates[known] - recorded[known]).astype(np.int64)
+    return np.clip(days, 1, MAX_HORIZON).astype(np.float32)
+
+
+def add_horizon_feature(df, recorded_column='date_enregistrement', date_column='date_prevision'):
+    """Copie de `df` avec la colonne HORIZON_COLUMN (colonnes de dates au type datetime)."""
+    if recorded_column not in df:
+        return df.assign(**{HORIZON_COLUMN: np.float32(1)})
+    return df.assign(**{HORIZON_COLUMN: forecast_horizons(
+        df[recorded_column].to_numpy(dtype='datetime64[D]'), df[date_column].to_numpy(dtype='datetime64[D]'))})
+
+
+def build_features(df, date_column='date_prevision'):
+    """Matrice de features (DataFrame, colonnes FEATURE_COLUMNS) d'un lot d'observations."""
+    return add_horizon_feature(add_calendar_features(df, date_column), date_column=date_column)[FEATURE_COLUMNS]
+
+
+def fill_row(out, temp, date_prevision, humidity, pressure, wind_speed, horizon=1):
+    """Écrit les features d'une ligne dans `out` (vue float32 de longueur len(FEATURE_COLUMNS))."""
+    out[0] = temp
+    out[1] = humidity
+    out[2] = pressure
+    out[3] = wind_speed
+    out[4:7] = calendar_row(date_prevision)
+    out[7] = horizon
+
+
+def attach_schema(model):
+    """Enregistre le schéma de features sur le modèle avant sa sauvegarde."""
+    model.feature_schema_ = {'version': FEATURE_SCHEMA_VERSION, 'columns': list(FEATURE_COLUMNS)}
+    return model
+
+
+def check_schema(model):
+    """
+    Vérifie que le modèle a été entraîné avec un schéma de features connu ; lève ValueError
+    sinon. Retourne les colonnes qu'il attend : FEATURE_COLUMNS, ou LEGACY_FEATURE_COLUMNS pour
+    un modèle du schéma 1 (il prédit alors sans l'horizon). Un modèle antérieur au schéma
+    versionné est accepté si ses colonnes correspondent à l'un des deux.
+    """
+    schema = getattr(model, 'feature_schema_', None)
+    n_features = getattr(model, 'n_features_in_', None)
+    if schema is not None:
+        columns = SCHEMA_COLUMNS.get(schema.get('version'))
+        if columns is None:
+            raise ValueError(f"Schéma de features {schema.get('version')} du modèle incompatible "
+                             f"(attendu : {FEATURE_SCHEMA_VERSION})")
+        names = schema['columns']
+    else:
+        names = getattr(model, 'feature_names_in_', None)
+        legacy = list(names) == LEGACY_FEATURE_COLUMNS if names is not None else n_features == len(LEGACY_FEATURE_COLUMNS)
+        columns = LEGACY_FEATURE_COLUMNS if legacy else FEATURE_COLUMNS
+    if names is not None and list(names) != columns:
+        raise ValueError(f"Features du modèle inattendues : {list(names)} (attendu : {FEATURE_COLUMNS})")
+    if n_features is not None and n_features != len(columns):
+        raise ValueError(f"Le modèle attend {n_features} features, pas {len(columns)}")
+    return list(columns)
@@ -0,0 +1,207 @@
+# weather_predictor/app/flat_forest.py
+"""
+Forêt aplatie : export d'un RandomForestRegressor (ou ExtraTreesRegressor) entraîné en quelques
+tableaux NumPy, et évaluateur autonome qui n'importe ni sklearn ni joblib.
+
+Les nœuds de tous les arbres sont concaténés (feature, seuil, enfants gauche et droit côte à
+côte, feuille ou non, valeur), les enfants renvoyant à des indices globaux ; `roots` donne le
+premier nœud de chaque arbre. Le parcours fait avancer d'un niveau toutes les paires (arbre,
+ligne) encore en chemin à chaque itération (quelques indexations NumPy), sans boucle Python par
+arbre ; les paires arrivées à une feuille en sortent, ce qui réduit les itérations suivantes.
+
+Sur disque, un dossier à côté du modèle (weather_model_<date>_forest/) : un .npy par tableau,
+chargé en mémoire partagée (mmap), et meta.json (nombre d'arbres, profondeur, schéma de features).
+
+Résultat identique à model.predict : même comparaison (feature en float32 <= seuil en float64)
+et sorties des arbres accumulées dans l'ordre des arbres, comme sklearn.
+
+    python -m app.flat_forest export data/models/weather_model_<date>.pkl
+    python -m app.flat_forest check data/models/weather_model_<date>.pkl
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+FOREST_SUFFIX = '_forest'
+FLAT_FOREST_VERSION = 1
+META_NAME = 'meta.json'
+ARRAYS = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'children': np.int32,  # 2 par nœud : gauche en 2*i, droit en 2*i + 1
+    'leaf': np.bool_,
+    'value': np.float64,
+    'roots': np.int64,
+}
+
+
+def forest_path(model_path):
+    """Dossier de la forêt aplatie d'un modèle : data/models/weather_model_<date>_forest."""
+    return os.path.splitext(model_path)[0] + FOREST_SUFFIX
+
+
+def is_exportable(model):
+    """Forêt de régression à une sortie (arbres sklearn avec un attribut tree_)."""
+    estimators = getattr(model, 'estimators_', None)
+    return (bool(estimators) and hasattr(estimators[0], 'tree_')
+            and getattr(model, 'n_outputs_', 1) == 1)
+
+
+def flatten(model):
+    """(tableaux de ARRAYS, métadonnées) d'une forêt entraînée."""
+    trees = [est.tree_ for est in model.estimators_]
+    counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    if 2 * int(counts.sum()) > np.iinfo(np.int32).max:
+        raise ValueError("Forêt trop grande pour des indices 32 bits")
+    arrays = {name: [] for name in ARRAYS if name != 'roots'}
+    for tree, offset in zip(trees, roots):
+        own = np.arange(tree.node_count, dtype=np.int64) + offset
+        leaf = tree.children_left < 0
+        children = np.empty((tree.node_count, 2), dtype=np.int64)
+        # Les enfants d'une feuille ne sont jamais lus : elle pointe sur elle-même
+        children[:, 0] = np.where(leaf, own, tree.children_left + offset)
+        children[:, 1] = np.where(leaf, own, tree.children_right + offset)
+        arrays['feature'].append(np.where(leaf, 0, tree.feature))
+        arrays['threshold'].append(tree.threshold)
+        arrays['children'].append(children.ravel())
+        arrays['leaf'].append(leaf)
+        arrays['value'].append(tree.value[:, 0, 0])
+    arrays = {name: np.ascontiguousarray(np.concatenate(parts), dtype=ARRAYS[name]) for name, parts in arrays.items()}
+    arrays['roots'] = roots
+
+    names = getattr(model, 'feature_names_in_', None)
+    meta = {
+        'version': FLAT_FOREST_VERSION,
+        'estimator': type(model).__name__,
+        'n_trees': len(trees),
+        'n_nodes': int(counts.sum()),
+        'n_features': int(model.n_features_in_),
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+        'feature_schema': getattr(model, 'feature_schema_', None),
+        'feature_names': list(names) if names is not None else None,
+    }
+    return arrays, meta
+
+
+def export_forest(model, path):
+    """
+    Écrit la forêt aplatie de `model` dans le dossier `path` (remplacé s'il existe) : écriture
+    dans un dossier temporaire puis renommage, un lecteur ne voit jamais d'export partiel.
+    Retourne les métadonnées.
+    """
+    arrays, meta = flatten(model)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+    with open(os.path.join(tmp_path, META_NAME), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return meta
+
+
+class FlatForest:
+    """
+    Évaluateur d'une forêt aplatie. Expose n_features_in_ et feature_schema_ comme le modèle
+    d'origine : FastPredictor (app/inference.py) l'accepte à sa place.
+    """
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        for name in ARRAYS:
+            # Vue ndarray simple : pas le surcoût de la sous-classe np.memmap à chaque indexation
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+        self.n_trees = meta['n_trees']
+        self.max_depth = meta['max_depth']
+        self.n_features_in_ = meta['n_features']
+        if meta.get('feature_schema') is not None:
+            self.feature_schema_ = meta['feature_schema']
+        if meta.get('feature_names') is not None:
+            self.feature_names_in_ = np.array(meta['feature_names'], dtype=object)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Charge le dossier `path` ; avec mmap_mode, les tableaux restent sur disque (pages partagées)."""
+        with open(os.path.join(path, META_NAME), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != FLAT_FOREST_VERSION:
+            raise ValueError(f"Version de forêt aplatie {meta.get('version')} inconnue")
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    def tree_outputs(self, X):
+        """Sortie de chaque arbre pour chaque ligne : tableau (n_arbres, n) en float64."""
+        X = np.asarray(X)
+        if X.shape[1] != self.n_features_in_:
+            X = X[:, :self.n_features_in_]
+        n = len(X)
+        X = np.ascontiguousarray(X, dtype=np.float32).ravel()
+        # Paires (arbre, ligne) en chemin : nœud courant, début de la ligne dans X, place du résultat
+        node = np.repeat(self.roots, n)
+        row = np.tile(np.arange(n, dtype=np.int64) * self.n_features_in_, self.n_trees)
+        slot = np.arange(self.n_trees * n, dtype=np.int64)
+        out = np.empty(self.n_trees * n, dtype=np.float64)
+        feature, threshold, children, leaf = self.feature, self.threshold, self.children, self.leaf
+        for _ in range(self.max_depth):
+            # Même test que sklearn : X (float32) <= seuil (float64), sinon à droite
+            right = ~(X[row + feature[node]] <= threshold[node])
+            node = children[2 * node + right]
+            done = leaf[node]
+            if done.any():
+                out[slot[done]] = self.value[node[done]]
+                active = ~done
+                node, row, slot = node[active], row[active], slot[active]
+                if not len(node):
+                    break
+        if len(node):  # Arbre réduit à sa racine (max_depth 0)
+            out[slot] = self.value[node]
+        return out.reshape(self.n_trees, n)
+
+    def predict(self, X):
+        """Moyenne des arbres, accumulée dans l'ordre des arbres (identique à model.predict)."""
+        outputs = self.tree_outputs(X)
+        out = np.zeros(outputs.shape[1], dtype=np.float64)
+        for row in outputs:
+            out += row
+        out /= self.n_trees
+        return out
+
+
+def check_forest(model, flat, n_rows=10_000, seed=0):
+    """Nombre de prédictions différentes entre `model` et `flat` sur des lignes aléatoires réalistes."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(-15, 40, n_rows), rng.uniform(10, 100, n_rows), rng.uniform(970, 1045, n_rows),
+        rng.uniform(0, 20, n_rows), rng.integers(1, 367, n_rows), rng.integers(1, 13, n_rows),
+        rng.integers(0, 7, n_rows), rng.integers(1, 6, n_rows),
+    ])[:, :flat.n_features_in_].astype(np.float32)
+    return int(np.count_nonzero(model.predict(X) != flat.predict(X)))
+
+
+if __name__ == "__main__":
+    import joblib
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Export et vérification des forêts aplaties.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("model", help="Chemin du .pkl")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    model = joblib.load(args.model)
+    if hasattr(model, 'feature_names_in_'):
+        del model.feature_names_in_  # Comparaison sur tableaux NumPy, sans avertissement sklearn
+    model.n_jobs = 1
+    path = forest_path(args.model)
+    if args.command == "export":
+        if not is_exportable(model):
+            parser.error(f"{type(model).__name__} n'est pas une forêt exportable")
+        meta = export_forest(model, path)
+        print(f"{path} : {meta['n_trees']} arbres, {meta['n_nodes']} nœuds, profondeur {meta['max_depth']}")
+    mismatches = check_forest(model, FlatForest.load(path))
+    print(f"Vérification : {mismatches} prédictions différentes sur 10000")
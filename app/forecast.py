@@ -0,0 +1,150 @@
+# weather_predictor/app/forecast.py
+import logging
+import os
+from datetime import date, datetime
+
+from app import telemetry
+from app.features import MAX_HORIZON
+from app.weather_api import fetch_weather_data
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastEngine:
+    """
+    Logique d'une recherche météo, sans interface : appel API, prédiction du modèle courant
+    et sauvegarde des observations. Partagée par l'application PyQt et le service HTTP.
+
+    - registry : ModelRegistry dont le `predictor` (FastPredictor) est utilisé.
+    - store : ObservationStore où écrire les observations et les prédictions du modèle, évaluées
+      plus tard contre les relevés réels (None = pas de sauvegarde).
+    - router : ModelRouter (app/model_shards.py) ; s'il est fourni, une ville ayant son propre
+      modèle est prédite par celui-ci, les autres par le modèle global du registre.
+    - intervals : calculer aussi les intervalles p10/p50/p90 de chaque prédiction (quantiles
+      des arbres de la forêt, FastPredictor.predict_quantiles).
+    """
+    def __init__(self, registry, store=None, router=None, intervals=True):
+        self.registry = registry
+        self.store = store
+        self.router = router
+        self.intervals = intervals
+
+    def predictor_for(self, city_name=None):
+        """(predictor, source) pour une ville : source "ville" ou "global" (predictor None sans modèle)."""
+        if self.router is not None and city_name:
+            return self.router.predictor_for(city_name)
+        return (self.registry.predictor if self.registry is not None else None), "global"
+
+    def predict_days(self, days, city_name=None, intervals=False):
+        """
+        Prédit plusieurs jours en un seul appel au modèle (celui de `city_name` s'il existe).
+        `days` : liste de (temp_api, date_prevision, humidité, pression, vent[, horizon]) ;
+        retourne une liste de températures (None si pas de modèle ou données manquantes), ou
+        avec intervals=True une liste de dicts {"temp", "p10", "p50", "p90"}.
+        """
+        predictor, _ = self.predictor_for(city_name)  # Lecture unique : un rechargement concurrent n'affecte pas cette prédiction
+        return self._predict_with(predictor, days, intervals)
+
+    def model_name(self, predictor, source):
+        """Nom enregistré avec une prédiction : fichier du modèle global, ou `source` ("ville")."""
+        loaded = self.registry.current() if self.registry is not None and source == "global" else None
+        if loaded is not None and loaded.predictor is predictor:
+            return os.path.basename(loaded.path)
+        return source  # Modèle par ville, ou modèle global rechargé entre-temps
+
+    @staticmethod
+    def _predict_with(predictor, days, intervals=False):
+        if predictor is None:
+            return [None] * len(days)
+        try:
+            with telemetry.span("model_predict", rows=len(days)):
+                if intervals:
+                    return predictor.predict_rows_quantiles(days)
+                return predictor.predict_rows(days)
+        except Exception as e:
+            logger.error("Erreur lors de la prédiction avec le modèle : %s", e)
+            return [None] * len(days)
+
+    def save_observation(self, city, date_prediction, predicted_temp_model, observed_temp_api, humidity_api, pressure_api, wind_speed_api):
+        """Ajoute une observation au tampon de la base d'observations (écrite au prochain flush)."""
+        self.store.append([
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'), city, date_prediction,
+            predicted_temp_model, observed_temp_api,
+            humidity_api, pressure_api, wind_speed_api
+        ])
+        logger.info("Observation sauvegardée pour %s le %s.", city, date_prediction.strftime('%Y-%m-%d'))
+
+    def compute(self, city_name, is_cancelled=lambda: False, save=True):
+        """
+        Recherche complète pour une ville (bloquante). Retourne None si l'API ne renvoie rien,
+        sinon un dict avec les données API, les prédictions du modèle par jour et par horizon
+        et les erreurs de sauvegarde éventuelles. `is_cancelled` est consulté entre deux étapes.
+
+        Chaque jour J+1..J+MAX_HORIZON est enregistré comme le fait le collecteur : prévision de
+        l'API en temp_predite_modele (la feature du modèle), temp_observee_api vide jusqu'au
+        relevé réel. La prédiction du modèle n'est jamais enregistrée comme observation : elle va
+        dans la table des prédictions (avec l'horizon et le modèle) pour l'évaluation continue.
+        """
+        with telemetry.span("forecast") as span:
+            result = self._compute(city_name, is_cancelled, save)
+            span.set(result="ok" if result is not None else "empty")
+            return result
+
+    def _compute(self, city_name, is_cancelled, save):
+        api_data = fetch_weather_data(city_name)
+        if not api_data or api_data["temp_max_demain"] is None:
+            return None
+        if is_cancelled():
+            return None
+
+        # Tous les jours renvoyés par l'API (J+1..J+5), horizon compris, en un seul appel au modèle
+        jours = api_data.get("jours", [])
+        dates = [date.fromisoformat(jour["date"]) for jour in jours]
+        predictor, source_modele = self.predictor_for(city_name)
+        telemetry.incr("model_route", source=source_modele if predictor is not None else "none")
+        results = self._predict_with(predictor, [
+            (jour["temp_max"], day, jour["humidity"], jour["pressure"], jour["wind_speed"], jour["horizon"])
+            for jour, day in zip(jours, dates)
+        ], self.intervals)
+        if self.intervals:
+            predictions, intervals = [], []
+            for r in results:
+                interval = {k: v for k, v in r.items() if k != "temp"} if r is not None else {}
+                predictions.append(r["temp"] if r is not None else None)
+                intervals.append(interval or None)  # None sans modèle ou pour un modèle qui n'est pas une forêt
+        else:
+            predictions, intervals = results, [None] * len(results)
+        predictions_by_horizon = {jour["horizon"]: p for jour, p in zip(jours, predictions)}
+        if is_cancelled():
+            return None
+
+        erreurs_sauvegarde = []
+        if save and self.store is not None:
+            try:
+                for jour, day in zip(jours, dates):
+                    if 1 <= jour["horizon"] <= MAX_HORIZON and jour["temp_max"] is not None:
+                        self.save_observation(city_name, day, jour["temp_max"], None,
+                                              jour["humidity"], jour["pressure"], jour["wind_speed"])
+                # Les observations d'une recherche sont écrites ensemble, en une transaction
+                self.store.flush()
+                if predictor is not None:
+                    modele = self.model_name(predictor, source_modele)
+                    self.store.record_predictions([
+                        (None, city_name, day, jour["horizon"], modele, p, jour["temp_max"])
+                        for jour, day, p in zip(jours, dates, predictions)
+                        if 1 <= jour["horizon"] <= MAX_HORIZON
+                    ])
+            except Exception as e:
+                logger.error("Erreur de sauvegarde : %s", e, extra={"city": city_name})
+                erreurs_sauvegarde.append(str(e))
+
+        return {
+            "api_data": api_data,
+            "temp_modele_demain": predictions_by_horizon.get(1),
+            "temp_modele_apres_demain": predictions_by_horizon.get(2),
+            "temp_modele_par_horizon": predictions_by_horizon,
+            "intervalles_par_horizon": {jour["horizon"]: i for jour, i in zip(jours, intervals)},
+            "jours": [dict(jour, temp_modele=p, intervalle_modele=i) for jour, p, i in zip(jours, predictions, intervals)],
+            "source_modele": source_modele if predictor is not None else None,
+            "erreurs_sauvegarde": erreurs_sauvegarde,
+        }
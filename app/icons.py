@@ -0,0 +1,91 @@
+# weather_predictor/app/icons.py
+import logging
+import os
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QMovie, QPixmap
+
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICONS_DIR = os.path.join(BASE_DIR, 'assets', 'icons')
+
+DEFAULT_ICON = 'defaut.png'
+LOADING_ICON = 'loading.gif'
+# Probabilité de pluie minimale (%) -> icône, du seuil le plus haut au plus bas
+RAIN_ICONS = [(70, 'heavy_rain.png'), (40, 'rain.png'), (0, 'sun.png')]
+
+
+def icon_for_rain_probability(prob_pluie):
+    """Nom de l'icône pour une probabilité de pluie en % (int), DEFAULT_ICON si inconnue."""
+    if prob_pluie is None or prob_pluie < 0:
+        return DEFAULT_ICON
+    return next((name for threshold, name in RAIN_ICONS if prob_pluie >= threshold), DEFAULT_ICON)
+
+
+class IconCache:
+    """
+    Icônes météo décodées et mises à l'échelle une seule fois, puis servies depuis la mémoire.
+
+    Les pixmaps sont gardées par (nom, taille) : après le premier accès (ou `preload`),
+    afficher une icône ne touche plus au disque et ne refait aucun redimensionnement.
+    Un fichier absent ou illisible est signalé une fois et mémorisé comme tel (pixmap nulle).
+    Le GIF de chargement est un QMovie unique, réutilisé d'une recherche à l'autre.
+    Doit être utilisé dans le thread GUI, après la création de la QApplication.
+    """
+    def __init__(self, icons_dir=ICONS_DIR):
+        self.icons_dir = icons_dir
+        self._pixmaps = {}
+        self._movie = None
+
+    def preload(self, size):
+        """Décode et met à l'échelle toutes les icônes PNG du dossier pour `size`."""
+        try:
+            names = [name for name in os.listdir(self.icons_dir) if name.lower().endswith('.png')]
+        except OSError as e:
+            logger.error("Dossier des icônes illisible (%s).", e)
+            return 0
+        for name in names:
+            self.pixmap(name, size)
+        return len(names)
+
+    def _load(self, name, size):
+        path = os.path.join(self.icons_dir, name)
+        pixmap = QPixmap()
+        if not pixmap.load(path):
+            logger.error("Icône introuvable ou illisible : %s", path)
+            return pixmap
+        return pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def pixmap(self, name, size):
+        """Pixmap de `name` à la taille `size` ; à défaut l'icône par défaut, sinon une pixmap nulle."""
+        key = (name, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            telemetry.incr("icon_cache_lookups", result="miss")
+            with telemetry.span("icon_load"):
+                pixmap = self._pixmaps[key] = self._load(name, size)
+        else:
+            telemetry.incr("icon_cache_lookups", result="hit")
+        if pixmap.isNull() and name != DEFAULT_ICON:
+            return self.pixmap(DEFAULT_ICON, size)
+        return pixmap
+
+    def rain_pixmap(self, prob_pluie, size):
+        """Pixmap correspondant à une probabilité de pluie en % (voir RAIN_ICONS)."""
+        return self.pixmap(icon_for_rain_probability(prob_pluie), size)
+
+    def loading_movie(self, size):
+        """QMovie du GIF de chargement (toujours le même objet) à la taille `size` (QSize), ou None s'il est invalide."""
+        if self._movie is None:
+            self._movie = QMovie(os.path.join(self.icons_dir, LOADING_ICON))
+            self._movie.setCacheMode(QMovie.CacheAll)  # Images du GIF décodées une seule fois
+            if not self._movie.isValid():
+                logger.error("GIF de chargement invalide : %s", os.path.join(self.icons_dir, LOADING_ICON))
+        if not self._movie.isValid():
+            return None
+        if self._movie.scaledSize() != size:
+            self._movie.setScaledSize(size)
+        return self._movie
@@ -0,0 +1,142 @@
+# weather_predictor/app/inference.py
+import threading
+
+import numpy as np
+
+from app.features import FEATURE_COLUMNS, check_schema, fill_row
+
+# Quantiles des intervalles de prédiction (predict_quantiles, predict_rows_quantiles)
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def quantile_key(q):
+    """Nom d'un quantile dans les résultats : 0.1 -> "p10"."""
+    return f"p{round(q * 100)}"
+
+
+class FastPredictor:
+    """
+    Chemin d'inférence à faible latence autour d'un RandomForestRegressor entraîné.
+
+    - Le schéma de features (app/features.py) est vérifié une seule fois, au chargement, et
+      les noms de features sont retirés du modèle :
+      predict accepte alors directement un tableau NumPy sans reconstruire de DataFrame.
+    - Pour une forêt, les arbres sont évalués directement (tree_.predict) et accumulés dans
+      le même ordre que sklearn : résultat identique, sans la répartition joblib ni les
+      validations d'entrée de RandomForestRegressor.predict qui dominent pour quelques lignes.
+    - Les lignes sont écrites dans un tampon float32 préalloué par thread (le dtype interne
+      des arbres), ce qui évite conversion et copie à chaque appel.
+    - Un modèle du schéma de features 1 (sans horizon) reçoit les seules colonnes qu'il connaît.
+    - Intervalles de prédiction (predict_quantiles) : quantiles des sorties des arbres, obtenus
+      pendant le même passage sur la forêt que la moyenne, sans autre modèle à évaluer.
+    - Accepte aussi une forêt aplatie (app/flat_forest.py, FlatForest), évaluée par ses propres
+      tableaux, sans sklearn.
+    """
+    def __init__(self, model, max_rows=8):
+        self.columns = check_schema(model)
+        self._n_features = len(self.columns)
+        if getattr(model, 'feature_names_in_', None) is not None:
+            del model.feature_names_in_
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+        self.model = model
+        # Arbres bruts de la forêt (None pour un autre type de régresseur)
+        estimators = getattr(model, 'estimators_', None)
+        self._trees = [est.tree_ for est in estimators] if estimators and hasattr(estimators[0], 'tree_') else None
+        self.max_rows = max_rows
+        self._local = threading.local()
+
+    def _buffer(self, n_rows):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((self.max_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+        if n_rows > len(buffer):
+            return np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+        return buffer[:n_rows]
+
+    def _features(self, X):
+        if self._n_features != X.shape[1]:
+            X = X[:, :self._n_features]
+        if self._trees is None:
+            return X
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict(self, X):
+        """Prédit un tableau float32 (n, len(FEATURE_COLUMNS)) déjà dans l'ordre de FEATURE_COLUMNS."""
+        X = self._features(X)
+        if self._trees is None:
+            return self.model.predict(X)
+        out = np.zeros(len(X), dtype=np.float64)
+        for tree in self._trees:
+            out += tree.predict(X)[:, 0]
+        out /= len(self._trees)
+        return out
+
+    def predict_quantiles(self, X, quantiles=QUANTILES):
+        """
+        (moyenne (n,), quantiles (len(quantiles), n)) pour X comme predict. Les sorties des arbres
+        sont gardées dans une matrice (arbres, lignes) : la moyenne y est accumulée dans le même
+        ordre que predict (résultat identique), les quantiles calculés en une opération sur
+        l'axe des arbres. Quantiles None pour un régresseur qui n'est pas une forêt.
+
+        Les quantiles décrivent le désaccord entre les arbres : l'intervalle p10-p90 reflète
+        l'incertitude du modèle (situations rares, horizon lointain), pas toute la variabilité
+        de la météo autour de la prévision.
+        """
+        X = self._features(X)
+        if self._trees is not None:
+            outputs = np.empty((len(self._trees), len(X)), dtype=np.float64)
+            for row, tree in zip(outputs, self._trees):
+                row[:] = tree.predict(X)[:, 0]
+        elif hasattr(self.model, 'tree_outputs'):  # FlatForest
+            outputs = self.model.tree_outputs(X)
+        else:
+            return self.model.predict(X), None
+        mean = np.zeros(len(X), dtype=np.float64)
+        for row in outputs:
+            mean += row
+        mean /= len(outputs)
+        return mean, np.quantile(outputs, quantiles, axis=0)
+
+    def _fill(self, rows):
+        """(indices des lignes complètes, leurs features dans le tampon du thread)."""
+        complete = [i for i, row in enumerate(rows) if all(v is not None for v in row)]
+        X = self._buffer(len(complete))
+        for out, i in zip(X, complete):
+            fill_row(out, *rows[i])
+        return complete, X
+
+    def predict_rows(self, rows):
+        """
+        Prédit plusieurs lignes (temp_api, date_prevision, humidité, pression, vent[, horizon])
+        en un seul appel ; l'horizon vaut 1 s'il est omis. Une ligne dont une valeur est
+        manquante donne None, sans empêcher les autres.
+        """
+        results = [None] * len(rows)
+        complete, X = self._fill(rows)
+        if not complete:
+            return results
+
+        for i, prediction in zip(complete, self.predict(X)):
+            results[i] = round(float(prediction), 1)
+        return results
+
+    def predict_rows_quantiles(self, rows, quantiles=QUANTILES):
+        """
+        Comme predict_rows, avec les quantiles : chaque résultat est un dict
+        {"temp": prédiction, "p10": ..., "p50": ..., "p90": ...} (sans les pN si le modèle
+        n'est pas une forêt), ou None pour une ligne incomplète.
+        """
+        results = [None] * len(rows)
+        complete, X = self._fill(rows)
+        if not complete:
+            return results
+
+        mean, values = self.predict_quantiles(X, quantiles)
+        keys = [quantile_key(q) for q in quantiles]
+        for j, i in enumerate(complete):
+            result = {"temp": round(float(mean[j]), 1)}
+            if values is not None:
+                result.update((key, round(float(v), 1)) for key, v in zip(keys, values[:, j]))
+            results[i] = result
+        return results
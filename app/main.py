@@ -1,119 +1,147 @@
 # weather_predictor/app/main.py
 import sys
+import logging
 import os
-import csv
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
+
+_LAUNCH_TIME = time.perf_counter()  # Référence du temps jusqu'à la première image
+
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QMessageBox, QFrame, QScrollArea
 )
-from PyQt5.QtGui import QFont, QPixmap, QMovie
+from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QSize, QTimer 
 
-# Import des modules locaux
-from app.weather_api import fetch_weather_data 
-import joblib 
-import pandas as pd 
+# Import des modules locaux (les modules lourds sont importés par ensure_engine, après la première image)
+from app import telemetry
+from app.workers import ForecastExecutor
+from app.icons import IconCache
+
+logger = logging.getLogger(__name__)
 
 # --- Chemins des fichiers et dossiers ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OBSERVATIONS_DIR = os.path.join(BASE_DIR, 'data', 'observations')
-OBSERVATIONS_FILE = os.path.join(OBSERVATIONS_DIR, 'temperature_observations.csv')
 MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
-ICONS_DIR = os.path.join(BASE_DIR, 'assets', 'icons') # Chemin des icônes
 
 # S'assurer que les dossiers existent
 os.makedirs(OBSERVATIONS_DIR, exist_ok=True)
 os.makedirs(MODELS_DIR, exist_ok=True)
-os.makedirs(ICONS_DIR, exist_ok=True) # S'assurer que le dossier des icônes existe
+
+# Feuille de style de la fenêtre, appliquée avant la création des widgets (un seul calcul de style)
+STYLESHEET = """
+    QWidget {
+        background-color: #f0f4f8; 
+        font-family: Arial, sans-serif;
+    }
+    QLabel {
+        color: #334e68; 
+        font-size: 14px;
+    }
+    QLineEdit {
+        border: 1px solid #aebfd4; 
+        border-radius: 5px;
+        padding: 8px;
+        font-size: 14px;
+        background-color: #ffffff;
+        color: black;
+    }
+    #cityInput { 
+        min-width: 250px;
+    }
+    QPushButton {
+        background-color: #007bff;
+        color: white;
+        border: none;
+        border-radius: 5px;
+        padding: 10px 15px;
+        font-size: 14px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #0056b3;
+    }
+    QFrame {
+        background-color: white;
+        border-radius: 10px;
+        padding: 20px;
+        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
+    }
+    #weatherInfoFrame { 
+        background-color: #e0e7ee; 
+        border: 1px solid #aebfd4;
+    }
+    .infoLabel {
+        font-size: 16px;
+        margin-bottom: 5px;
+    }
+    .tempLabel {
+        font-size: 18px;
+        font-weight: bold;
+        color: #007bff;
+    }
+    .probLabel {
+        font-size: 16px;
+        color: #666;
+    }
+    #dateTimeLabel { 
+        font-size: 14px;
+        font-weight: bold;
+        color: #555;
+        margin-bottom: 10px;
+    }
+    #weatherIconLabel { 
+        /* Les propriétés de taille min/max sont mieux gérées par setFixedSize en Python */
+        /* margin: 10px auto; pour le centrage horizontal via le layout parent */
+        border: 2px solid #ddd;
+        border-radius: 8px;
+        padding: 5px;
+        background-color: #ffffff;
+    }
+    #cityDisplayLabel { 
+        font-size: 20px;
+        font-weight: bold;
+        color: #2c3e50;
+        margin-bottom: 10px;
+    }
+"""
+
 
 class WeatherApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Prédiction Météo Locale")
-        self.showMaximized() 
-
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f0f4f8; 
-                font-family: Arial, sans-serif;
-            }
-            QLabel {
-                color: #334e68; 
-                font-size: 14px;
-            }
-            QLineEdit {
-                border: 1px solid #aebfd4; 
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-                background-color: #ffffff;
-                color: black;
-            }
-            #cityInput { 
-                min-width: 250px;
-            }
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 10px 15px;
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-            QFrame {
-                background-color: white;
-                border-radius: 10px;
-                padding: 20px;
-                box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
-            }
-            #weatherInfoFrame { 
-                background-color: #e0e7ee; 
-                border: 1px solid #aebfd4;
-            }
-            .infoLabel {
-                font-size: 16px;
-                margin-bottom: 5px;
-            }
-            .tempLabel {
-                font-size: 18px;
-                font-weight: bold;
-                color: #007bff;
-            }
-            .probLabel {
-                font-size: 16px;
-                color: #666;
-            }
-            #dateTimeLabel { 
-                font-size: 14px;
-                font-weight: bold;
-                color: #555;
-                margin-bottom: 10px;
-            }
-            #weatherIconLabel { 
-                /* Les propriétés de taille min/max sont mieux gérées par setFixedSize en Python */
-                /* margin: 10px auto; pour le centrage horizontal via le layout parent */
-                border: 2px solid #ddd;
-                border-radius: 8px;
-                padding: 5px;
-                background-color: #ffffff;
-            }
-            #cityDisplayLabel { 
-                font-size: 20px;
-                font-weight: bold;
-                color: #2c3e50;
-                margin-bottom: 10px;
-            }
-        """)
+        self.setStyleSheet(STYLESHEET)
+
+        # Moteur de prévision (pandas, joblib, sklearn, modèle) préparé après la première image
+        self.engine = None
+        self.model_registry = None
+        self.observation_store = None
+        self._engine_lock = threading.Lock()
+        self._release_lock = threading.Lock()  # Jamais tenu pendant les imports lourds
+        self._closed = False
+        self.first_paint_ms = None
+        self.icons = IconCache()
+
+        self.executor = ForecastExecutor(self)
+        self.executor.result_ready.connect(self.display_forecast)
+        self.executor.failed.connect(self.display_forecast_error)
 
         self.init_ui()
-        self.load_model() 
         self.start_clock() 
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_ms is None:
+            self.first_paint_ms = (time.perf_counter() - _LAUNCH_TIME) * 1000
+            logger.info("Première image affichée en %.0f ms.", self.first_paint_ms)
+            telemetry.observe("first_paint", self.first_paint_ms / 1000)
+            QTimer.singleShot(0, self.load_model)
+            QTimer.singleShot(0, lambda: self.icons.preload(self.weather_icon_label.width()))
+
     def init_ui(self):
         main_layout = QVBoxLayout(self) 
 
@@ -276,164 +304,136 @@ class WeatherApp(QWidget):
 
     def get_icon_pixmap(self, icon_filename, size=64):
         """
-        Charge une QPixmap à partir d'un fichier icône, gère les erreurs et le redimensionnement.
+        QPixmap d'une icône à la taille voulue, depuis le cache (décodée une seule fois).
         """
-        icon_path = os.path.join(ICONS_DIR, icon_filename)
-        print(f"Tentative de chargement de l'icône: {icon_path}")
-
-        pixmap = QPixmap()
-        if os.path.exists(icon_path) and pixmap.load(icon_path):
-            print(f"Icône chargée avec succès: {icon_filename}")
-            # Ne pas redimensionner ici, laisser setScaledContents(True) le faire dans le QLabel
-            # Ou alors, redimensionner ici à la taille exacte voulue (64x64)
-            return pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        else:
-            if not os.path.exists(icon_path):
-                print(f"Erreur: Fichier icône non trouvé: {icon_path}")
-            else:
-                print(f"Erreur: QPixmap n'a pas pu charger {icon_path}. Fichier peut-être corrompu, format non supporté, ou permissions.")
-            return QPixmap() # Retourne une QPixmap nulle
+        return self.icons.pixmap(icon_filename, size)
 
     def set_weather_icon_display(self, prob_pluie, target_label):
         """
-        Définit l'icône appropriée sur le QLabel cible en fonction de la probabilité de pluie.
+        Définit l'icône appropriée sur le QLabel cible en fonction de la probabilité de pluie
+        ("45%", 'loading' pour le GIF de chargement, None ou 'N/A' pour l'icône par défaut).
         """
         # --- Étape 1: Nettoyer l'état précédent du QLabel ---
-        # Arrêter tout QMovie (GIF) s'il y en a un
+        # Arrêter le GIF de chargement s'il est affiché (le QMovie est réutilisé)
         if target_label.movie():
             target_label.movie().stop()
             target_label.setMovie(None)
-        # Effacer tout contenu (image ou texte)
         target_label.clear()
-        
-        # --- Étape 2: Gérer l'icône de chargement (GIF) ---
+
+        # --- Étape 2: Icône de chargement (GIF) ---
         if prob_pluie == 'loading':
-            loading_path = os.path.join(ICONS_DIR, 'loading.gif')
-            if os.path.exists(loading_path):
-                movie = QMovie(loading_path)
-                if movie.isValid():
-                    # Utiliser la taille du QLabel pour le redimensionnement du GIF
-                    movie.setScaledSize(target_label.size()) 
-                    target_label.setMovie(movie)
-                    movie.start()
-                    print("GIF de chargement démarré.")
-                else:
-                    print(f"Erreur: GIF de chargement invalide: {loading_path}")
-                    target_label.setText("...")
-            else:
-                print(f"Erreur: Fichier GIF de chargement non trouvé: {loading_path}")
+            movie = self.icons.loading_movie(target_label.size())
+            if movie is None:
                 target_label.setText("...")
+                return
+            target_label.setMovie(movie)
+            movie.start()
             return
 
-        # --- Étape 3: Déterminer et charger l'icône statique (PNG/SVG) ---
-        prob_int = -1
+        # --- Étape 3: Icône statique selon la probabilité de pluie ---
+        prob_int = None
         if isinstance(prob_pluie, str) and prob_pluie.endswith('%'):
             try:
                 prob_int = int(prob_pluie.replace('%', ''))
             except ValueError:
                 pass
 
-        icon_filename = "default.png" # Icône par défaut
-
-        if prob_int >= 70:
-            icon_filename = "heavy_rain.png"
-        elif prob_int >= 40:
-            icon_filename = "rain.png"
-        elif prob_int >= 0:
-            icon_filename = "sun.png"
-
-        # Tenter de charger le pixmap avec la taille du label
-        # Ici, nous utilisons directement la taille du label (80x80) pour la pixmap,
-        # puis setScaledContents(True) l'adaptera au label si nécessaire.
-        final_pixmap = self.get_icon_pixmap(icon_filename, size=target_label.width()) 
-
-        # --- Étape 4: Afficher le pixmap ou un indicateur d'erreur ---
-        if not final_pixmap.isNull():
-            target_label.setPixmap(final_pixmap)
-            print(f"Icône '{icon_filename}' affichée sur le label.")
+        pixmap = self.icons.rain_pixmap(prob_int, target_label.width())
+        if pixmap.isNull():
+            target_label.setText("?")
         else:
-            # Si l'icône spécifique n'a pas pu être chargée, tenter l'icône par défaut
-            default_pixmap = self.get_icon_pixmap("default.png", size=target_label.width())
-            if not default_pixmap.isNull():
-                target_label.setPixmap(default_pixmap)
-                print("Icône par défaut affichée.")
-            else:
-                target_label.setText("?")
-                print(f"Avertissement: Impossible d'afficher l'icône. Ni '{icon_filename}' ni 'default.png' n'ont pu être chargés.")
+            target_label.setPixmap(pixmap)
 
 
     def load_model(self):
-        """Charge le modèle de prédiction le plus récent."""
-        self.model = None
-        model_files = [f for f in os.listdir(MODELS_DIR) if f.endswith('.pkl')]
-        if not model_files:
-            print("Aucun modèle trouvé. Le modèle ML ne sera pas utilisé.")
-            return
-
-        model_files.sort(key=lambda x: os.path.getmtime(os.path.join(MODELS_DIR, x)), reverse=True)
-        latest_model_path = os.path.join(MODELS_DIR, model_files[0])
-
-        try:
-            self.model = joblib.load(latest_model_path)
-            print(f"Modèle chargé: {latest_model_path}")
-        except Exception as e:
-            print(f"Erreur lors du chargement du modèle: {e}")
-            self.model = None
+        """
+        Prépare le moteur de prévision dans un thread de fond, sans bloquer l'affichage.
+        Appelé après la première image ; une recherche lancée avant la fin attend simplement
+        le moteur dans son worker.
+        """
+        threading.Thread(target=self.ensure_engine, name="engine-startup", daemon=True).start()
 
-    def predict_with_model(self, temp_predite_modele_prev, date_prevision, humidity_api, pressure_api, wind_speed_api):
+    def ensure_engine(self):
+        """
+        Crée le moteur au premier appel : imports lourds (pandas, joblib, sklearn), base
+        d'observations (l'ancien CSV y est importé au premier lancement) et registre de modèles,
+        qui charge le modèle le plus récent en arrière-plan puis le recharge à chaud dès qu'un
+        nouveau modèle apparaît dans MODELS_DIR. Les modèles par ville éventuels sont chargés
+        à la première recherche de leur ville (ModelRouter).
+        Si la fenêtre a été fermée pendant la création, le moteur est libéré ici, une fois
+        _engine_lock relâché (closeEvent ne l'attend pas).
+        """
+        with self._engine_lock:
+            if self.engine is None and not self._closed:
+                start = time.perf_counter()
+                from app.forecast import ForecastEngine
+                from app.inference import FastPredictor
+                from app.model_registry import ModelRegistry
+                from app.model_shards import ModelRouter
+                from app.observation_store import open_default_store
+
+                self.observation_store = open_default_store()
+                self.model_registry = ModelRegistry(MODELS_DIR, prepare=FastPredictor)
+                self.model_registry.start()
+                router = ModelRouter(self.model_registry, prepare=FastPredictor)
+                self.engine = ForecastEngine(self.model_registry, self.observation_store, router)
+                elapsed = time.perf_counter() - start
+                telemetry.observe("engine_startup", elapsed)
+                logger.info("Moteur de prévision prêt en %.0f ms.", elapsed * 1000)
+        if self._closed:
+            self._release_engine()
+        return self.engine
+
+    def _release_engine(self):
+        """
+        Oublie le moteur, arrête le registre et ferme la base ; sans effet si c'est déjà fait.
+        Un worker encore en vie voit alors engine à None et abandonne sa recherche.
+        """
+        with self._release_lock:
+            self.engine = None
+            registry, self.model_registry = self.model_registry, None
+            store, self.observation_store = self.observation_store, None
+        if registry is not None:
+            registry.stop(timeout=1)
+        if store is not None:
+            store.close()
+
+    @property
+    def model(self):
+        """Modèle courant (None tant qu'aucun modèle n'est chargé)."""
+        registry = self.model_registry
+        return registry.model if registry is not None else None
+
+    def predict_with_model(self, temp_predite_modele_prev, date_prevision, humidity_api, pressure_api, wind_speed_api, horizon=1,
+                           intervals=False):
         """
         Fait une prédiction avec le modèle chargé en utilisant toutes les features pertinentes.
+        Avec intervals=True, retourne {"temp", "p10", "p50", "p90"} (quantiles des arbres de la forêt).
+        Retourne None si la fenêtre a été fermée.
         """
-        if self.model:
-            try:
-                day_of_year = date_prevision.timetuple().tm_yday
-                month = date_prevision.month
-                day_of_week = date_prevision.weekday() 
-
-                input_data = pd.DataFrame([[
-                    temp_predite_modele_prev,
-                    humidity_api,
-                    pressure_api,
-                    wind_speed_api,
-                    day_of_year,
-                    month,
-                    day_of_week
-                ]],
-                columns=['temp_predite_modele', 'humidity_api', 'pressure_api', 'wind_speed_api', 'day_of_year', 'month', 'day_of_week'])
-                
-                prediction = self.model.predict(input_data)[0]
-                return round(float(prediction), 1) 
-            except Exception as e:
-                print(f"Erreur lors de la prédiction avec le modèle : {e}")
-                return None
-        return None 
+        engine = self.ensure_engine()
+        if engine is None:  # Fenêtre fermée entre-temps
+            return None
+        return engine.predict_days([
+            (temp_predite_modele_prev, date_prevision, humidity_api, pressure_api, wind_speed_api, horizon)
+        ], intervals=intervals)[0]
+
+    @staticmethod
+    def format_interval(interval):
+        """Texte de l'intervalle p10-p90 d'une prédiction ("" s'il n'est pas disponible)."""
+        if not interval or interval.get("p10") is None or interval.get("p90") is None:
+            return ""
+        return f", p10-p90 : {interval['p10']} à {interval['p90']}°C"
 
     def save_observation(self, city, date_prediction, predicted_temp_model, observed_temp_api, humidity_api, pressure_api, wind_speed_api):
         """
-        Sauvegarde une observation dans un fichier CSV.
+        Ajoute une observation au tampon de la base d'observations (écrite au prochain flush).
+        Ignorée si la fenêtre a été fermée.
         """
-        file_exists = os.path.exists(OBSERVATIONS_FILE)
-
-        try:
-            with open(OBSERVATIONS_FILE, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow([
-                        'date_enregistrement', 'ville', 'date_prevision', 
-                        'temp_predite_modele', 'temp_observee_api', 
-                        'humidity_api', 'pressure_api', 'wind_speed_api'
-                    ])
-                
-                date_enregistrement = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                writer.writerow([
-                    date_enregistrement, city, date_prediction.strftime('%Y-%m-%d'), 
-                    predicted_temp_model, observed_temp_api, 
-                    humidity_api, pressure_api, wind_speed_api
-                ])
-            print(f"Observation sauvegardée pour {city} le {date_prediction.strftime('%Y-%m-%d')}.")
-        except Exception as e:
-            QMessageBox.warning(self, "Erreur de Sauvegarde", f"Impossible de sauvegarder l'observation : {e}")
-            print(f"Erreur de sauvegarde: {e}")
+        engine = self.ensure_engine()
+        if engine is None:  # Fenêtre fermée entre-temps
+            return
+        engine.save_observation(city, date_prediction, predicted_temp_model, observed_temp_api, humidity_api, pressure_api, wind_speed_api)
 
     def get_weather(self):
         city_name = self.city_input.text().strip()
@@ -441,80 +441,102 @@ class WeatherApp(QWidget):
             QMessageBox.warning(self, "Erreur", "Veuillez entrer le nom d'une ville.")
             return
 
+        # Une recherche identique déjà en cours est fusionnée : on ne réinitialise pas l'affichage
+        if not self.executor.submit(city_name, self.compute_forecast):
+            return
+
         self.city_display_label.setText(f"Météo pour {city_name}...")
         self.clear_weather_display() 
         self.set_weather_icon_display('loading', self.weather_icon_label) 
 
-        api_data = fetch_weather_data(city_name)
+    def compute_forecast(self, city_name, is_cancelled=lambda: False):
+        """
+        Partie bloquante d'une recherche (appel API, prédiction, sauvegarde).
+        Exécutée dans un worker : ne doit toucher à aucun widget.
+        """
+        engine = self.ensure_engine()
+        if engine is None:  # Fenêtre fermée entre-temps
+            return None
+        return engine.compute(city_name, is_cancelled=is_cancelled)
+
+    def display_forecast(self, city_name, result):
+        """Affiche le résultat d'une recherche (thread GUI)."""
+        if not result:
+            self.city_display_label.setText(f"Météo pour {city_name} (Données non trouvées)")
+            self.clear_weather_display()
+            QMessageBox.information(self, "Données Météo", f"Impossible de récupérer les données météo pour {city_name}. Vérifiez le nom de la ville ou votre clé API.")
+            return
+
+        api_data = result["api_data"]
+        temp_api_demain = api_data.get("temp_max_demain")
+        prob_pluie_demain = api_data.get("prob_pluie_demain")
+        humidity_demain = api_data.get("humidity_demain")
+        pressure_demain = api_data.get("pressure_demain")
+        wind_speed_demain = api_data.get("wind_speed_demain")
+
+        temp_api_apres_demain = api_data.get("temp_max_apres_demain")
+        prob_pluie_apres_demain = api_data.get("prob_pluie_apres_demain")
+        humidity_apres_demain = api_data.get("humidity_apres_demain")
+        pressure_apres_demain = api_data.get("pressure_apres_demain")
+        wind_speed_apres_demain = api_data.get("wind_speed_apres_demain")
+
+        temp_modele_demain = result["temp_modele_demain"]
+        intervalles = result.get("intervalles_par_horizon", {})
+        model_status_text = "N/A (modèle non dispo)"
+        temp_modele_demain_display = temp_api_demain 
+        if temp_modele_demain is not None:
+            temp_modele_demain_display = temp_modele_demain
+            model_status_text = "Modèle" + self.format_interval(intervalles.get(1))
+
+        self.city_display_label.setText(f"Météo pour {city_name}")
         
-        if api_data and api_data["temp_max_demain"] is not None:
-            temp_api_demain = api_data.get("temp_max_demain")
-            prob_pluie_demain = api_data.get("prob_pluie_demain")
-            humidity_demain = api_data.get("humidity_demain")
-            pressure_demain = api_data.get("pressure_demain")
-            wind_speed_demain = api_data.get("wind_speed_demain")
-
-            temp_api_apres_demain = api_data.get("temp_max_apres_demain")
-            prob_pluie_apres_demain = api_data.get("prob_pluie_apres_demain")
-            humidity_apres_demain = api_data.get("humidity_apres_demain")
-            pressure_apres_demain = api_data.get("pressure_apres_demain")
-            wind_speed_apres_demain = api_data.get("wind_speed_apres_demain")
-
-            date_demain = datetime.now().date() + timedelta(days=1)
-            date_apres_demain = datetime.now().date() + timedelta(days=2)
-
-            temp_modele_demain = self.predict_with_model(
-                temp_api_demain, 
-                date_demain,
-                humidity_demain, 
-                pressure_demain, 
-                wind_speed_demain
-            )
-            
-            model_status_text = "N/A (modèle non dispo)"
-            temp_modele_demain_display = temp_api_demain 
-            if temp_modele_demain is not None:
-                temp_modele_demain_display = temp_modele_demain
-                model_status_text = "Modèle"
-
-            self.city_display_label.setText(f"Météo pour {city_name}")
-            
-            self.temp_demain_label.setText(
-                f"Temp. Max Demain: {temp_modele_demain_display}°C ({model_status_text}) | {temp_api_demain}°C (API)"
+        self.temp_demain_label.setText(
+            f"Temp. Max Demain: {temp_modele_demain_display}°C ({model_status_text}) | {temp_api_demain}°C (API)"
+        )
+        
+        self.prob_pluie_demain_label.setText(f"Probabilité de Pluie Demain: {prob_pluie_demain if prob_pluie_demain is not None else '--'}%")
+        self.humidity_demain_label.setText(f"Humidité Demain: {humidity_demain if humidity_demain is not None else '--'}%")
+        self.pressure_demain_label.setText(f"Pression Demain: {pressure_demain if pressure_demain is not None else '--'} hPa")
+        self.wind_speed_demain_label.setText(f"Vent Demain: {wind_speed_demain if wind_speed_demain is not None else '--'} m/s")
+        
+        temp_modele_apres_demain = result["temp_modele_apres_demain"]
+        if temp_modele_apres_demain is not None:
+            self.temp_apres_demain_label.setText(
+                f"Temp. Max Après-Demain: {temp_modele_apres_demain}°C (Modèle{self.format_interval(intervalles.get(2))}) | {temp_api_apres_demain}°C (API)"
             )
-            
-            self.prob_pluie_demain_label.setText(f"Probabilité de Pluie Demain: {prob_pluie_demain if prob_pluie_demain is not None else '--'}%")
-            self.humidity_demain_label.setText(f"Humidité Demain: {humidity_demain if humidity_demain is not None else '--'}%")
-            self.pressure_demain_label.setText(f"Pression Demain: {pressure_demain if pressure_demain is not None else '--'} hPa")
-            self.wind_speed_demain_label.setText(f"Vent Demain: {wind_speed_demain if wind_speed_demain is not None else '--'} m/s")
-            
+        else:
             self.temp_apres_demain_label.setText(f"Temp. Max Après-Demain: {temp_api_apres_demain if temp_api_apres_demain is not None else '--'}°C")
-            self.prob_pluie_apres_demain_label.setText(f"Probabilité de Pluie Après-Demain: {prob_pluie_apres_demain if prob_pluie_apres_demain is not None else '--'}%")
-            self.humidity_apres_demain_label.setText(f"Humidité Après-Demain: {humidity_apres_demain if humidity_apres_demain is not None else '--'}%")
-            self.pressure_apres_demain_label.setText(f"Pression Après-Demain: {pressure_apres_demain if pressure_apres_demain is not None else '--'} hPa")
-            self.wind_speed_apres_demain_label.setText(f"Vent Après-Demain: {wind_speed_apres_demain if wind_speed_apres_demain is not None else '--'} m/s")
+        self.prob_pluie_apres_demain_label.setText(f"Probabilité de Pluie Après-Demain: {prob_pluie_apres_demain if prob_pluie_apres_demain is not None else '--'}%")
+        self.humidity_apres_demain_label.setText(f"Humidité Après-Demain: {humidity_apres_demain if humidity_apres_demain is not None else '--'}%")
+        self.pressure_apres_demain_label.setText(f"Pression Après-Demain: {pressure_apres_demain if pressure_apres_demain is not None else '--'} hPa")
+        self.wind_speed_apres_demain_label.setText(f"Vent Après-Demain: {wind_speed_apres_demain if wind_speed_apres_demain is not None else '--'} m/s")
 
-            # Appliquer les icônes
-            self.set_weather_icon_display(f"{prob_pluie_demain}%" if prob_pluie_demain is not None else 'N/A', self.weather_icon_label)
+        # Appliquer les icônes
+        self.set_weather_icon_display(f"{prob_pluie_demain}%" if prob_pluie_demain is not None else 'N/A', self.weather_icon_label)
 
-            self.save_observation(
-                city_name, date_demain, temp_modele_demain_display, temp_api_demain,
-                humidity_demain, pressure_demain, wind_speed_demain
-            )
-            
-            if temp_api_apres_demain is not None:
-                self.save_observation(
-                    city_name, date_apres_demain, temp_api_apres_demain, temp_api_apres_demain, 
-                    humidity_apres_demain, pressure_apres_demain, wind_speed_apres_demain
-                )
+        if result["erreurs_sauvegarde"]:
+            QMessageBox.warning(self, "Erreur de Sauvegarde", f"Impossible de sauvegarder l'observation : {result['erreurs_sauvegarde'][0]}")
 
-        else:
-            self.city_display_label.setText(f"Météo pour {city_name} (Données non trouvées)")
-            self.clear_weather_display()
-            QMessageBox.information(self, "Données Météo", f"Impossible de récupérer les données météo pour {city_name}. Vérifiez le nom de la ville ou votre clé API.")
+    def display_forecast_error(self, city_name, message):
+        """Erreur inattendue levée dans le worker (thread GUI)."""
+        logger.error("Erreur lors de la recherche pour %s : %s", city_name, message)
+        self.city_display_label.setText(f"Météo pour {city_name} (Erreur)")
+        self.clear_weather_display()
+        QMessageBox.warning(self, "Erreur", f"Une erreur est survenue lors de la recherche : {message}")
+
+    def closeEvent(self, event):
+        self.executor.shutdown()
+        # Sans attendre _engine_lock, tenu par ensure_engine pendant les imports lourds :
+        # s'il est pris, ensure_engine verra _closed et libérera le moteur en le relâchant
+        self._closed = True
+        if self._engine_lock.acquire(blocking=False):
+            self._engine_lock.release()
+            self._release_engine()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
+    telemetry.configure_from_env()
     app = QApplication(sys.argv)
     window = WeatherApp()
-    window.show()
+    window.showMaximized()
     sys.exit(app.exec_())
@@ -0,0 +1,278 @@
+# weather_predictor/app/model_artifacts.py
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import joblib
+
+from app.flat_forest import FOREST_SUFFIX, export_forest, forest_path, is_exportable
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Paramètres par défaut : compression zlib niveau 3 (environ 6x plus petit, chargement
+# aussi rapide), rétention des 5 derniers modèles et des 3 meilleurs MAE
+COMPRESS = 3
+KEEP_LAST = 5
+KEEP_BEST = 3
+# Fichiers annexes d'un modèle (<nom du modèle><suffixe>), supprimés avec lui ; la forêt
+# aplatie (app/flat_forest.py) est un dossier
+SIDECAR_SUFFIXES = ('_leaderboard.json', FOREST_SUFFIX)
+
+
+class ModelArtifacts:
+    """
+    Gestion des modèles sauvegardés dans `models_dir` et de leur manifeste (manifest.json).
+
+    Le manifeste liste les modèles (fichier, date, MAE, régresseur, taille, compression,
+    version du schéma de features) et désigne le modèle actif : l'application le trouve en
+    lisant un seul petit fichier, sans lister ni trier le dossier. Il est réécrit de façon
+    atomique (fichier temporaire puis os.replace), comme les modèles eux-mêmes.
+
+    Après chaque sauvegarde, seuls sont conservés les `keep_last` modèles les plus récents,
+    les `keep_best` meilleurs MAE mesurés en production et le modèle actif (avec leurs fichiers
+    annexes, par exemple le classement de --mode search) ; les autres sont supprimés. Le MAE de
+    l'entraînement n'entre pas dans ce classement : il dépend du mode (validation croisée,
+    échantillon aléatoire, nouvelles lignes seules, dernière tranche) et ne se compare pas d'un
+    modèle à l'autre. Le MAE en production (`mae_live`) est celui des prédictions du modèle
+    comparées aux relevés réels, enregistré par training/evaluate.py (record_live_scores).
+
+    Avec export_flat, une forêt est aussi exportée en tableaux plats (app/flat_forest.py) avant
+    d'être activée : l'application la charge sans sklearn.
+    """
+    def __init__(self, models_dir=MODELS_DIR, compress=COMPRESS, keep_last=KEEP_LAST, keep_best=KEEP_BEST,
+                 export_flat=True):
+        self.models_dir = models_dir
+        self.compress = compress
+        self.export_flat = export_flat
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.manifest_path = os.path.join(models_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(models_dir, exist_ok=True)
+
+    # --- Manifeste ---
+
+    def read_manifest(self):
+        """Manifeste courant, ou None s'il n'existe pas ou est illisible."""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error("Manifeste des modèles illisible (%s).", e)
+            return None
+        return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _empty_manifest(self):
+        return {'version': MANIFEST_VERSION, 'active': None, 'models': []}
+
+    def active_entry(self):
+        """Entrée du manifeste du modèle actif, ou None."""
+        manifest = self.read_manifest()
+        if not manifest or not manifest.get('active'):
+            return None
+        return next((m for m in manifest['models'] if m['file'] == manifest['active']), None)
+
+    def active_path(self):
+        entry = self.active_entry()
+        return os.path.join(self.models_dir, entry['file']) if entry else None
+
+    # --- Écriture ---
+
+    def _new_path(self):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        model_path = os.path.join(self.models_dir, f'weather_model_{timestamp}.pkl')
+        suffix = 1
+        while os.path.exists(model_path):  # Deux entraînements dans la même seconde
+            model_path = os.path.join(self.models_dir, f'weather_model_{timestamp}_{suffix}.pkl')
+            suffix += 1
+        return model_path
+
+    def save(self, model, mae=None, estimator=None, activate=True):
+        """
+        Sauvegarde `model` (compressé), l'ajoute au manifeste, l'active et applique la
+        politique de rétention. Retourne le chemin du modèle.
+        """
+        with self._lock:
+            # Indexer les anciens modèles avant d'écrire le nouveau, qui serait sinon pris pour l'un d'eux
+            manifest = self.read_manifest() or self._index(self._empty_manifest())
+            model_path = self._new_path()
+            # Écriture dans un fichier temporaire puis renommage atomique : l'application, qui
+            # surveille le dossier, ne voit jamais de .pkl partiellement écrit
+            tmp_path = model_path + '.tmp'
+            joblib.dump(model, tmp_path, compress=self.compress)
+            os.replace(tmp_path, model_path)
+            flat = self.export_flat and is_exportable(model)
+            if flat:
+                export_forest(model, forest_path(model_path))
+
+            manifest['models'].append({
+                'file': os.path.basename(model_path),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'mae': mae,
+                'estimator': estimator,
+                'n_estimators': len(getattr(model, 'estimators_', [])) or None,
+                'size_bytes': os.path.getsize(model_path),
+                'compressed': bool(self.compress),
+                'feature_schema': getattr(model, 'feature_schema_', {}).get('version'),
+                'flat_forest': flat,
+            })
+            if activate:
+                manifest['active'] = os.path.basename(model_path)
+            self._prune(manifest)
+            self._write_manifest(manifest)
+        return model_path
+
+    def activate(self, file_name):
+        """Désigne un modèle déjà indexé comme actif (retour en arrière, par exemple)."""
+        with self._lock:
+            manifest = self.read_manifest() or self._index(self._empty_manifest())
+            if not any(m['file'] == file_name for m in manifest['models']):
+                raise ValueError(f"Modèle inconnu du manifeste : {file_name}")
+            manifest['active'] = file_name
+            self._write_manifest(manifest)
+
+    def record_live_scores(self, scores):
+        """
+        Enregistre le MAE en production des modèles indexés : `scores` = {fichier: (n, mae)},
+        n prédictions évaluées. Les fichiers inconnus du manifeste sont ignorés.
+        Retourne le nombre d'entrées mises à jour.
+        """
+        with self._lock:
+            manifest = self.read_manifest()
+            if manifest is None:
+                return 0
+            updated = 0
+            for entry in manifest['models']:
+                if entry['file'] in scores:
+                    entry['n_live'], entry['mae_live'] = scores[entry['file']]
+                    updated += 1
+            if updated:
+                self._write_manifest(manifest)
+            return updated
+
+    # --- Rétention ---
+
+    def _kept_files(self, models, active):
+        by_date = sorted(models, key=lambda m: (m['created_at'], m['file']), reverse=True)
+        kept = {m['file'] for m in by_date[:self.keep_last]}
+        scored = sorted((m for m in models if m.get('mae_live') is not None), key=lambda m: m['mae_live'])
+        kept.update(m['file'] for m in scored[:self.keep_best])
+        if active:
+            kept.add(active)
+        return kept
+
+    def _prune(self, manifest):
+        kept = self._kept_files(manifest['models'], manifest.get('active'))
+        removed = [m for m in manifest['models'] if m['file'] not in kept]
+        for entry in removed:
+            stem = os.path.splitext(entry['file'])[0]
+            for name in [entry['file']] + [stem + suffix for suffix in SIDECAR_SUFFIXES]:
+                path = os.path.join(self.models_dir, name)
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning("Impossible de supprimer %s : %s", name, e)
+            logger.info("Modèle supprimé (rétention) : %s", entry['file'])
+        manifest['models'] = [m for m in manifest['models'] if m['file'] in kept]
+        return removed
+
+    def prune(self):
+        """Applique la politique de rétention au manifeste existant. Retourne les entrées supprimées."""
+        with self._lock:
+            manifest = self.read_manifest()
+            if manifest is None:
+                return []
+            removed = self._prune(manifest)
+            self._write_manifest(manifest)
+            return removed
+
+    # --- Indexation des modèles existants ---
+
+    def _index(self, manifest, compress_existing=False):
+        """
+        Ajoute au manifeste les .pkl du dossier qui n'y figurent pas encore (anciens modèles) ;
+        avec compress_existing, recompresse aussi les modèles indexés non compressés.
+        """
+        entries = {m['file']: m for m in manifest['models']}
+        for name in sorted(os.listdir(self.models_dir)):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.models_dir, name)
+            entry = entries.get(name)
+            if entry is None:
+                entry = {
+                    'file': name,
+                    'created_at': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds'),
+                    'mae': None,
+                    'estimator': None,
+                    'n_estimators': None,
+                    'size_bytes': os.path.getsize(path),
+                    'compressed': False,
+                }
+                manifest['models'].append(entry)
+            if compress_existing and self.compress and not entry.get('compressed'):
+                model = joblib.load(path)
+                joblib.dump(model, path + '.tmp', compress=self.compress)
+                os.replace(path + '.tmp', path)
+                entry.update(compressed=True, size_bytes=os.path.getsize(path))
+        if manifest['models'] and manifest.get('active') not in {m['file'] for m in manifest['models']}:
+            manifest['active'] = max(manifest['models'], key=lambda m: (m['created_at'], m['file']))['file']
+        return manifest
+
+    def index(self, compress_existing=False):
+        """Indexe (et recompresse si demandé) les modèles absents du manifeste."""
+        with self._lock:
+            manifest = self._index(self.read_manifest() or self._empty_manifest(), compress_existing)
+            self._write_manifest(manifest)
+            return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion des modèles sauvegardés et de leur manifeste.")
+    parser.add_argument("command", choices=["list", "index", "prune", "activate"])
+    parser.add_argument("file", nargs="?", help="activate : fichier du modèle à activer")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--compress", action="store_true", help="index : recompresser les anciens modèles")
+    parser.add_argument("--keep-last", type=int, default=KEEP_LAST)
+    parser.add_argument("--keep-best", type=int, default=KEEP_BEST)
+    args = parser.parse_args()
+
+    artifacts = ModelArtifacts(args.models_dir, keep_last=args.keep_last, keep_best=args.keep_best)
+    if args.command == "index":
+        artifacts.index(compress_existing=args.compress)
+    elif args.command == "prune":
+        artifacts.prune()
+    elif args.command == "activate":
+        if not args.file:
+            parser.error("activate attend le nom du fichier du modèle")
+        artifacts.activate(args.file)
+
+    manifest = artifacts.read_manifest() or {'models': [], 'active': None}
+    for m in sorted(manifest['models'], key=lambda m: m['created_at']):
+        mark = '*' if m['file'] == manifest['active'] else ' '
+        mae = f"{m['mae']:.2f}" if m.get('mae') is not None else '-'
+        live = f"{m['mae_live']:.2f}" if m.get('mae_live') is not None else '-'
+        print(f"{mark} {m['file']:<40} {m['created_at']}  MAE {mae:>5}  prod {live:>5}  {m['size_bytes'] / 1024:7.1f} Ko"
+              f"{'  (compressé)' if m.get('compressed') else ''}")
@@ -0,0 +1,176 @@
+# weather_predictor/app/model_registry.py
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import joblib
+
+from app import telemetry
+from app.flat_forest import FlatForest, forest_path
+from app.model_artifacts import ModelArtifacts
+
+logger = logging.getLogger(__name__)
+
+
+# Modèle chargé + métadonnées, remplacé d'un bloc (jamais modifié sur place)
+LoadedModel = namedtuple("LoadedModel", ["model", "predictor", "path", "mtime", "load_seconds", "loaded_at"])
+
+
+class ModelRegistry:
+    """
+    Garde le modèle de prédiction en mémoire et le recharge à chaud quand `models_dir` change.
+
+    Un thread de fond surveille le dossier par sondage de son mtime (ajout, suppression ou
+    renommage d'un .pkl) et charge le modèle le plus récent sans bloquer les lecteurs : le
+    nouveau LoadedModel est publié par une simple affectation, atomique pour les threads qui
+    appellent `current()` pendant une prédiction.
+
+    Le modèle à charger est le modèle actif du manifeste (manifest.json, voir
+    app/model_artifacts.py) : un seul petit fichier lu, sans lister le dossier. Sans manifeste
+    (anciens dossiers), c'est le .pkl le plus récent.
+
+    mmap_mode est transmis à joblib.load pour les modèles non compressés : les tableaux NumPy
+    conservés tels quels restent sur disque (pages partagées) au lieu d'être copiés en mémoire.
+
+    Avec flat (par défaut), la forêt aplatie exportée à côté du .pkl (app/flat_forest.py) est
+    chargée à sa place, en mmap, sans importer sklearn ; le .pkl reste utilisé s'il n'y a pas
+    d'export ou s'il ne se charge pas.
+
+    `prepare`, s'il est fourni, est appelé une fois par modèle chargé (dans le thread de
+    chargement) pour construire l'objet de prédiction publié dans LoadedModel.predictor ;
+    s'il lève une exception, le modèle est refusé.
+    """
+    def __init__(self, models_dir, poll_interval=5.0, mmap_mode="r", on_change=None, prepare=None, flat=True):
+        self.models_dir = models_dir
+        self.prepare = prepare
+        self.flat = flat
+        self.poll_interval = poll_interval
+        self.mmap_mode = mmap_mode
+        self.on_change = on_change
+        self.artifacts = ModelArtifacts(models_dir)
+        self._current = None
+        self._dir_signature = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        """Dernier LoadedModel publié, ou None si aucun modèle n'est disponible."""
+        return self._current
+
+    @property
+    def model(self):
+        loaded = self._current
+        return loaded.model if loaded is not None else None
+
+    @property
+    def predictor(self):
+        loaded = self._current
+        return loaded.predictor if loaded is not None else None
+
+    def _active_model(self):
+        """(chemin, compressé) du modèle à charger, ou (None, False)."""
+        entry = self.artifacts.active_entry()
+        if entry is not None:
+            return os.path.join(self.models_dir, entry['file']), entry.get('compressed', False)
+        return self.latest_model_path(), False
+
+    def active_model_path(self):
+        """Chemin du modèle actif du manifeste (à défaut, du .pkl le plus récent), ou None."""
+        return self._active_model()[0]
+
+    def latest_model_path(self):
+        """.pkl le plus récent du dossier (utilisé sans manifeste)."""
+        model_files = [f for f in os.listdir(self.models_dir) if f.endswith('.pkl')]
+        if not model_files:
+            return None
+        model_files.sort(key=lambda x: os.path.getmtime(os.path.join(self.models_dir, x)), reverse=True)
+        return os.path.join(self.models_dir, model_files[0])
+
+    def _signature(self):
+        try:
+            return os.stat(self.models_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force=False):
+        """
+        Charge le modèle le plus récent s'il diffère du modèle courant.
+        Retourne True si un nouveau modèle a été publié.
+        """
+        signature = self._signature()
+        if not force and signature == self._dir_signature:
+            return False
+
+        with self._load_lock:
+            path, compressed = self._active_model()
+            if path is None:
+                if self._current is not None or self._dir_signature is None:
+                    logger.warning("Aucun modèle trouvé. Le modèle ML ne sera pas utilisé.")
+                self._current = None
+                self._dir_signature = signature
+                return False
+
+            mtime = os.path.getmtime(path)
+            current = self._current
+            if not force and current is not None and current.path == path and current.mtime == mtime:
+                self._dir_signature = signature
+                return False
+
+            start = time.perf_counter()
+            try:
+                model = self._load_flat(path)
+                if model is None:
+                    with telemetry.span("model_load", kind="global"):
+                        model = joblib.load(path, mmap_mode=None if compressed else self.mmap_mode)
+                predictor = self.prepare(model) if self.prepare is not None else None
+            except Exception as e:
+                # Fichier peut-être en cours d'écriture : on garde l'ancien modèle et on réessaiera
+                logger.error("Erreur lors du chargement du modèle %s : %s", path, e)
+                return False
+            load_seconds = time.perf_counter() - start
+
+            self._current = LoadedModel(model, predictor, path, mtime, load_seconds, datetime.now())
+            self._dir_signature = signature
+            logger.info("Modèle chargé : %s (%.0f ms)", path, load_seconds * 1000)
+
+        if self.on_change is not None:
+            self.on_change(self._current)
+        return True
+
+    def _load_flat(self, path):
+        """Forêt aplatie du modèle `path`, ou None (pas d'export, flat=False, ou export illisible)."""
+        flat_path = forest_path(path)
+        if not self.flat or not os.path.isdir(flat_path):
+            return None
+        try:
+            with telemetry.span("model_load", kind="flat"):
+                return FlatForest.load(flat_path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            logger.warning("Forêt aplatie %s illisible (%s) : chargement du .pkl.", flat_path, e)
+            return None
+
+    def start(self):
+        """Lance la surveillance en arrière-plan (le premier chargement se fait dans ce thread)."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Erreur de surveillance du dossier des modèles : %s", e)
+            self._stop.wait(self.poll_interval)
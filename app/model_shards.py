@@ -0,0 +1,223 @@
+# weather_predictor/app/model_shards.py
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+
+import joblib
+
+from app import telemetry
+from app.flat_forest import FlatForest, export_forest, forest_path, is_exportable
+from app.model_artifacts import COMPRESS, MODELS_DIR
+
+logger = logging.getLogger(__name__)
+
+SHARDS_DIR = os.path.join(MODELS_DIR, 'shards')
+SHARD_INDEX_NAME = 'index.json'
+SHARD_INDEX_VERSION = 1
+# Modèles par ville gardés en mémoire (les moins récemment utilisés sont libérés au-delà)
+CACHE_SIZE = 32
+
+
+def city_key(city_name):
+    """Clé d'une ville dans l'index : espaces normalisés, insensible à la casse."""
+    return " ".join(city_name.split()).casefold()
+
+
+def shard_file_name(key, run):
+    """
+    Nom de fichier d'un modèle de ville : lisible (ASCII), unique (empreinte de la clé) et propre
+    à l'entraînement `run` (horodatage), pour ne jamais écraser un fichier de l'index en service.
+    """
+    ascii_key = unicodedata.normalize('NFKD', key).encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^a-z0-9]+', '-', ascii_key).strip('-')[:40] or 'ville'
+    return f"{slug}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}_{run}.pkl"
+
+
+class ShardIndex:
+    """
+    Modèles par ville de `shards_dir` et leur index (index.json) : clé de ville -> fichier,
+    nombre de lignes, MAE, date, version du schéma de features.
+
+    Comme le manifeste des modèles globaux, l'index est réécrit de façon atomique, après les
+    modèles (et leurs forêts aplaties, app/flat_forest.py). Chaque entraînement écrit ses
+    fichiers sous de nouveaux noms : le remplacement de l'index est le seul basculement, et un
+    lecteur voit l'ancien ou le nouvel ensemble de modèles, jamais un mélange. Les fichiers de
+    l'ancien ensemble sont supprimés après ce remplacement.
+    """
+    def __init__(self, shards_dir=SHARDS_DIR, compress=COMPRESS):
+        self.shards_dir = shards_dir
+        self.compress = compress
+        self.index_path = os.path.join(shards_dir, SHARD_INDEX_NAME)
+
+    def read(self):
+        """Index courant ({'version', 'created_at', 'shards': {clé: entrée}}), ou None."""
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error("Index des modèles par ville illisible (%s).", e)
+            return None
+        return index if index.get('version') == SHARD_INDEX_VERSION else None
+
+    def signature(self):
+        """mtime de l'index (None s'il n'existe pas) : change à chaque nouvel ensemble de modèles."""
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def path(self, entry):
+        return os.path.join(self.shards_dir, entry['file'])
+
+    def save(self, shards):
+        """
+        Remplace l'ensemble des modèles par ville. `shards` : {clé: (modèle, métadonnées)}.
+        Les fichiers de l'ensemble précédent sont supprimés une fois l'index remplacé.
+        Retourne l'index.
+        """
+        os.makedirs(self.shards_dir, exist_ok=True)
+        previous = self.read() or {'shards': {}}
+        run = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        entries = {}
+        for key, (model, meta) in shards.items():
+            file_name = shard_file_name(key, run)
+            path = os.path.join(self.shards_dir, file_name)
+            joblib.dump(model, path + '.tmp', compress=self.compress)
+            os.replace(path + '.tmp', path)
+            flat = is_exportable(model)
+            if flat:
+                export_forest(model, forest_path(path))
+            entries[key] = dict(meta, file=file_name, size_bytes=os.path.getsize(path), flat_forest=flat,
+                                feature_schema=getattr(model, 'feature_schema_', {}).get('version'))
+
+        index = {'version': SHARD_INDEX_VERSION,
+                 'created_at': datetime.now().isoformat(timespec='seconds'),
+                 'shards': entries}
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+        kept = {entry['file'] for entry in entries.values()}
+        for entry in previous['shards'].values():
+            if entry['file'] not in kept:
+                try:
+                    os.remove(self.path(entry))
+                except OSError:
+                    pass
+                shutil.rmtree(forest_path(self.path(entry)), ignore_errors=True)
+        return index
+
+
+class ModelRouter:
+    """
+    Choisit le modèle d'une prédiction selon la ville : le modèle de la ville s'il existe dans
+    l'index, sinon le modèle global du ModelRegistry.
+
+    Les modèles par ville sont chargés à la première demande (forêt aplatie si elle existe,
+    sans sklearn, sinon le .pkl) puis gardés dans un cache LRU de `cache_size` entrées : avec
+    des centaines de villes, seules les plus demandées restent en mémoire. L'index est relu
+    quand son mtime change (un stat par recherche) ; les modèles déjà chargés restent valables
+    tant que leur entrée est inchangée.
+
+    `prepare` (FastPredictor en pratique) construit l'objet de prédiction de chaque modèle ;
+    un modèle qui ne se charge pas est signalé une fois et remplacé par le modèle global.
+    """
+    def __init__(self, registry, shards_dir=SHARDS_DIR, cache_size=CACHE_SIZE, prepare=None):
+        self.registry = registry
+        self.shards = ShardIndex(shards_dir)
+        self.cache_size = cache_size
+        self.prepare = prepare
+        self._entries = {}
+        self._signature = None
+        self._cache = OrderedDict()  # clé -> (entrée de l'index, predictor)
+        self._failed = set()
+        self._lock = threading.Lock()
+        self.stats_counters = {"hits": 0, "misses": 0, "evictions": 0, "fallbacks": 0}
+
+    def _refresh_index(self):
+        signature = self.shards.signature()
+        if signature == self._signature:
+            return
+        index = self.shards.read()
+        self._entries = index['shards'] if index else {}
+        self._signature = signature
+        self._failed.clear()
+        # Modèles chargés dont l'entrée a disparu ou changé : à recharger
+        for key in [k for k, (entry, _) in self._cache.items() if self._entries.get(k) != entry]:
+            del self._cache[key]
+
+    def _load(self, key, entry):
+        path = self.shards.path(entry)
+        try:
+            with telemetry.span("model_load", kind="shard"):
+                if entry.get('flat_forest') and os.path.isdir(forest_path(path)):
+                    model = FlatForest.load(forest_path(path))
+                else:
+                    model = joblib.load(path)
+                return self.prepare(model) if self.prepare is not None else model
+        except Exception as e:
+            logger.error("Erreur lors du chargement du modèle de %s (%s) : %s", key, path, e)
+            return None
+
+    def predictor_for(self, city_name):
+        """
+        (predictor, source) pour `city_name` : source vaut "ville" pour le modèle de la ville,
+        "global" pour le modèle du registre (predictor None si aucun modèle n'est chargé).
+        """
+        key = city_key(city_name) if city_name else None
+        with self._lock:
+            self._refresh_index()
+            entry = self._entries.get(key)
+            if entry is not None and key not in self._failed:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.stats_counters["hits"] += 1
+                    telemetry.incr("shard_lookups", result="hit")
+                    return cached[1], "ville"
+                self.stats_counters["misses"] += 1
+                telemetry.incr("shard_lookups", result="miss")
+                # Chargement sous le verrou : deux recherches simultanées ne chargent pas deux fois le même modèle
+                predictor = self._load(key, entry)
+                if predictor is not None:
+                    self._cache[key] = (entry, predictor)
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                        self.stats_counters["evictions"] += 1
+                    return predictor, "ville"
+                self._failed.add(key)
+            self.stats_counters["fallbacks"] += 1
+            telemetry.incr("shard_lookups", result="fallback")
+        return (self.registry.predictor if self.registry is not None else None), "global"
+
+    def stats(self):
+        with self._lock:
+            return dict(self.stats_counters, shards=len(self._entries), loaded=len(self._cache),
+                        cache_size=self.cache_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modèles par ville : contenu de l'index.")
+    parser.add_argument("--shards-dir", default=SHARDS_DIR)
+    args = parser.parse_args()
+
+    index = ShardIndex(args.shards_dir).read()
+    if index is None:
+        print("Aucun modèle par ville.")
+    else:
+        print(f"{len(index['shards'])} modèles par ville ({index['created_at']})")
+        for key, entry in sorted(index['shards'].items()):
+            mae = f"{entry['mae']:.2f}" if entry.get('mae') is not None else '-'
+            print(f"  {key:<24} {entry['file']:<40} {entry['rows']:>7} lignes  MAE {mae:>5}"
+                  f"  {entry['size_bytes'] / 1024:7.1f} Ko")
@@ -0,0 +1,587 @@
+# weather_predictor/app/observation_store.py
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+# --- Chemins des fichiers et dossiers ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OBSERVATIONS_DIR = os.path.join(BASE_DIR, 'data', 'observations')
+OBSERVATIONS_DB = os.path.join(OBSERVATIONS_DIR, 'observations.db')
+LEGACY_CSV = os.path.join(OBSERVATIONS_DIR, 'temperature_observations.csv')
+
+# Colonnes historiques du CSV, dans l'ordre
+COLUMNS = [
+    'date_enregistrement', 'ville', 'date_prevision',
+    'temp_predite_modele', 'temp_observee_api',
+    'humidity_api', 'pressure_api', 'wind_speed_api'
+]
+NUMERIC_COLUMNS = COLUMNS[3:]
+# Numéro de la passe de resolve_observations qui a renseigné temp_observee_api à partir d'un
+# relevé réel. Vide pour les lignes écrites avec leur « observation » par les anciennes versions
+# (prévision de l'API, ou prédiction affichée du modèle en feature) : inutilisables pour
+# l'entraînement, quelle que soit leur valeur.
+RESOLVED_COLUMN = 'resolved_seq'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_enregistrement TEXT NOT NULL,
+    ville TEXT NOT NULL COLLATE NOCASE,
+    date_prevision TEXT NOT NULL,
+    temp_predite_modele REAL,
+    temp_observee_api REAL,
+    humidity_api REAL,
+    pressure_api REAL,
+    wind_speed_api REAL,
+    resolved_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_observations_ville_date ON observations (ville, date_prevision);
+CREATE INDEX IF NOT EXISTS idx_observations_date ON observations (date_prevision);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS actuals (
+    ville TEXT NOT NULL COLLATE NOCASE,
+    date TEXT NOT NULL,
+    temp_max REAL,
+    temp_min REAL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (ville, date)
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date_enregistrement TEXT NOT NULL,
+    ville TEXT NOT NULL COLLATE NOCASE,
+    date_prevision TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    modele TEXT NOT NULL,
+    temp_predite REAL NOT NULL,
+    temp_api REAL,
+    temp_observee REAL,
+    evaluated INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_pending ON predictions (ville, date_prevision) WHERE evaluated = 0;
+CREATE TABLE IF NOT EXISTS prediction_errors (
+    modele TEXT NOT NULL,
+    ville TEXT NOT NULL COLLATE NOCASE,
+    horizon INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    abs_error REAL NOT NULL,
+    error REAL NOT NULL,
+    n_api INTEGER NOT NULL,
+    abs_error_api REAL NOT NULL,
+    PRIMARY KEY (modele, ville, horizon, date)
+);
+"""
+
+# Relevés minimum d'un jour local avant d'en faire une étiquette : un seul relevé (recherche
+# isolée, collecteur lancé en soirée) ne donne le maximum que d'une partie de la journée.
+# 6 relevés = les trois quarts des passages d'un collecteur toutes les 3 h.
+MIN_ACTUAL_SAMPLES = 6
+
+# Colonnes écrites par record_predictions, dans l'ordre
+PREDICTION_COLUMNS = ['date_enregistrement', 'ville', 'date_prevision', 'horizon', 'modele', 'temp_predite', 'temp_api']
+
+# Prédictions en attente dont le jour est terminé (relevé d'un jour postérieur pour la ville)
+RESOLVED_PREDICTION = """
+    evaluated = 0 AND temp_observee IS NULL
+    AND EXISTS (
+        SELECT 1 FROM actuals a
+        WHERE a.ville = predictions.ville AND a.date = predictions.date_prevision AND a.temp_max IS NOT NULL
+          AND a.samples >= :min_samples
+    )
+    AND EXISTS (
+        SELECT 1 FROM actuals later
+        WHERE later.ville = predictions.ville AND later.date > predictions.date_prevision
+    )
+"""
+
+# Erreurs des prédictions résolues et pas encore comptées, ajoutées aux agrégats par jour
+AGGREGATE_ERRORS = """
+INSERT INTO prediction_errors (modele, ville, horizon, date, n, abs_error, error, n_api, abs_error_api)
+SELECT modele, ville, horizon, date_prevision, COUNT(*),
+       SUM(ABS(temp_predite - temp_observee)), SUM(temp_predite - temp_observee),
+       COUNT(temp_api), COALESCE(SUM(ABS(temp_api - temp_observee)), 0)
+FROM predictions
+WHERE evaluated = 0 AND temp_observee IS NOT NULL
+GROUP BY modele, ville, horizon, date_prevision
+ON CONFLICT (modele, ville, horizon, date) DO UPDATE SET
+    n = n + excluded.n,
+    abs_error = abs_error + excluded.abs_error,
+    error = error + excluded.error,
+    n_api = n_api + excluded.n_api,
+    abs_error_api = abs_error_api + excluded.abs_error_api
+"""
+
+# Un relevé fusionné avec ceux déjà reçus pour la même ville et le même jour local
+UPSERT_ACTUAL = """
+INSERT INTO actuals (ville, date, temp_max, temp_min, samples, updated_at) VALUES (?, ?, ?, ?, 1, ?)
+ON CONFLICT (ville, date) DO UPDATE SET
+    temp_max = MAX(COALESCE(temp_max, excluded.temp_max), excluded.temp_max),
+    temp_min = MIN(COALESCE(temp_min, excluded.temp_min), excluded.temp_min),
+    samples = samples + 1,
+    updated_at = excluded.updated_at
+"""
+
+
+def _to_float(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def _to_int(value):
+    if value is None or value == '':
+        return None
+    return int(float(value))
+
+
+def _date_str(value):
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+class ObservationStore:
+    """
+    Stockage des observations dans SQLite en mode WAL.
+
+    - Écritures mises en tampon (`append`) et écrites par lots dans une seule transaction
+      (`flush`, automatique quand le tampon atteint `buffer_size`).
+    - Plusieurs écrivains sûrs (GUI, collecteurs, autres processus) : une connexion par thread,
+      WAL (les lecteurs ne bloquent pas l'écrivain) et busy_timeout pour attendre le verrou.
+      `close` ferme les connexions de tous les threads ; un thread qui réutilise ensuite le
+      store en rouvre une.
+    - Lectures indexées par ville (insensible à la casse) et intervalle de dates de prévision.
+    - Table `actuals` : températures réellement relevées par ville et jour local (extrêmes des
+      relevés successifs), qui renseignent temp_observee_api une fois le jour terminé.
+    - Table `predictions` : prédictions du modèle (ville, jour, horizon, modèle), comparées aux
+      relevés réels par evaluate_predictions ; erreurs agrégées par jour dans `prediction_errors`.
+    """
+    def __init__(self, db_path=OBSERVATIONS_DB, buffer_size=256, busy_timeout=30.0):
+        self.db_path = db_path
+        self.buffer_size = buffer_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = set()  # Connexions de tous les threads, fermées par close()
+        self._connections_lock = threading.Lock()
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn not in self._connections:  # Jamais ouverte, ou fermée par close()
+            # check_same_thread=False : seul close() la ferme depuis un autre thread
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Sûr en WAL, un fsync par checkpoint
+            with self._connections_lock:
+                self._connections.add(conn)
+            self._local.conn = conn
+        return conn
+
+    def _upgrade_schema(self):
+        """
+        Ajoute resolved_seq à une base créée avant son introduction. Les lignes déjà résolues
+        depuis `actuals` (observation égale au relevé de la ville et du jour) sont marquées comme
+        issues de la passe 1 ; les autres lignes étiquetées restent des lignes historiques.
+        """
+        conn = self._connection()
+        with conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(observations)")]
+            if RESOLVED_COLUMN not in columns:
+                conn.execute(f"ALTER TABLE observations ADD COLUMN {RESOLVED_COLUMN} INTEGER")
+                conn.execute(f"""
+                    UPDATE observations SET {RESOLVED_COLUMN} = 1
+                    WHERE temp_observee_api IS NOT NULL AND EXISTS (
+                        SELECT 1 FROM actuals a
+                        WHERE a.ville = observations.ville AND a.date = observations.date_prevision
+                          AND a.temp_max = observations.temp_observee_api
+                    )
+                """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_observations_resolved ON observations ({RESOLVED_COLUMN})")
+
+    # --- Écriture ---
+
+    def _normalize(self, row):
+        if isinstance(row, dict):
+            row = [row.get(column) for column in COLUMNS]
+        row = list(row)
+        if row[0] is None:
+            row[0] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row[2] = _date_str(row[2])
+        row[3:] = [_to_float(v) for v in row[3:]]
+        return row
+
+    def append(self, row):
+        """
+        Ajoute une observation au tampon. `row` est un dict (clés de COLUMNS) ou une séquence
+        dans l'ordre de COLUMNS ; date_enregistrement vaut maintenant si absente.
+        """
+        row = self._normalize(row)
+        with self._buffer_lock:
+            self._buffer.append(row)
+            should_flush = len(self._buffer) >= self.buffer_size
+        if should_flush:
+            self.flush()
+
+    def append_many(self, rows, flush=True):
+        for row in rows:
+            self.append(row)
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Écrit le tampon en une seule transaction. Retourne le nombre de lignes écrites."""
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        conn = self._connection()
+        try:
+            with telemetry.span("db_write", op="flush"), conn:
+                conn.executemany(
+                    f"INSERT INTO observations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows,
+                )
+            telemetry.incr("db_rows_written", len(rows), table="observations")
+        except Exception:
+            # Remettre les lignes en tête du tampon pour ne rien perdre
+            with self._buffer_lock:
+                self._buffer[:0] = rows
+            raise
+        return len(rows)
+
+    def write_batch(self, rows=(), actuals=(), meta=None, predictions=()):
+        """
+        Écrit en une seule transaction des observations (comme `append`), des relevés réels
+        (ville, date, temp_max, temp_min), des prédictions (comme `record_predictions`) et des
+        métadonnées : tout ou rien, ce qui permet à un collecteur d'enregistrer sa progression
+        avec les données qu'elle couvre.
+        """
+        rows = [self._normalize(row) for row in rows]
+        predictions = self._prediction_rows(predictions)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connection()
+        with telemetry.span("db_write", op="batch"), conn:
+            if rows:
+                conn.executemany(
+                    f"INSERT INTO observations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows,
+                )
+            if actuals:
+                conn.executemany(UPSERT_ACTUAL, [
+                    (city, _date_str(day), _to_float(temp_max), _to_float(temp_min), now)
+                    for city, day, temp_max, temp_min in actuals
+                ])
+            if predictions:
+                conn.executemany(
+                    f"INSERT INTO predictions ({', '.join(PREDICTION_COLUMNS)}) VALUES ({', '.join('?' * len(PREDICTION_COLUMNS))})",
+                    predictions,
+                )
+            if meta:
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [(key, str(value)) for key, value in meta.items()])
+        telemetry.incr("db_rows_written", len(rows), table="observations")
+        telemetry.incr("db_rows_written", len(actuals), table="actuals")
+        telemetry.incr("db_rows_written", len(predictions), table="predictions")
+        return len(rows)
+
+    def resolve_observations(self, min_samples=MIN_ACTUAL_SAMPLES):
+        """
+        Renseigne temp_observee_api (quand il est vide) avec la température maximale relevée
+        pour la ville et la date de prévision. Un jour n'est utilisé qu'une fois terminé, c'est-à-dire
+        quand un relevé d'un jour local postérieur existe pour la même ville, et s'il compte au
+        moins `min_samples` relevés (sinon son maximum ne couvre qu'une partie de la journée et
+        sous-estime la température ; l'observation reste sans étiquette). Les lignes mises à
+        jour reçoivent le numéro de la passe (resolved_seq, croissant) : seules ces lignes servent
+        à l'entraînement. Retourne le nombre d'observations mises à jour.
+        """
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("""
+                UPDATE observations
+                SET temp_observee_api = (
+                    SELECT a.temp_max FROM actuals a
+                    WHERE a.ville = observations.ville AND a.date = observations.date_prevision
+                ),
+                resolved_seq = (SELECT COALESCE(MAX(resolved_seq), 0) + 1 FROM observations)
+                WHERE temp_observee_api IS NULL
+                  AND EXISTS (
+                    SELECT 1 FROM actuals a
+                    WHERE a.ville = observations.ville AND a.date = observations.date_prevision
+                      AND a.temp_max IS NOT NULL AND a.samples >= :min_samples
+                  )
+                  AND EXISTS (
+                    SELECT 1 FROM actuals later
+                    WHERE later.ville = observations.ville AND later.date > observations.date_prevision
+                  )
+            """, {'min_samples': min_samples})
+        return cursor.rowcount
+
+    # --- Évaluation continue ---
+
+    @staticmethod
+    def _prediction_rows(rows):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return [
+            (recorded_at or now, city, _date_str(day), int(horizon), model, float(predicted), _to_float(api))
+            for recorded_at, city, day, horizon, model, predicted, api in rows
+            if predicted is not None
+        ]
+
+    def record_predictions(self, rows):
+        """
+        Enregistre des prédictions du modèle, en une transaction : séquences dans l'ordre de
+        PREDICTION_COLUMNS (date_enregistrement vaut maintenant si absente). Les lignes sans
+        prédiction (temp_predite None) sont ignorées. Retourne le nombre de lignes écrites.
+        """
+        rows = self._prediction_rows(rows)
+        if not rows:
+            return 0
+        conn = self._connection()
+        with telemetry.span("db_write", op="predictions"), conn:
+            conn.executemany(
+                f"INSERT INTO predictions ({', '.join(PREDICTION_COLUMNS)}) VALUES ({', '.join('?' * len(PREDICTION_COLUMNS))})",
+                rows,
+            )
+        telemetry.incr("db_rows_written", len(rows), table="predictions")
+        return len(rows)
+
+    def evaluate_predictions(self, expire_days=30, min_samples=MIN_ACTUAL_SAMPLES):
+        """
+        Compare les nouvelles prédictions aux relevés réels, de façon incrémentale : seules les
+        prédictions en attente (evaluated = 0, index partiel) sont lues.
+
+        Une prédiction dont le jour est terminé et relevé au moins `min_samples` fois (comme pour
+        resolve_observations) reçoit la température maximale relevée, puis son erreur est ajoutée
+        aux agrégats de `prediction_errors` (modèle, ville, horizon, jour) et elle est marquée
+        évaluée ; celles restées sans relevé suffisant `expire_days` jours après la date prévue
+        (ville jamais relevée) sont abandonnées (evaluated = -1). Une seule transaction.
+        Retourne {"resolved", "evaluated", "expired"}.
+        """
+        cutoff = (date.today() - timedelta(days=expire_days)).isoformat()
+        conn = self._connection()
+        with telemetry.span("evaluate_predictions"), conn:
+            resolved = conn.execute(f"""
+                UPDATE predictions
+                SET temp_observee = (
+                    SELECT a.temp_max FROM actuals a
+                    WHERE a.ville = predictions.ville AND a.date = predictions.date_prevision
+                )
+                WHERE {RESOLVED_PREDICTION}
+            """, {'min_samples': min_samples}).rowcount
+            conn.execute(AGGREGATE_ERRORS)
+            evaluated = conn.execute(
+                "UPDATE predictions SET evaluated = 1 WHERE evaluated = 0 AND temp_observee IS NOT NULL"
+            ).rowcount
+            expired = conn.execute(
+                "UPDATE predictions SET evaluated = -1 WHERE evaluated = 0 AND temp_observee IS NULL AND date_prevision < ?",
+                (cutoff,),
+            ).rowcount
+        telemetry.incr("predictions_evaluated", evaluated)
+        return {"resolved": resolved, "evaluated": evaluated, "expired": expired}
+
+    def prediction_errors(self, start=None, model=None, by=('ville', 'horizon')):
+        """
+        Erreurs des prédictions évaluées depuis le jour `start` (inclus), regroupées par les
+        colonnes `by` (parmi modele, ville, horizon, date ; () pour un total) : n, mae, biais
+        (prédiction - relevé, positif = surestimation) et mae_api (prévision brute de l'API sur
+        les mêmes jours). Filtre optionnel sur le modèle. DataFrame.
+        """
+        unknown = set(by) - {'modele', 'ville', 'horizon', 'date'}
+        if unknown:
+            raise ValueError(f"Regroupement inconnu : {', '.join(sorted(unknown))}")
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(_date_str(start))
+        if model is not None:
+            clauses.append("modele = ?")
+            params.append(model)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        group = f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}" if by else ""
+        select = ''.join(f"{column}, " for column in by)
+        return pd.read_sql_query(
+            f"SELECT {select}SUM(n) AS n, SUM(abs_error) / SUM(n) AS mae, SUM(error) / SUM(n) AS biais, "
+            f"SUM(abs_error_api) / NULLIF(SUM(n_api), 0) AS mae_api "
+            f"FROM prediction_errors{where}{group}",
+            self._connection(), params=params,
+        )
+
+    # --- Lecture ---
+
+    def _where(self, city=None, start=None, end=None, min_id=None, resolved=False, resolved_range=None):
+        clauses, params = [], []
+        if resolved:
+            clauses.append(f"{RESOLVED_COLUMN} IS NOT NULL")
+        if resolved_range is not None:
+            clauses.append(f"{RESOLVED_COLUMN} > ? AND {RESOLVED_COLUMN} <= ?")
+            params.extend(resolved_range)
+        if city is not None:
+            clauses.append("ville = ?")
+            params.append(city)
+        if start is not None:
+            clauses.append("date_prevision >= ?")
+            params.append(_date_str(start))
+        if end is not None:
+            clauses.append("date_prevision <= ?")
+            params.append(_date_str(end))
+        if min_id is not None:
+            clauses.append("id > ?")
+            params.append(min_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def read(self, city=None, start=None, end=None, min_id=None, with_id=False, resolved=False,
+             resolved_range=None):
+        """
+        Retourne les observations sous forme de DataFrame (colonnes de COLUMNS, plus `id` si
+        with_id). Filtres optionnels : ville, dates de prévision [start, end], id > min_id, et
+        avec resolved les seules lignes étiquetées par un relevé réel (entraînement) ;
+        resolved_range=(après, jusqu'à) ne garde que les lignes résolues par les passes
+        après < resolved_seq <= jusqu'à (entraînement incrémental, voir max_resolved_seq).
+        """
+        where, params = self._where(city, start, end, min_id, resolved, resolved_range)
+        columns = (['id'] if with_id else []) + COLUMNS
+        return pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM observations{where} ORDER BY id",
+            self._connection(), params=params,
+        )
+
+    def iter_chunks(self, chunk_size=100_000, min_id=None, resolved=False, resolved_range=None):
+        """
+        Parcourt les observations par id croissant, `chunk_size` lignes à la fois, sans jamais
+        tout charger : un seul curseur SQLite lu par fetchmany. Chaque tranche est une liste de
+        tuples (id, *COLUMNS). `resolved` et `resolved_range` comme pour read.
+        """
+        where, params = self._where(min_id=min_id, resolved=resolved, resolved_range=resolved_range)
+        cursor = self._connection().execute(
+            f"SELECT id, {', '.join(COLUMNS)} FROM observations{where} ORDER BY id", params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+    def read_actuals(self, city=None, start=None, end=None):
+        """Relevés réels (ville, date, temp_max, temp_min, samples, updated_at) sous forme de DataFrame."""
+        clauses, params = [], []
+        if city is not None:
+            clauses.append("ville = ?")
+            params.append(city)
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(_date_str(start))
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(_date_str(end))
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return pd.read_sql_query(f"SELECT * FROM actuals{where} ORDER BY ville, date", self._connection(), params=params)
+
+    def count(self, city=None, start=None, end=None, resolved=False, resolved_range=None):
+        """Nombre d'observations ; `resolved` et `resolved_range` comme pour read."""
+        where, params = self._where(city, start, end, resolved=resolved, resolved_range=resolved_range)
+        return self._connection().execute(f"SELECT COUNT(*) FROM observations{where}", params).fetchone()[0]
+
+    def max_resolved_seq(self):
+        """
+        Dernière passe de résolution (0 si aucune). Les lignes résolues plus tard auront un
+        numéro supérieur, quel que soit leur id : c'est le repère de l'entraînement incrémental.
+        """
+        return self._connection().execute(
+            f"SELECT COALESCE(MAX({RESOLVED_COLUMN}), 0) FROM observations").fetchone()[0]
+
+    def max_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM observations").fetchone()[0]
+
+    # --- Métadonnées et migration ---
+
+    def get_meta(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def migrate_csv(self, csv_path=LEGACY_CSV, force=False):
+        """
+        Importe une seule fois un CSV au schéma historique. La migration est enregistrée dans
+        la table meta : un second appel ne réimporte rien (sauf force=True). La vérification et
+        l'import forment une seule transaction BEGIN IMMEDIATE : deux processus lancés ensemble
+        n'importent pas deux fois le fichier. Le CSV est lu ligne à ligne.
+        Une colonne resolved_seq facultative est reprise telle quelle ; sans elle, les lignes
+        sont historiques (non utilisées pour l'entraînement).
+        Retourne le nombre de lignes importées.
+        """
+        key = f"csv_migrated:{os.path.abspath(csv_path)}"
+        if not os.path.exists(csv_path):
+            return 0
+
+        columns = COLUMNS + [RESOLVED_COLUMN]
+        conn = self._connection()
+        with conn, open(csv_path, newline='', encoding='utf-8') as f:
+            conn.execute("BEGIN IMMEDIATE")  # Verrou d'écriture avant de consulter meta
+            done = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            if done and not force:
+                return 0
+            rows = ([record.get(column) or None for column in columns] for record in csv.DictReader(f))
+            imported = conn.executemany(
+                f"INSERT INTO observations ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                (row[:3] + [_to_float(v) for v in row[3:-1]] + [_to_int(row[-1])] for row in rows),
+            ).rowcount
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (key, datetime.now().isoformat(timespec='seconds')))
+        logger.info("%d observations importées depuis %s.", imported, csv_path)
+        return imported
+
+    def close(self):
+        """Écrit le tampon puis ferme les connexions de tous les threads."""
+        self.flush()
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def open_default_store(**kwargs):
+    """Ouvre la base par défaut en important l'ancien CSV au premier lancement."""
+    store = ObservationStore(**kwargs)
+    store.migrate_csv(LEGACY_CSV)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion de la base d'observations.")
+    parser.add_argument("command", choices=["migrate", "stats"])
+    parser.add_argument("--csv", default=LEGACY_CSV, help="CSV à importer (schéma historique)")
+    parser.add_argument("--db", default=OBSERVATIONS_DB)
+    parser.add_argument("--force", action="store_true", help="Réimporter même si déjà fait")
+    args = parser.parse_args()
+
+    store = ObservationStore(args.db)
+    if args.command == "migrate":
+        n = store.migrate_csv(args.csv, force=args.force)
+        if n == 0:
+            print("Rien à importer (déjà migré ou fichier absent).")
+    print(f"{store.count()} observations dans {args.db}")
+    store.close()
@@ -0,0 +1,287 @@
+# weather_predictor/app/payload_archive.py
+"""
+Archive des réponses brutes de l'API et rejeu hors ligne.
+
+- PayloadRecorder : enregistre chaque réponse /forecast et /weather reçue du réseau, telle
+  quelle, en JSON lines compressées (gzip) : un fichier par endpoint et par jour de
+  récupération (UTC), une ligne par réponse {"city", "units", "lang", "fetched_at", "payload"}.
+  Activé pour le client partagé par WEATHER_RECORD_DIR=<dossier> (app/weather_api.py).
+- replay_observations : reconstruit une base d'observations à partir de l'archive, en lots
+  (parse_forecast_payloads), de façon déterministe ; de nouvelles features (horizon J+5,
+  températures minimales...) se dérivent ainsi de l'historique sans rappeler l'API.
+- ReplayClient : remplace WeatherClient en servant les réponses archivées (tests et
+  benchmarks hors ligne, ou WEATHER_REPLAY_DIR=<dossier> pour toute l'application).
+
+    python -m app.payload_archive stats
+    python -m app.payload_archive replay --db data/observations/replay.db
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+import requests
+
+from app import telemetry
+from app.features import MAX_HORIZON
+from app.observation_store import BASE_DIR, MIN_ACTUAL_SAMPLES, ObservationStore
+from app.weather_api import parse_current, parse_forecast_payloads
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join(BASE_DIR, 'data', 'payloads')
+ENDPOINTS = ('forecast', 'weather')
+BUFFER_SIZE = 64          # Réponses gardées en mémoire avant écriture
+FLUSH_INTERVAL = 60.0     # Écriture au plus tard N secondes après la première réponse en attente
+COMPRESS_LEVEL = 6
+REPLAY_BATCH = 2000       # Payloads analysés ensemble lors du rejeu
+
+
+def archive_path(archive_dir, endpoint, fetched_at):
+    day = datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y%m%d')
+    return os.path.join(archive_dir, f"{endpoint}-{day}.jsonl.gz")
+
+
+class PayloadRecorder:
+    """
+    Enregistre les réponses brutes dans `archive_dir`, par lots : chaque écriture ajoute un
+    membre gzip complet au fichier du jour (un fichier gzip peut en contenir plusieurs). Un
+    arrêt brutal ne perd que les réponses encore en mémoire, jamais le début du fichier.
+    Utilisable depuis plusieurs threads.
+    """
+    def __init__(self, archive_dir=ARCHIVE_DIR, buffer_size=BUFFER_SIZE, flush_interval=FLUSH_INTERVAL,
+                 compresslevel=COMPRESS_LEVEL):
+        self.archive_dir = archive_dir
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.compresslevel = compresslevel
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def record(self, endpoint, city, payload, fetched_at=None, units="metric", lang="fr"):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        line = json.dumps({'city': city, 'units': units, 'lang': lang, 'fetched_at': fetched_at,
+                           'payload': payload}, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._buffer.append((archive_path(self.archive_dir, endpoint, fetched_at), line))
+            self.recorded += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            should_flush = (len(self._buffer) >= self.buffer_size
+                            or time.monotonic() - self._oldest >= self.flush_interval)
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Écrit les réponses en attente. Retourne leur nombre."""
+        with self._lock:
+            pending, self._buffer, self._oldest = self._buffer, [], None
+            if not pending:
+                return 0
+            by_file = {}
+            for path, line in pending:
+                by_file.setdefault(path, []).append(line)
+            with telemetry.span("payload_archive_write"):
+                for path, lines in by_file.items():
+                    with gzip.open(path, 'ab', compresslevel=self.compresslevel) as f:
+                        f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        return len(pending)
+
+    def close(self):
+        self.flush()
+
+
+def archive_files(archive_dir=ARCHIVE_DIR, endpoint='forecast'):
+    """Fichiers de l'archive pour `endpoint`, dans l'ordre chronologique."""
+    return sorted(glob.glob(os.path.join(archive_dir, f"{endpoint}-*.jsonl.gz")))
+
+
+def iter_records(archive_dir=ARCHIVE_DIR, endpoint='forecast', cities=None, start=None, end=None):
+    """
+    Réponses archivées (dicts) de `endpoint`, fichier par fichier et triées par
+    (fetched_at, ville) dans chaque fichier. Filtres optionnels : villes (insensible à la
+    casse) et intervalle [start, end) d'horodatages Unix. Une fin de fichier tronquée (arrêt
+    pendant une écriture) est ignorée avec un avertissement.
+    """
+    wanted = {c.casefold() for c in cities} if cities else None
+    for path in archive_files(archive_dir, endpoint):
+        records = []
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    records.append(json.loads(line))
+        except (EOFError, OSError, zlib.error, ValueError) as e:
+            logger.warning("Archive %s tronquée ou illisible après %d réponses (%s).", path, len(records), e)
+        records.sort(key=lambda r: (r['fetched_at'], r['city'].casefold()))
+        for record in records:
+            if wanted is not None and record['city'].casefold() not in wanted:
+                continue
+            if (start is not None and record['fetched_at'] < start) or (end is not None and record['fetched_at'] >= end):
+                continue
+            yield record
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def observation_rows(records, max_horizon=MAX_HORIZON):
+    """
+    Lignes d'observation (ordre de COLUMNS) d'un lot de réponses /forecast, comme le
+    collecteur : prévision J+1..J+max_horizon de l'API en temp_predite_modele, réel à venir.
+    """
+    if not records:
+        return []
+    daily = parse_forecast_payloads([r['payload'] for r in records],
+                                    fetched_at=[int(r['fetched_at']) for r in records])
+    daily = daily[(daily['horizon'] >= 1) & (daily['horizon'] <= max_horizon) & daily['temp_max'].notna()]
+    recorded_at = [datetime.fromtimestamp(r['fetched_at']).strftime('%Y-%m-%d %H:%M:%S') for r in records]
+    cities = [r['city'] for r in records]
+    dates = daily['date'].dt.strftime('%Y-%m-%d').tolist()
+    return [
+        [recorded_at[i], cities[i], day, temp_max, None, humidity, pressure, wind_speed]
+        for i, day, temp_max, humidity, pressure, wind_speed in zip(
+            daily['payload'].tolist(), dates, daily['temp_max'].tolist(), daily['humidity'].tolist(),
+            daily['pressure'].tolist(), daily['wind_speed'].tolist())
+    ]
+
+
+def replay_observations(store, archive_dir=ARCHIVE_DIR, max_horizon=MAX_HORIZON, cities=None, start=None, end=None,
+                        batch_size=REPLAY_BATCH, min_samples=MIN_ACTUAL_SAMPLES):
+    """
+    Reconstruit les observations de `store` à partir de l'archive : prévisions en lots de
+    `batch_size` réponses (une transaction par lot), puis relevés réels (/weather) et
+    résolution des températures observées (jours relevés au moins `min_samples` fois, comme
+    pour le collecteur). Retourne des statistiques.
+    """
+    started = time.perf_counter()
+    stats = {'payloads': 0, 'observations': 0, 'actuals': 0}
+    for batch in _batches(iter_records(archive_dir, 'forecast', cities, start, end), batch_size):
+        with telemetry.span("replay_batch"):
+            rows = observation_rows(batch, max_horizon)
+            store.write_batch(rows)
+        stats['payloads'] += len(batch)
+        stats['observations'] += len(rows)
+
+    for batch in _batches(iter_records(archive_dir, 'weather', cities, start, end), batch_size):
+        actuals = []
+        for record in batch:
+            try:
+                day = parse_current(record['payload'])
+            except (KeyError, TypeError):
+                continue
+            actuals.append((record['city'], day['date'], day['temp_max'], day['temp_min']))
+        store.write_batch(actuals=actuals)
+        stats['actuals'] += len(actuals)
+
+    stats['resolved'] = store.resolve_observations(min_samples)
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['payloads_per_s'] = round(stats['payloads'] / stats['seconds']) if stats['seconds'] else None
+    return stats
+
+
+class ReplayClient:
+    """
+    Remplaçant hors ligne de WeatherClient : fetch_forecast / fetch_current renvoient la
+    dernière réponse archivée de la ville (récupérée au plus tard à `as_of`, si fourni).
+    Une ville absente de l'archive donne une HTTPError 404, comme l'API pour une ville inconnue.
+
+    Les réponses sont indexées en mémoire à la création (filtrées par `cities` si fourni).
+    """
+    offline = True
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, as_of=None, cities=None):
+        self.archive_dir = archive_dir
+        self.as_of = as_of
+        self._index = {endpoint: {} for endpoint in ENDPOINTS}
+        for endpoint in ENDPOINTS:
+            for record in iter_records(archive_dir, endpoint, cities, end=None if as_of is None else as_of + 1e-6):
+                key = " ".join(record['city'].split()).casefold()
+                self._index[endpoint][key] = record  # Triées par date : la dernière l'emporte
+        self.requests = 0
+
+    def _lookup(self, endpoint, city_name):
+        self.requests += 1
+        record = self._index[endpoint].get(" ".join(city_name.split()).casefold())
+        if record is None:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.exceptions.HTTPError(f"404 : {city_name} absent de l'archive ({endpoint})", response=response)
+        return record['payload']
+
+    def cities(self, endpoint='forecast'):
+        return sorted(self._index[endpoint])
+
+    def fetch_forecast(self, city_name, units="metric", lang="fr"):
+        return self._lookup('forecast', city_name)
+
+    def fetch_current(self, city_name, units="metric", lang="fr"):
+        return self._lookup('weather', city_name)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive des réponses brutes de l'API et rejeu hors ligne.")
+    parser.add_argument("command", choices=["stats", "replay"])
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--db", default=os.path.join(BASE_DIR, 'data', 'observations', 'replay.db'),
+                        help="replay : base à reconstruire")
+    parser.add_argument("--overwrite", action="store_true", help="replay : remplacer la base si elle existe")
+    parser.add_argument("--max-horizon", type=int, default=MAX_HORIZON, help="replay : jours de prévision (J+1..J+N)")
+    parser.add_argument("--cities", default=None, help="Villes séparées par des virgules")
+    parser.add_argument("--min-samples", type=int, default=MIN_ACTUAL_SAMPLES,
+                        help="replay : relevés d'un jour nécessaires avant de le résoudre")
+    args = parser.parse_args()
+    telemetry.configure_from_env()
+    cities = [c.strip() for c in args.cities.split(',') if c.strip()] if args.cities else None
+
+    if args.command == "stats":
+        for endpoint in ENDPOINTS:
+            files = archive_files(args.archive_dir, endpoint)
+            size = sum(os.path.getsize(path) for path in files)
+            count = sum(1 for _ in iter_records(args.archive_dir, endpoint, cities))
+            print(f"{endpoint:<9} {len(files):>4} fichiers  {count:>8} réponses  {size / 1024 / 1024:8.1f} Mo")
+        return
+
+    if os.path.exists(args.db):
+        if not args.overwrite:
+            parser.error(f"{args.db} existe déjà (--overwrite pour le reconstruire)")
+        for path in (args.db, args.db + '-wal', args.db + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+    store = ObservationStore(args.db)
+    try:
+        stats = replay_observations(store, args.archive_dir, args.max_horizon, cities, min_samples=args.min_samples)
+    finally:
+        store.close()
+    print(f"Base reconstruite : {args.db}")
+    print(f"{stats['payloads']} réponses -> {stats['observations']} observations, {stats['actuals']} relevés réels, "
+          f"{stats['resolved']} résolues en {stats['seconds']}s ({stats['payloads_per_s']} réponses/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# weather_predictor/app/service.py
+"""
+Service HTTP de prévision, sans interface graphique ni PyQt.
+
+    python -m app.service --port 8080 --workers 8
+    curl "http://127.0.0.1:8080/forecast?city=Lyon"
+
+Routes (GET, réponses JSON) :
+- /forecast?city=<ville> : données API et prédictions du modèle pour chaque jour ;
+- /health : état du service et du modèle ;
+- /stats : compteurs du service et du cache de prévisions ;
+- /metrics : mesures de app/telemetry.py au format texte Prometheus (si activées).
+
+Un seul modèle (ModelRegistry + FastPredictor, rechargé à chaud) et un seul cache
+(weather_api.forecast_cache) sont partagés par tous les workers. Les requêtes simultanées
+pour une même ville sont regroupées : une seule recherche en amont, dont le résultat est
+renvoyé à toutes.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from app import telemetry
+from app.forecast import ForecastEngine
+from app.inference import FastPredictor
+from app.model_registry import ModelRegistry
+from app.model_shards import ModelRouter
+from app.weather_api import forecast_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
+
+# Taille maximale de la ligne de requête et des en-têtes acceptés
+MAX_HEADER_BYTES = 16 * 1024
+ROUTES = ("/forecast", "/health", "/stats", "/metrics")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 502: "Bad Gateway"}
+
+
+class ForecastService:
+    """
+    Serveur HTTP asyncio minimal autour d'un ForecastEngine.
+
+    Les recherches (bloquantes : réseau, modèle, SQLite) s'exécutent dans un pool de
+    `workers` threads ; la boucle asyncio ne fait que lire les requêtes et écrire les réponses.
+    `engine` permet d'injecter un moteur existant (tests, benchmarks) ; sinon un registre de
+    modèles est créé sur `models_dir`, et les observations ne sont sauvegardées que si `store`
+    est fourni.
+    """
+    def __init__(self, host="127.0.0.1", port=8080, workers=8, engine=None, models_dir=MODELS_DIR, store=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self._owns_registry = engine is None
+        if engine is None:
+            registry = ModelRegistry(models_dir, prepare=FastPredictor)
+            router = ModelRouter(registry, os.path.join(models_dir, 'shards'), prepare=FastPredictor)
+            engine = ForecastEngine(registry, store, router)
+        self.engine = engine
+        self._executor = None
+        self._server = None
+        self._in_flight = {}  # Ville normalisée -> Future de la recherche en cours
+        self.started_at = None
+        self.stats_counters = {"requests": 0, "forecasts": 0, "coalesced": 0, "errors": 0}
+
+    # --- Cycle de vie ---
+
+    async def start(self):
+        if self._owns_registry:
+            self.engine.registry.refresh()  # Premier chargement avant d'accepter des requêtes
+            self.engine.registry.start()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="forecast-service")
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # Port réel si port=0
+        self.started_at = time.time()
+        logger.info("Service de prévision à l'écoute sur http://%s:%d", self.host, self.port)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._owns_registry:
+            self.engine.registry.stop(timeout=1)
+        if self.engine.store is not None:
+            self.engine.store.close()
+
+    # --- Recherche regroupée ---
+
+    async def forecast(self, city_name):
+        """
+        Recherche pour une ville ; les appels simultanés pour la même ville partagent
+        la même recherche en amont.
+        """
+        key = city_name.strip().lower()
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats_counters["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self.engine.compute, city_name)
+        self._in_flight[key] = future
+        self.stats_counters["forecasts"] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    # --- Routes ---
+
+    async def _route(self, method, target):
+        if method != "GET":
+            return 405, {"error": "Seule la méthode GET est acceptée."}
+        url = urlsplit(target)
+        if url.path == "/forecast":
+            city = parse_qs(url.query).get("city", [""])[0].strip()
+            if not city:
+                return 400, {"error": "Paramètre 'city' manquant."}
+            result = await self.forecast(city)
+            if result is None:
+                return 502, {"error": f"Pas de données météo pour {city}."}
+            return 200, self._forecast_body(city, result)
+        if url.path == "/health":
+            loaded = self.engine.registry.current() if self.engine.registry is not None else None
+            return 200, {
+                "status": "ok",
+                "model_loaded": loaded is not None,
+                "model_path": os.path.basename(loaded.path) if loaded is not None else None,
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+            }
+        if url.path == "/stats":
+            return 200, {"service": dict(self.stats_counters, in_flight=len(self._in_flight)),
+                         "cache": forecast_cache.stats(),
+                         "shards": self.engine.router.stats() if self.engine.router is not None else None}
+        if url.path == "/metrics":
+            if not telemetry.is_enabled():
+                return 404, {"error": "Mesures désactivées (WEATHER_METRICS=1 pour les activer)."}
+            return 200, telemetry.metrics.render_prometheus()
+        return 404, {"error": f"Route inconnue : {url.path}"}
+
+    @staticmethod
+    def _forecast_body(city, result):
+        api_data = result["api_data"]
+        return {
+            "city": city,
+            "temp_max_demain": api_data.get("temp_max_demain"),
+            "temp_max_apres_demain": api_data.get("temp_max_apres_demain"),
+            "temp_modele_demain": result["temp_modele_demain"],
+            "temp_modele_apres_demain": result["temp_modele_apres_demain"],
+            "temp_modele_par_horizon": result["temp_modele_par_horizon"],
+            "intervalles_par_horizon": result["intervalles_par_horizon"],
+            "jours": result["jours"],
+            "source_modele": result.get("source_modele"),
+        }
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        self.stats_counters["requests"] += 1
+        with telemetry.span("service_request") as span:
+            await self._respond(reader, writer, span)
+
+    async def _respond(self, reader, writer, span):
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.LimitOverrunError:
+                head = b""
+            if len(head) > MAX_HEADER_BYTES or not head:
+                status, body = 400, {"error": "Requête invalide."}
+            else:
+                parts = head.split(b"\r\n", 1)[0].decode("latin-1").split()
+                if len(parts) != 3:
+                    status, body = 400, {"error": "Requête invalide."}
+                else:
+                    path = urlsplit(parts[1]).path
+                    span.set(route=path if path in ROUTES else "other")
+                    try:
+                        status, body = await self._route(parts[0], parts[1])
+                    except Exception as e:
+                        logger.error("Erreur du service pour %s : %s", parts[1], e)
+                        status, body = 502, {"error": str(e)}
+            span.set(status=status)
+            if status >= 400:
+                self.stats_counters["errors"] += 1
+            if isinstance(body, str):  # /metrics : texte Prometheus
+                payload, content_type = body.encode("utf-8"), telemetry.PROMETHEUS_CONTENT_TYPE
+            else:
+                payload = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+                content_type = "application/json; charset=utf-8"
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client parti avant la réponse
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP de prévision météo (sans interface).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="Threads pour les recherches bloquantes")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--save", action="store_true", help="Enregistrer les observations comme l'application")
+    args = parser.parse_args()
+    telemetry.configure_from_env()
+
+    store = None
+    if args.save:
+        from app.observation_store import open_default_store
+        store = open_default_store()
+    service = ForecastService(args.host, args.port, args.workers, models_dir=args.models_dir, store=store)
+
+    async def run():
+        try:
+            await service.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("Arrêt du service.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# weather_predictor/app/telemetry.py
+"""
+Mesures et traces légères : durées (spans), compteurs et journalisation structurée.
+
+    with telemetry.span("http_request", endpoint="forecast"):
+        ...
+    telemetry.incr("forecast_cache_lookups", result="fresh")
+
+Désactivé par défaut : `span()` renvoie alors un objet partagé qui ne fait rien et `incr()`
+retourne immédiatement (un test de booléen). Activation par variables d'environnement, lues
+par `configure_from_env()` dans chaque point d'entrée (application, service, collecteur,
+entraînement) :
+
+- WEATHER_METRICS=1 : mesures en mémoire (route /metrics du service) ;
+- WEATHER_METRICS_FILE=chemin.jsonl : en plus, une ligne JSON par span, et un instantané des
+  compteurs à la sortie du processus ;
+- WEATHER_METRICS_PORT=9108 : en plus, /metrics au format texte Prometheus sur ce port ;
+- WEATHER_LOG_LEVEL (INFO par défaut), WEATHER_LOG_FORMAT=json : journalisation.
+
+Chaque span alimente un histogramme weather_<nom>_seconds (avec ses étiquettes) ; chaque
+compteur devient weather_<nom>_total. N'importe que la bibliothèque standard (http.server
+seulement si /metrics est servi) : utilisable dès le démarrage de l'application sans retarder
+la première image.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+PREFIX = 'weather_'
+# Bornes (s) des histogrammes de durée
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+_local = threading.local()
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """Compteurs et histogrammes en mémoire, partagés par tous les threads du processus."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._counters = {}    # (nom, étiquettes) -> valeur
+        self._histograms = {}  # (nom, étiquettes) -> [comptes par borne..., somme, nombre]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, labels=None):
+        key = (name, _label_key(labels or {}))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, _label_key(labels or {}))
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += seconds
+            state[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Compteurs et résumés des durées (nombre, total, moyenne en ms), sérialisables en JSON."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            spans = [{'name': name, 'labels': dict(labels), 'count': state[-1],
+                      'total_ms': round(state[-2] * 1000, 3),
+                      'mean_ms': round(state[-2] * 1000 / state[-1], 3) if state[-1] else None}
+                     for (name, labels), state in sorted(self._histograms.items())]
+        return {'counters': counters, 'spans': spans}
+
+    def render_prometheus(self):
+        """Toutes les mesures au format texte d'exposition Prometheus."""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(state)) for key, state in self._histograms.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f'{PREFIX}{name}_total'
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{fmt_labels(labels)} {value}')
+        for (name, labels), state in histograms:
+            metric = f'{PREFIX}{name}_seconds'
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f'{metric}_bucket{fmt_labels(labels, [("le", repr(bound))])} {cumulative}')
+            lines.append(f'{metric}_bucket{fmt_labels(labels, [("le", "+Inf")])} {state[-1]}')
+            lines.append(f'{metric}_sum{fmt_labels(labels)} {state[-2]}')
+            lines.append(f'{metric}_count{fmt_labels(labels)} {state[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class JsonLinesWriter:
+    """Écrit un objet JSON par ligne dans `path` (ajout), sous verrou, ligne par ligne."""
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, event):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_writer = None
+
+
+class _NullSpan:
+    """Span utilisé quand les mesures sont désactivées : aucun coût au-delà de l'appel."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **labels):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Mesure la durée d'un bloc ; le span englobant du même thread est noté comme parent."""
+    __slots__ = ('name', 'labels', 'parent', '_start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.parent = None
+        self._start = None
+
+    def set(self, **labels):
+        """Ajoute des étiquettes connues seulement pendant le bloc (statut HTTP, source du modèle...)."""
+        self.labels.update(labels)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        _local.stack.pop()
+        labels = dict(self.labels, status='error') if exc_type is not None else self.labels
+        metrics.observe(self.name, seconds, labels)
+        writer = _writer
+        if writer is not None:
+            writer.write({'ts': datetime.now().isoformat(timespec='milliseconds'), 'span': self.name,
+                          'ms': round(seconds * 1000, 3), 'parent': self.parent,
+                          'thread': threading.current_thread().name, **labels})
+        return False
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **labels):
+    """Context manager mesurant la durée du bloc (no-op si les mesures sont désactivées)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, labels)
+
+
+def incr(name, value=1, **labels):
+    """Incrémente le compteur `name` (no-op si les mesures sont désactivées)."""
+    if _enabled:
+        metrics.inc(name, value, labels)
+
+
+def observe(name, seconds, **labels):
+    """Enregistre une durée mesurée ailleurs (ex. temps jusqu'à la première image)."""
+    if _enabled:
+        metrics.observe(name, seconds, labels)
+
+
+def _dump_snapshot():
+    writer = _writer
+    if writer is not None:
+        writer.write({'ts': datetime.now().isoformat(timespec='milliseconds'), 'snapshot': metrics.snapshot()})
+
+
+def enable(jsonl_path=None):
+    """Active les mesures ; avec `jsonl_path`, les spans sont aussi écrits dans ce fichier."""
+    global _enabled, _writer
+    if jsonl_path and _writer is None:
+        _writer = JsonLinesWriter(jsonl_path)
+        atexit.register(_dump_snapshot)
+    _enabled = True
+
+
+def disable():
+    global _enabled, _writer
+    _enabled = False
+    if _writer is not None:
+        _dump_snapshot()
+        _writer.close()
+        _writer = None
+
+
+def serve_metrics(port, host='127.0.0.1'):
+    """Expose /metrics (texte Prometheus) dans un thread de fond. Retourne le serveur."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            payload = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics %s", format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info("Mesures exposées sur http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+# --- Journalisation ---
+
+# Attributs standard d'un LogRecord : le reste vient de `extra=` et est ajouté au JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par message : horodatage, niveau, module, message et champs `extra`."""
+    def format(self, record):
+        event = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        event.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info:
+            event['exc'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=None, fmt=None):
+    """Journalisation du processus sur stderr : texte lisible, ou JSON avec fmt="json"."""
+    level = level or os.getenv('WEATHER_LOG_LEVEL', 'INFO')
+    fmt = fmt or os.getenv('WEATHER_LOG_FORMAT', 'text')
+    handler = logging.StreamHandler()
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s', '%H:%M:%S'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def configure_from_env():
+    """Journalisation et mesures selon les variables d'environnement (voir l'en-tête du module)."""
+    configure_logging()
+    path = os.getenv('WEATHER_METRICS_FILE') or None
+    port = os.getenv('WEATHER_METRICS_PORT')
+    if os.getenv('WEATHER_METRICS', '').lower() in ('1', 'true', 'yes') or path or port:
+        enable(path)
+    if port:
+        serve_metrics(int(port))
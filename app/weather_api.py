@@ -1,133 +1,753 @@
 import requests
+import atexit
 import os
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
 
+from app import telemetry
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 # Récupérer la clé API
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
-BASE_URL = "http://api.openweathermap.org/data/2.5/forecast"
+# Surchargeable (ex: serveur de substitution local pour les tests et benchmarks)
+BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5/forecast")
+
+
+# Attente Retry-After maximale (s) : au-delà, la requête échoue au lieu d'attendre
+MAX_RETRY_AFTER = 10.0
+
+
+def api_key_configured():
+    return bool(OPENWEATHER_API_KEY) and OPENWEATHER_API_KEY != "VOTRE_CLE_API_OPENWEATHERMAP"
+
+
+def _use_mock_data(client=None):
+    """Données factices seulement sans clé API et sans client hors ligne (ReplayClient)."""
+    if api_key_configured():
+        return False
+    client = client if client is not None else get_default_client()
+    return not getattr(client, "offline", False)
+
+
+def mock_weather_data(city_name):
+    """Données factices pour permettre au script de fonctionner sans clé API."""
+    if city_name.lower() == "lyon":
+        return {
+            "temp_max_demain": 15.0, # API observation
+            "prob_pluie_demain": 15,
+            "humidity_demain": 70,    # Donnée factice
+            "pressure_demain": 1012,  # Donnée factice
+            "wind_speed_demain": 5.0, # Donnée factice
+
+            "temp_max_apres_demain": 25.0, # API observation
+            "prob_pluie_apres_demain": 50,
+            "humidity_apres_demain": 65,    # Donnée factice
+            "pressure_apres_demain": 1010,  # Donnée factice
+            "wind_speed_apres_demain": 7.0,  # Donnée factice
 
-def fetch_weather_data(city_name):
+            "jours": [
+                {"date": (datetime.now().date() + timedelta(days=1)).isoformat(), "horizon": 1,
+                 "temp_max": 15.0, "temp_min": 8.0, "temp_mean": 11.5, "prob_pluie": 15,
+                 "humidity": 70, "pressure": 1012, "wind_speed": 5.0},
+                {"date": (datetime.now().date() + timedelta(days=2)).isoformat(), "horizon": 2,
+                 "temp_max": 25.0, "temp_min": 14.0, "temp_mean": 19.5, "prob_pluie": 50,
+                 "humidity": 65, "pressure": 1010, "wind_speed": 7.0},
+            ]
+        }
+    return None # Pour les autres villes sans clé API, on ne peut pas simuler
+
+
+class CappedRetry(Retry):
     """
-    Récupère les données de prévision météo pour une ville donnée.
-    Retourne la température maximale, probabilité de pluie, humidité, pression
-    et vitesse du vent pour demain et après-demain.
+    Retry dont l'attente demandée par l'en-tête Retry-After est bornée à `max_retry_after`
+    secondes. Au-delà, aucune nouvelle tentative : la réponse (429/503) est rendue telle quelle
+    et raise_for_status() lève l'HTTPError, au lieu de bloquer un worker de l'interface ou un
+    lot de fetch_weather_batch pendant la durée demandée par le serveur.
+    """
+    def __init__(self, *args, max_retry_after=MAX_RETRY_AFTER, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.respect_retry_after_header:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                raise MaxRetryError(_pool, url, ResponseError(
+                    f"Retry-After de {retry_after:.0f} s au-delà de {self.max_retry_after:.0f} s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class WeatherClient:
+    """
+    Client HTTP réutilisable pour l'API OpenWeatherMap.
+
+    Une seule requests.Session : pool de connexions keep-alive (pas de nouvelle poignée de main
+    TCP/TLS à chaque appel), délais de connexion et de lecture, et nouvelles tentatives avec
+    recul exponentiel sur 429/5xx en respectant l'en-tête Retry-After (borné, voir CappedRetry).
+
+    - base_url : URL de l'endpoint /forecast (None = BASE_URL du module, lue à chaque appel) ;
+      l'endpoint /weather (conditions actuelles) est pris dans le même dossier.
+    - use_https : force le schéma https:// quelle que soit l'URL configurée.
+    - timeout : (connexion, lecture) en secondes.
+    - retries / backoff_factor : nombre de nouvelles tentatives et base du recul
+      (backoff_factor * 2 ** (tentative - 1) secondes).
+    - max_retry_after : attente Retry-After maximale (s) ; au-delà, la requête échoue.
+    - pool_maxsize : connexions conservées par hôte (au moins le nombre de workers de fetch_weather_batch).
+    - recorder : PayloadRecorder (app/payload_archive.py) qui archive chaque réponse brute reçue.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url=None, use_https=False, timeout=(3.05, 10), retries=3,
+                 backoff_factor=0.5, pool_maxsize=16, recorder=None, max_retry_after=MAX_RETRY_AFTER):
+        self.base_url = base_url
+        self.use_https = use_https
+        self.timeout = timeout
+        self.recorder = recorder
+
+        retry = CappedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Après la dernière tentative, raise_for_status() lève l'HTTPError
+            max_retry_after=max_retry_after,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def url(self):
+        url = self.base_url or BASE_URL
+        if self.use_https and url.startswith("http://"):
+            url = "https://" + url[len("http://"):]
+        return url
+
+    @property
+    def current_url(self):
+        return self.url.rsplit("/", 1)[0] + "/weather"
+
+    def get_json(self, params, url=None):
+        url = url or self.url
+        endpoint = url.rsplit("/", 1)[-1]
+        with telemetry.span("http_request", endpoint=endpoint) as span:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            span.set(status=response.status_code)
+            response.raise_for_status() # Lève une exception pour les codes d'erreur HTTP
+            data = response.json()
+        if self.recorder is not None:
+            self.recorder.record(endpoint, params.get("q"), data, units=params.get("units"), lang=params.get("lang"))
+        return data
+
+    def fetch_forecast(self, city_name, units="metric", lang="fr"):
+        params = {
+            "q": city_name,
+            "appid": OPENWEATHER_API_KEY,
+            "units": units, # metric = Celsius
+            "lang": lang
+        }
+        return self.get_json(params)
+
+    def fetch_current(self, city_name, units="metric", lang="fr"):
+        """Conditions actuelles (endpoint /weather)."""
+        params = {"q": city_name, "appid": OPENWEATHER_API_KEY, "units": units, "lang": lang}
+        return self.get_json(params, url=self.current_url)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
     """
-    if OPENWEATHER_API_KEY == "VOTRE_CLE_API_OPENWEATHERMAP" or not OPENWEATHER_API_KEY:
-        print("ATTENTION: Clé API OpenWeatherMap non configurée ou invalide. Utilisation de données factices.")
-        # Données factices pour permettre au script de fonctionner sans clé API
-        if city_name.lower() == "lyon":
+    Client partagé par tout le processus (créé au premier appel).
+    WEATHER_REPLAY_DIR=<dossier> le remplace par un ReplayClient (réponses archivées, hors
+    ligne) ; WEATHER_RECORD_DIR=<dossier> archive toutes les réponses reçues.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                replay_dir = os.getenv("WEATHER_REPLAY_DIR")
+                record_dir = os.getenv("WEATHER_RECORD_DIR")
+                if replay_dir:
+                    from app.payload_archive import ReplayClient
+                    _default_client = ReplayClient(replay_dir)
+                    return _default_client
+                recorder = None
+                if record_dir:
+                    from app.payload_archive import PayloadRecorder
+                    recorder = PayloadRecorder(record_dir)
+                    atexit.register(recorder.close)
+                _default_client = WeatherClient(
+                    use_https=os.getenv("OPENWEATHER_USE_HTTPS", "").lower() in ("1", "true", "yes"),
+                    timeout=(float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT", 3.05)),
+                             float(os.getenv("OPENWEATHER_READ_TIMEOUT", 10))),
+                    retries=int(os.getenv("OPENWEATHER_RETRIES", 3)),
+                    recorder=recorder,
+                    max_retry_after=float(os.getenv("OPENWEATHER_MAX_RETRY_AFTER", MAX_RETRY_AFTER)),
+                )
+    return _default_client
+
+
+def fetch_forecast_payload(city_name, units="metric", lang="fr", client=None):
+    """
+    Appelle l'endpoint /forecast et retourne le JSON brut.
+    Lève requests.exceptions.RequestException en cas d'erreur réseau ou HTTP.
+    """
+    client = client if client is not None else get_default_client()
+    return client.fetch_forecast(city_name, units, lang)
+
+class ForecastCache:
+    """
+    Cache des réponses /forecast brutes, clé = (ville normalisée, unités, langue).
+
+    - ttl : durée (s) pendant laquelle une entrée est fraîche.
+    - stale_ttl : durée supplémentaire (s) pendant laquelle une entrée périmée est encore
+      servie pendant qu'elle est rafraîchie en arrière-plan (stale-while-revalidate).
+    - max_entries : taille maximale en mémoire, éviction LRU.
+    - db_path : fichier SQLite optionnel pour conserver le cache entre deux lancements.
+    """
+    def __init__(self, ttl=3 * 3600, stale_ttl=3 * 3600, max_entries=256, db_path=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()  # clé -> (horodatage de stockage, payload)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS forecast_cache ("
+                " city TEXT, units TEXT, lang TEXT, stored_at REAL, payload TEXT,"
+                " PRIMARY KEY (city, units, lang))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(city_name, units="metric", lang="fr"):
+        return (" ".join(city_name.split()).lower(), units, lang)
+
+    def get(self, key):
+        """
+        Retourne (payload, état) avec état 'fresh', 'stale' ou None (absent ou trop vieux).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                entry = self._db_get(key)
+                if entry is not None:
+                    self._store(key, entry)
+
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    telemetry.incr("forecast_cache_lookups", result="fresh")
+                    return entry[1], "fresh"
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    telemetry.incr("forecast_cache_lookups", result="stale")
+                    return entry[1], "stale"
+            self.misses += 1
+            telemetry.incr("forecast_cache_lookups", result="miss")
+            return None, None
+
+    def set(self, key, payload, stored_at=None):
+        entry = (stored_at if stored_at is not None else time.time(), payload)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO forecast_cache VALUES (?, ?, ?, ?, ?)",
+                    (*key, entry[0], json.dumps(payload)),
+                )
+                self._db.commit()
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _db_get(self, key):
+        row = self._db.execute(
+            "SELECT stored_at, payload FROM forecast_cache WHERE city = ? AND units = ? AND lang = ?", key
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def start_refresh(self, key):
+        """Réserve le rafraîchissement d'une clé. False si un rafraîchissement est déjà en cours."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM forecast_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
             return {
-                "temp_max_demain": 15.0, # API observation
-                "prob_pluie_demain": 15,
-                "humidity_demain": 70,    # Donnée factice
-                "pressure_demain": 1012,  # Donnée factice
-                "wind_speed_demain": 5.0, # Donnée factice
-
-                "temp_max_apres_demain": 25.0, # API observation
-                "prob_pluie_apres_demain": 50,
-                "humidity_apres_demain": 65,    # Donnée factice
-                "pressure_apres_demain": 1010,  # Donnée factice
-                "wind_speed_apres_demain": 7.0  # Donnée factice
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
             }
-        else:
-            return None # Pour les autres villes sans clé API, on ne peut pas simuler
 
-    params = {
-        "q": city_name,
-        "appid": OPENWEATHER_API_KEY,
-        "units": "metric", # Celsius
-        "lang": "fr"
+
+# Cache partagé par défaut, configurable par variables d'environnement
+forecast_cache = ForecastCache(
+    ttl=float(os.getenv("FORECAST_CACHE_TTL", 3 * 3600)),
+    stale_ttl=float(os.getenv("FORECAST_CACHE_STALE_TTL", 3 * 3600)),
+    max_entries=int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", 256)),
+    db_path=os.getenv("FORECAST_CACHE_DB") or None,
+)
+
+
+def _refresh_in_background(cache, key, city_name, units, lang, client=None):
+    def refresh():
+        try:
+            cache.set(key, fetch_forecast_payload(city_name, units, lang, client))
+        except Exception as e:
+            logger.warning("Échec du rafraîchissement en arrière-plan pour %s : %s", city_name, e)
+        finally:
+            cache.end_refresh(key)
+
+    if cache.start_refresh(key):
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_forecast_payload(city_name, units="metric", lang="fr", cache=None, client=None):
+    """
+    Comme fetch_forecast_payload, en passant par le cache (forecast_cache par défaut).
+    Une entrée périmée est servie immédiatement et rafraîchie en arrière-plan.
+    """
+    cache = cache if cache is not None else forecast_cache
+    key = cache.make_key(city_name, units, lang)
+    payload, state = cache.get(key)
+    if state == "fresh":
+        return payload
+    if state == "stale":
+        _refresh_in_background(cache, key, city_name, units, lang, client)
+        return payload
+
+    payload = fetch_forecast_payload(city_name, units, lang, client)
+    cache.set(key, payload)
+    return payload
+
+
+def _local_utc_offset():
+    """Décalage UTC (s) de la machine, utilisé si le payload n'indique pas le fuseau de la ville."""
+    return int(datetime.now().astimezone().utcoffset().total_seconds())
+
+
+_SLOT_FIELDS = ('temp', 'temp_min', 'temp_max', 'pop', 'humidity', 'pressure', 'wind_speed')
+
+
+def _forecast_columns(payloads):
+    """
+    Aplatit les tranches de 3 heures d'un ou plusieurs payloads /forecast en colonnes NumPy.
+    Une seule passe sur les tranches, sans objet datetime : la date locale est calculée sur le
+    tableau entier à partir du décalage horaire de la ville (city.timezone).
+    """
+    nan = float('nan')
+    flat = []  # Valeurs à plat (dt + 7 champs par tranche), converties en un seul tableau à la fin
+    append = flat.extend
+    counts = []
+    offsets = []
+    default_offset = None
+    for data in payloads:
+        forecast_list = data.get('list', [])
+        offset = data.get('city', {}).get('timezone')
+        if offset is None:
+            if default_offset is None:
+                default_offset = _local_utc_offset()
+            offset = default_offset
+        counts.append(len(forecast_list))
+        offsets.append(offset)
+
+        start = len(flat)
+        try:
+            # Chemin rapide : payload complet, accès direct aux clés
+            for forecast in forecast_list:
+                main = forecast['main']
+                append((forecast['dt'], main['temp'], main['temp_min'], main['temp_max'],
+                        forecast['pop'], main['humidity'], main['pressure'], forecast['wind']['speed']))
+        except (KeyError, TypeError):
+            # Champs manquants ou null : on reprend ce payload avec des valeurs par défaut
+            del flat[start:]
+            for forecast in forecast_list:
+                main = forecast.get('main', {})
+                values = (forecast['dt'], main.get('temp'), main.get('temp_min'), main.get('temp_max'),
+                          # Probabilité de précipitation (pop) est entre 0 et 1
+                          forecast.get('pop', 0), main.get('humidity'), main.get('pressure'),
+                          forecast.get('wind', {}).get('speed'))
+                append(nan if v is None else v for v in values)
+
+    table = np.fromiter(flat, dtype=np.float64, count=len(flat)).reshape(-1, 1 + len(_SLOT_FIELDS))
+    counts = np.array(counts, dtype=np.int64)
+    columns = {field: table[:, i + 1] for i, field in enumerate(_SLOT_FIELDS)}
+    columns['dt'] = table[:, 0].astype(np.int64)
+    columns['payload'] = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    columns['day'] = (columns['dt'] + np.repeat(np.array(offsets, dtype=np.int64), counts)) // 86400
+    return columns
+
+
+def _aggregate_daily(columns):
+    """
+    Agrège par (payload, jour local) avec np.*.reduceat sur des groupes contigus.
+    Les valeurs manquantes (NaN) sont ignorées, comme le ferait un groupby pandas.
+    """
+    payload, day = columns['payload'], columns['day']
+    if len(day) and np.any((np.diff(payload) < 0) | ((np.diff(payload) == 0) & (np.diff(day) < 0))):
+        order = np.lexsort((day, payload))
+        columns = {name: values[order] for name, values in columns.items()}
+        payload, day = columns['payload'], columns['day']
+
+    if len(day):
+        starts = np.flatnonzero(np.r_[True, (np.diff(payload) != 0) | (np.diff(day) != 0)])
+    else:
+        starts = np.array([], dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(day)])
+
+    def group_max(values):
+        return np.fmax.reduceat(values, starts) if len(starts) else values[:0]
+
+    def group_min(values):
+        return np.fmin.reduceat(values, starts) if len(starts) else values[:0]
+
+    def group_mean(values):
+        if not len(starts):
+            return values[:0]
+        present = ~np.isnan(values)
+        totals = np.add.reduceat(np.where(present, values, 0.0), starts)
+        counts = np.add.reduceat(present.astype(np.int64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, totals / counts, np.nan)
+
+    return pd.DataFrame({
+        'payload': payload[starts],
+        'date': day[starts].astype('datetime64[D]'),
+        'temp_max': group_max(columns['temp_max']),
+        'temp_min': group_min(columns['temp_min']),
+        'temp_mean': group_mean(columns['temp']),
+        'pop_max': group_max(columns['pop']) * 100,
+        'humidity': group_mean(columns['humidity']),
+        'pressure': group_mean(columns['pressure']),
+        'wind_speed': group_mean(columns['wind_speed']),
+        'slots': sizes,
+    })
+
+
+def parse_forecast_daily(data):
+    """
+    Agrège les tranches de 3 heures du JSON /forecast par date locale (les ~5 jours renvoyés) :
+    température max/min/moyenne, probabilité de pluie max (%), humidité, pression et vent moyens.
+    """
+    return _aggregate_daily(_forecast_columns([data])).drop(columns='payload')
+
+
+def parse_forecast_payloads(payloads, fetched_at=None):
+    """
+    Version en lot de parse_forecast_daily pour l'ingestion de payloads bruts sauvegardés :
+    toutes les tranches sont aplaties en une seule table puis agrégées en une seule passe.
+
+    Le coût est dominé par une seule passe sur les tranches puis quelques réductions NumPy,
+    au lieu d'un datetime et d'une dizaine de comparaisons Python par tranche.
+
+    La colonne `payload` donne l'indice du payload d'origine. Si `fetched_at` (horodatages Unix
+    de récupération, un par payload) est fourni, une colonne `horizon` (jours après la date
+    locale de récupération) est ajoutée.
+    """
+    payloads = list(payloads)
+    daily = _aggregate_daily(_forecast_columns(payloads))
+    if fetched_at is not None:
+        offsets = np.array([
+            p.get('city', {}).get('timezone', _local_utc_offset()) for p in payloads
+        ], dtype=np.int64)
+        fetch_day = ((np.asarray(fetched_at, dtype=np.int64) + offsets) // 86400).astype('datetime64[D]')
+        idx = daily['payload'].to_numpy()
+        daily['horizon'] = (daily['date'].to_numpy().astype('datetime64[D]') - fetch_day[idx]).astype(np.int64)
+    return daily
+
+
+def _round_or_none(value, digits=None):
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits) if digits is not None else float(value)
+
+
+def city_today(data, now=None):
+    """
+    Jour local de la ville du payload à l'instant `now` (horodatage Unix, maintenant par défaut),
+    dans le fuseau qui sert à regrouper les tranches par jour (city.timezone).
+    """
+    offset = data.get('city', {}).get('timezone', _local_utc_offset()) if isinstance(data, dict) else _local_utc_offset()
+    now = time.time() if now is None else now
+    return (datetime(1970, 1, 1) + timedelta(days=(int(now) + offset) // 86400)).date()
+
+
+def daily_forecast_records(daily, today=None):
+    """
+    Convertit la table journalière en liste de dicts JSON-sérialisables (horizon J+n inclus).
+    `today` est le jour local de la ville (city_today) ; la date de la machine à défaut.
+    """
+    today = today or datetime.now().date()
+    records = []
+    for row in daily.itertuples(index=False):
+        day = pd.Timestamp(row.date).date()
+        records.append({
+            "date": day.isoformat(),
+            "horizon": (day - today).days,
+            "temp_max": _round_or_none(row.temp_max, 2),
+            "temp_min": _round_or_none(row.temp_min, 2),
+            "temp_mean": _round_or_none(row.temp_mean, 2),
+            "prob_pluie": int(row.pop_max) if not pd.isna(row.pop_max) else None,
+            "humidity": _round_or_none(row.humidity, 1),
+            "pressure": _round_or_none(row.pressure, 1),
+            "wind_speed": _round_or_none(row.wind_speed, 2),
+        })
+    return records
+
+
+def parse_forecast(data, fetched_at=None):
+    """
+    Extrait du JSON /forecast la température maximale, probabilité de pluie, humidité,
+    pression et vitesse du vent pour demain et après-demain (clés historiques), ainsi que
+    le détail de tous les jours renvoyés par l'API sous la clé "jours".
+
+    Les horizons sont comptés depuis le jour local de la ville à `fetched_at` (maintenant par
+    défaut), comme les jours eux-mêmes et comme parse_forecast_payloads au rejeu : pour une
+    ville en avance sur la machine, « demain » est bien le lendemain sur place.
+    """
+    jours = daily_forecast_records(parse_forecast_daily(data), city_today(data, fetched_at))
+    by_horizon = {jour["horizon"]: jour for jour in jours}
+    demain = by_horizon.get(1, {})
+    apres_demain = by_horizon.get(2, {})
+
+    return {
+        "temp_max_demain": demain.get("temp_max"),
+        "prob_pluie_demain": demain.get("prob_pluie"),
+        "humidity_demain": demain.get("humidity"),
+        "pressure_demain": demain.get("pressure"),
+        "wind_speed_demain": demain.get("wind_speed"),
+
+        "temp_max_apres_demain": apres_demain.get("temp_max"),
+        "prob_pluie_apres_demain": apres_demain.get("prob_pluie"),
+        "humidity_apres_demain": apres_demain.get("humidity"),
+        "pressure_apres_demain": apres_demain.get("pressure"),
+        "wind_speed_apres_demain": apres_demain.get("wind_speed"),
+
+        "jours": [jour for jour in jours if jour["horizon"] >= 1],
     }
 
-    try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status() # Lève une exception pour les codes d'erreur HTTP
-        data = response.json()
-
-        # Calculer les dates pour demain et après-demain
-        today = datetime.now().date()
-        tomorrow = today + timedelta(days=1)
-        day_after_tomorrow = today + timedelta(days=2)
-
-        # Initialisation des variables pour demain
-        temp_max_demain = None
-        prob_pluie_demain = None
-        humidity_demain = None
-        pressure_demain = None
-        wind_speed_demain = None
-
-        # Initialisation des variables pour après-demain
-        temp_max_apres_demain = None
-        prob_pluie_apres_demain = None
-        humidity_apres_demain = None
-        pressure_apres_demain = None
-        wind_speed_apres_demain = None
-
-        # Parcourir les prévisions par tranches de 3 heures
-        for forecast in data.get('list', []):
-            forecast_time = datetime.fromtimestamp(forecast['dt']).date()
-            
-            # Données principales
-            main_data = forecast.get('main', {})
-            wind_data = forecast.get('wind', {})
-
-            # Température maximale pour la journée (on prend la plus élevée)
-            current_temp_max = main_data.get('temp_max')
-            # Probabilité de précipitation (pop) est entre 0 et 1
-            current_pop = forecast.get('pop', 0) * 100 
-            current_humidity = main_data.get('humidity')
-            current_pressure = main_data.get('pressure')
-            current_wind_speed = wind_data.get('speed')
-
-            if forecast_time == tomorrow:
-                if temp_max_demain is None or (current_temp_max is not None and current_temp_max > temp_max_demain):
-                    temp_max_demain = current_temp_max
-                if prob_pluie_demain is None or current_pop > prob_pluie_demain:
-                    prob_pluie_demain = current_pop
-                # Pour humidité, pression, vent, on prend la valeur de la prévision de midi ou la moyenne
-                # Pour cet exemple, on prend la dernière valeur trouvée pour le jour
-                if current_humidity is not None: humidity_demain = current_humidity
-                if current_pressure is not None: pressure_demain = current_pressure
-                if current_wind_speed is not None: wind_speed_demain = current_wind_speed
-
-            elif forecast_time == day_after_tomorrow:
-                if temp_max_apres_demain is None or (current_temp_max is not None and current_temp_max > temp_max_apres_demain):
-                    temp_max_apres_demain = current_temp_max
-                if prob_pluie_apres_demain is None or current_pop > prob_pluie_apres_demain:
-                    prob_pluie_apres_demain = current_pop
-                if current_humidity is not None: humidity_apres_demain = current_humidity
-                if current_pressure is not None: pressure_apres_demain = current_pressure
-                if current_wind_speed is not None: wind_speed_apres_demain = current_wind_speed
 
-        return {
-            "temp_max_demain": temp_max_demain,
-            "prob_pluie_demain": int(prob_pluie_demain) if prob_pluie_demain is not None else None,
-            "humidity_demain": humidity_demain,
-            "pressure_demain": pressure_demain,
-            "wind_speed_demain": wind_speed_demain,
-
-            "temp_max_apres_demain": temp_max_apres_demain,
-            "prob_pluie_apres_demain": int(prob_pluie_apres_demain) if prob_pluie_apres_demain is not None else None,
-            "humidity_apres_demain": humidity_apres_demain,
-            "pressure_apres_demain": pressure_apres_demain,
-            "wind_speed_apres_demain": wind_speed_apres_demain
-        }
+def fetch_weather_data(city_name, use_cache=True, client=None):
+    """
+    Récupère les données de prévision météo pour une ville donnée.
+    Retourne la température maximale, probabilité de pluie, humidité, pression
+    et vitesse du vent pour demain et après-demain.
+    """
+    if _use_mock_data(client):
+        logger.warning("Clé API OpenWeatherMap non configurée ou invalide. Utilisation de données factices.")
+        return mock_weather_data(city_name)
 
+    try:
+        if use_cache:
+            payload = get_forecast_payload(city_name, client=client)
+        else:
+            payload = fetch_forecast_payload(city_name, client=client)
+        with telemetry.span("parse_forecast"):
+            return parse_forecast(payload)
     except requests.exceptions.RequestException as e:
-        print(f"Erreur de connexion à l'API météo : {e}")
+        logger.error("Erreur de connexion à l'API météo : %s", e, extra={"city": city_name})
         return None
     except KeyError as e:
-        print(f"Erreur dans les données de l'API (clé manquante) : {e}")
+        logger.error("Erreur dans les données de l'API (clé manquante) : %s", e, extra={"city": city_name})
         return None
     except Exception as e:
-        print(f"Une erreur inattendue est survenue : {e}")
+        logger.exception("Erreur inattendue lors de la récupération météo", extra={"city": city_name})
         return None
 
+
+class RateLimiter:
+    """
+    Limiteur de débit global (seau à jetons) partagé entre threads.
+    `rate` requêtes par seconde au maximum, avec des rafales jusqu'à `burst`.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _fetch_one(city_name, rate_limiter, use_cache, client):
+    if _use_mock_data(client):
+        data = mock_weather_data(city_name)
+        if data is None:
+            return {"data": None, "error": "Clé API non configurée : aucune donnée factice pour cette ville"}
+        return {"data": data, "error": None}
+
+    try:
+        if use_cache:
+            key = forecast_cache.make_key(city_name)
+            payload, state = forecast_cache.get(key)
+            if state == "stale":
+                _refresh_in_background(forecast_cache, key, city_name, "metric", "fr", client)
+            if state is not None:
+                return {"data": parse_forecast(payload), "error": None}
+        # Seuls les vrais appels réseau consomment le débit autorisé
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        payload = fetch_forecast_payload(city_name, client=client)
+        if use_cache:
+            forecast_cache.set(key, payload)
+        return {"data": parse_forecast(payload), "error": None}
+    except Exception as e:
+        return {"data": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def parse_current(data):
+    """
+    Conditions actuelles (JSON /weather) -> {"date": jour local ISO, "temp", "temp_max", "temp_min"}.
+    Le jour est celui de la ville (dt + décalage horaire), pas celui de la machine.
+    """
+    local_day = (data["dt"] + data.get("timezone", 0)) // 86400
+    main = data["main"]
+    return {
+        "date": (datetime(1970, 1, 1) + timedelta(days=local_day)).date().isoformat(),
+        "temp": main.get("temp"),
+        "temp_max": main.get("temp_max", main.get("temp")),
+        "temp_min": main.get("temp_min", main.get("temp")),
+    }
+
+
+def _fetch_current_one(city_name, rate_limiter, client):
+    if _use_mock_data(client):
+        return {"data": None, "error": "Clé API non configurée : pas de conditions actuelles"}
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        client = client if client is not None else get_default_client()
+        return {"data": parse_current(client.fetch_current(city_name)), "error": None}
+    except Exception as e:
+        return {"data": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def fetch_current_batch(cities, max_workers=8, rate_limit=None, rate_limiter=None, client=None):
+    """
+    Conditions actuelles de plusieurs villes en parallèle, comme fetch_weather_batch (sans cache).
+    Retourne {ville: {"data": dict | None, "error": str | None}}.
+    """
+    cities = list(dict.fromkeys(cities))
+    if rate_limiter is None and rate_limit:
+        rate_limiter = RateLimiter(rate_limit, burst=max_workers)
+    if not cities:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cities))) as executor:
+        futures = {city: executor.submit(_fetch_current_one, city, rate_limiter, client) for city in cities}
+        return {city: future.result() for city, future in futures.items()}
+
+
+def fetch_weather_batch(cities, max_workers=8, rate_limit=None, rate_limiter=None, use_cache=True, client=None):
+    """
+    Récupère les prévisions de plusieurs villes en parallèle (pool de threads borné).
+
+    - max_workers : nombre maximal de requêtes simultanées.
+    - rate_limit : requêtes par seconde maximum, toutes villes confondues (None = illimité).
+      Un RateLimiter existant peut être passé via `rate_limiter` pour le partager entre lots.
+    - use_cache : servir les villes déjà en cache (forecast_cache) sans appel réseau.
+    - client : WeatherClient à utiliser (client partagé par défaut, dont le pool de connexions
+      doit contenir au moins max_workers connexions).
+
+    Retourne un dict {ville: {"data": dict | None, "error": str | None}} dans l'ordre des villes.
+    """
+    cities = list(dict.fromkeys(cities))  # Dédoublonner en gardant l'ordre
+    if rate_limiter is None and rate_limit:
+        rate_limiter = RateLimiter(rate_limit, burst=max_workers)
+    if not cities:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cities))) as executor:
+        futures = {city: executor.submit(_fetch_one, city, rate_limiter, use_cache, client) for city in cities}
+        return {city: future.result() for city, future in futures.items()}
+
+
 if __name__ == "__main__":
     # Test rapide du module
     print("Test de la récupération des données météo pour Lyon...")
@@ -138,5 +758,7 @@ if __name__ == "__main__":
         print(f"Humidité demain (API): {data['humidity_demain']}%")
         print(f"Pression demain (API): {data['pressure_demain']} hPa")
         print(f"Vitesse vent demain (API): {data['wind_speed_demain']} m/s")
+        for jour in data['jours']:
+            print(f"J+{jour['horizon']} ({jour['date']}): {jour['temp_min']}-{jour['temp_max']}°C, pluie {jour['prob_pluie']}%")
     else:
         print("Échec de la récupération des données de test.")
\ No newline at end of file
@@ -0,0 +1,113 @@
+# weather_predictor/app/workers.py
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    """Signaux émis par un worker vers le thread GUI (connexion en file d'attente)."""
+    finished = pyqtSignal(int, object)  # (id de requête, résultat)
+    error = pyqtSignal(int, str)        # (id de requête, message d'erreur)
+
+
+class ForecastWorker(QRunnable):
+    """
+    Exécute une fonction bloquante (appel API, prédiction, sauvegarde) hors du thread GUI.
+    La fonction reçoit un callable `is_cancelled` pour s'arrêter entre deux étapes.
+    """
+    def __init__(self, request_id, fn, *args):
+        super().__init__()
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.cancel_event = threading.Event()
+        self.signals = WorkerSignals()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def run(self):
+        if self.is_cancelled():
+            return
+        try:
+            result = self.fn(*self.args, is_cancelled=self.is_cancelled)
+        except Exception as e:
+            if not self.is_cancelled():
+                self.signals.error.emit(self.request_id, str(e))
+            return
+        if not self.is_cancelled():
+            self.signals.finished.emit(self.request_id, result)
+
+
+class ForecastExecutor(QObject):
+    """
+    Couche d'exécution en arrière-plan pour les recherches météo.
+
+    Une seule recherche est « active » à la fois : soumettre une nouvelle ville annule
+    la recherche en cours (son résultat est ignoré), tandis que soumettre la même ville
+    qu'une recherche encore en vol est fusionné avec celle-ci.
+    """
+    result_ready = pyqtSignal(str, object)  # (ville, résultat)
+    failed = pyqtSignal(str, str)           # (ville, message d'erreur)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._next_id = 0
+        self._current = None       # Worker actif
+        self._current_key = None   # Clé normalisée de la ville active
+
+    def submit(self, city_name, fn):
+        """Soumet une recherche. Retourne False si elle a été fusionnée avec celle en cours."""
+        key = city_name.strip().lower()
+        if self._current is not None and self._current_key == key and not self._current.is_cancelled():
+            return False
+
+        self.cancel()
+        self._next_id += 1
+        worker = ForecastWorker(self._next_id, fn, city_name)
+        worker.setAutoDelete(True)
+        worker.signals.finished.connect(lambda rid, res, c=city_name: self._on_finished(rid, c, res))
+        worker.signals.error.connect(lambda rid, msg, c=city_name: self._on_error(rid, c, msg))
+        self._current = worker
+        self._current_key = key
+        self.pool.start(worker)
+        return True
+
+    def cancel(self):
+        """
+        Annule la recherche active. Un worker encore en file sort immédiatement ; un worker
+        déjà lancé s'arrête à la prochaine étape et son résultat est ignoré.
+        (Pas de tryTake : avec autoDelete, l'objet C++ peut déjà avoir été détruit.)
+        """
+        if self._current is None:
+            return
+        self._current.cancel()
+        self._current = None
+        self._current_key = None
+
+    def is_busy(self):
+        return self._current is not None
+
+    def _on_finished(self, request_id, city_name, result):
+        if request_id != self._next_id or self._current is None:
+            return  # Résultat d'une recherche périmée
+        self._current = None
+        self._current_key = None
+        self.result_ready.emit(city_name, result)
+
+    def _on_error(self, request_id, city_name, message):
+        if request_id != self._next_id or self._current is None:
+            return
+        self._current = None
+        self._current_key = None
+        self.failed.emit(city_name, message)
+
+    def shutdown(self, wait_ms=2000):
+        self.cancel()
+        self.pool.clear()
+        self.pool.waitForDone(wait_ms)
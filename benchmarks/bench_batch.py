@@ -0,0 +1,44 @@
+# weather_predictor/benchmarks/bench_batch.py
+"""
+Compare une boucle séquentielle sur fetch_weather_data avec fetch_weather_batch,
+contre le serveur de substitution local (aucun appel réseau réel).
+
+    python -m benchmarks.bench_batch --cities 40 --latency 0.1 --workers 8
+"""
+import argparse
+import time
+
+from app import weather_api
+from benchmarks.stub_server import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requêtes/s maximum")
+    args = parser.parse_args()
+
+    cities = [f"Ville{i}" for i in range(args.cities)]
+    with StubServer(latency=args.latency) as server:
+        weather_api.BASE_URL = server.url
+        weather_api.OPENWEATHER_API_KEY = "stub"
+
+        start = time.perf_counter()
+        serial = {city: weather_api.fetch_weather_data(city, use_cache=False) for city in cities}
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = weather_api.fetch_weather_batch(cities, max_workers=args.workers, rate_limit=args.rate_limit, use_cache=False)
+        batch_time = time.perf_counter() - start
+
+    errors = sum(1 for r in batch.values() if r["error"])
+    identical = all(batch[c]["data"] == serial[c] for c in cities)
+    print(f"{args.cities} villes, latence {args.latency}s, {args.workers} workers")
+    print(f"Séquentiel : {serial_time:.2f}s")
+    print(f"Lot        : {batch_time:.2f}s (x{serial_time / batch_time:.1f}), erreurs : {errors}, résultats identiques : {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# weather_predictor/benchmarks/bench_client.py
+"""
+Vérifie le comportement de WeatherClient contre le serveur de substitution local :
+réutilisation des connexions (keep-alive), nouvelles tentatives sur 429/5xx avec Retry-After,
+et délai de lecture face à un serveur qui ne répond plus.
+
+    python -m benchmarks.bench_client --requests 50
+"""
+import argparse
+import time
+
+import requests
+
+from app import weather_api
+from benchmarks.stub_server import StubServer
+
+
+def _timed(label, fn):
+    start = time.perf_counter()
+    try:
+        result = fn()
+        outcome = "ok"
+    except requests.exceptions.RequestException as e:
+        result = None
+        outcome = type(e).__name__
+    print(f"{label:<45} {time.perf_counter() - start:6.2f}s  {outcome}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    weather_api.OPENWEATHER_API_KEY = "stub"
+    params = {"q": "Lyon", "appid": "stub", "units": "metric", "lang": "fr"}
+
+    # 1. Keep-alive : requests.get ouvre une connexion par appel, le client la réutilise
+    with StubServer() as server:
+        _timed(f"requests.get x{args.requests}",
+               lambda: [requests.get(server.url, params=params, timeout=5).json() for _ in range(args.requests)])
+        bare_connections = server.connection_count
+        with weather_api.WeatherClient(base_url=server.url) as client:
+            _timed(f"WeatherClient x{args.requests}",
+                   lambda: [client.fetch_forecast("Lyon") for _ in range(args.requests)])
+        print(f"  connexions ouvertes : requests.get={bare_connections}, "
+              f"WeatherClient={server.connection_count - bare_connections}")
+
+    # 2. Nouvelles tentatives : 2 échecs 503 puis succès, Retry-After d'une seconde
+    with StubServer(fail_first=2, error_status=503, retry_after=1) as server:
+        with weather_api.WeatherClient(base_url=server.url, backoff_factor=0.1) as client:
+            _timed("2 x 503 + Retry-After: 1 puis succès", lambda: client.fetch_forecast("Lyon"))
+        print(f"  requêtes reçues par le serveur : {server.request_count}")
+
+    # 3. Erreurs persistantes : l'erreur HTTP remonte une fois les tentatives épuisées
+    with StubServer(error_rate=1.0, error_status=429) as server:
+        with weather_api.WeatherClient(base_url=server.url, retries=2, backoff_factor=0.1) as client:
+            _timed("429 permanent (2 nouvelles tentatives)", lambda: client.fetch_forecast("Lyon"))
+        print(f"  requêtes reçues par le serveur : {server.request_count}")
+
+    # 4. Serveur bloqué : le délai de lecture interrompt l'appel au lieu de bloquer indéfiniment
+    with StubServer(stall_cities=["Lyon"]) as server:
+        with weather_api.WeatherClient(base_url=server.url, timeout=(1, 0.5), retries=0) as client:
+            _timed("serveur bloqué, délai de lecture 0.5s", lambda: client.fetch_forecast("Lyon"))
+
+
+if __name__ == "__main__":
+    main()
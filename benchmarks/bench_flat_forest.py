@@ -0,0 +1,74 @@
+# weather_predictor/benchmarks/bench_flat_forest.py
+"""
+Forêt aplatie (app/flat_forest.py) contre sklearn et FastPredictor, sur une forêt entraînée par
+le pipeline habituel (fit_full, observations synthétiques) : chargement, puis latence d'une
+ligne et d'un lot. Les prédictions des trois chemins sont vérifiées identiques.
+
+    python -m benchmarks.bench_flat_forest --rows 50000 --batch 1000 --iterations 300
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from app.flat_forest import FlatForest, export_forest
+from app.inference import FastPredictor
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_observations
+from training.train_model import fit_full, prepare_training_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000, help="Observations d'entraînement")
+    parser.add_argument("--batch", type=int, default=1000, help="Lignes du lot évalué")
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    X, y, _ = prepare_training_data(synthetic_observations(args.rows + args.batch, seed=3))
+    start = time.perf_counter()
+    model = fit_full(X.iloc[:args.rows], y.iloc[:args.rows])
+    print(f"Forêt : {len(model.estimators_)} arbres, {args.rows} lignes, {time.perf_counter() - start:.1f}s")
+    del model.feature_names_in_  # Tableaux NumPy pour tous les chemins
+    model.n_jobs = 1
+    batch = X.iloc[args.rows:].to_numpy(dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl_path = os.path.join(tmp, 'model.pkl')
+        flat_path = os.path.join(tmp, 'model_forest')
+        joblib.dump(model, pkl_path, compress=3)
+        meta = export_forest(model, flat_path)
+        print(f"Export : {meta['n_nodes']} nœuds, profondeur {meta['max_depth']}, "
+              f"{sum(os.path.getsize(os.path.join(flat_path, f)) for f in os.listdir(flat_path)) / 1e6:.1f} Mo "
+              f"(.pkl compressé : {os.path.getsize(pkl_path) / 1e6:.1f} Mo)")
+
+        load_pkl = measure(lambda: joblib.load(pkl_path), 5)
+        load_flat = measure(lambda: FlatForest.load(flat_path), 5)
+        flat = FlatForest.load(flat_path)
+        fast = FastPredictor(joblib.load(pkl_path))
+
+        assert np.array_equal(model.predict(batch), flat.predict(batch)), "Forêt aplatie différente de sklearn"
+        assert np.array_equal(fast.predict(batch), flat.predict(batch)), "Forêt aplatie différente de FastPredictor"
+        one = batch[:1]
+        cases = [
+            ("1 ligne, sklearn predict", lambda: model.predict(one)),
+            ("1 ligne, FastPredictor", lambda: fast.predict(one)),
+            ("1 ligne, forêt aplatie", lambda: flat.predict(one)),
+            (f"{len(batch)} lignes, sklearn predict", lambda: model.predict(batch)),
+            (f"{len(batch)} lignes, FastPredictor", lambda: fast.predict(batch)),
+            (f"{len(batch)} lignes, forêt aplatie", lambda: flat.predict(batch)),
+        ]
+        print(f"Chargement : .pkl {load_pkl['p50_ms']:.1f} ms, forêt aplatie (mmap) {load_flat['p50_ms']:.1f} ms")
+        print(f"{'cas':<36}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for label, fn in cases:
+            stats = measure(fn, args.iterations)
+            print(f"{label:<36}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
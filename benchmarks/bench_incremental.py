@@ -0,0 +1,67 @@
+# weather_predictor/benchmarks/bench_incremental.py
+"""
+Compare réentraînement complet et incrémental (warm_start) à mesure que l'historique grandit.
+À chaque étape, `--batch` nouvelles observations arrivent : le mode complet réentraîne sur
+tout l'historique, le mode incrémental ajoute des arbres entraînés sur le seul nouveau lot.
+Le MAE est mesuré sur un même ensemble de validation tiré de la fin de la période.
+
+    python -m benchmarks.bench_incremental --initial 5000 --batch 1000 --steps 8
+"""
+import argparse
+import time
+import warnings
+
+from sklearn.metrics import mean_absolute_error
+
+from benchmarks.synthetic import synthetic_observations
+from training.train_model import (
+    FULL_REFIT_EVERY, TREES_PER_INCREMENT, fit_full, fit_incremental, prepare_training_data
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--initial", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--trees-per-increment", type=int, default=TREES_PER_INCREMENT)
+    parser.add_argument("--full-refit-every", type=int, default=FULL_REFIT_EVERY)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    total = args.initial + args.batch * args.steps
+    X_all, y_all, _ = prepare_training_data(synthetic_observations(total + 2000, seed=1))
+    X_val, y_val = X_all.iloc[total:], y_all.iloc[total:]
+
+    seen = args.initial
+    start = time.perf_counter()
+    incremental = fit_full(X_all.iloc[:seen], y_all.iloc[:seen])
+    print(f"Modèle initial : {seen} lignes, {time.perf_counter() - start:.2f}s")
+    print(f"{'lignes':>8} {'complet (s)':>12} {'MAE':>6} {'incr. (s)':>10} {'MAE':>6} {'arbres':>7}")
+
+    runs_since_full = 0
+    for _ in range(args.steps):
+        new = slice(seen, seen + args.batch)
+        seen += args.batch
+
+        start = time.perf_counter()
+        full = fit_full(X_all.iloc[:seen], y_all.iloc[:seen])
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if runs_since_full + 1 >= args.full_refit_every:
+            incremental = fit_full(X_all.iloc[:seen], y_all.iloc[:seen])
+            runs_since_full = 0
+        else:
+            fit_incremental(incremental, X_all.iloc[new], y_all.iloc[new], args.trees_per_increment)
+            runs_since_full += 1
+        incr_time = time.perf_counter() - start
+
+        full_mae = mean_absolute_error(y_val, full.predict(X_val))
+        incr_mae = mean_absolute_error(y_val, incremental.predict(X_val))
+        print(f"{seen:>8} {full_time:>12.2f} {full_mae:>6.2f} {incr_time:>10.2f} {incr_mae:>6.2f} "
+              f"{len(incremental.estimators_):>7}")
+
+
+if __name__ == "__main__":
+    main()
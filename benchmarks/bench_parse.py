@@ -0,0 +1,64 @@
+# weather_predictor/benchmarks/bench_parse.py
+"""
+Compare l'agrégation en colonnes (parse_forecast_payloads) à l'ancienne boucle par tranche,
+sur un lot de payloads /forecast synthétiques.
+
+    python -m benchmarks.bench_parse --payloads 2000
+"""
+import argparse
+import time
+from datetime import datetime
+
+from app import weather_api
+from benchmarks.synthetic import synthetic_forecast_payload
+
+
+def _legacy_daily(data):
+    """Référence : boucle par tranche avec datetime.fromtimestamp (ancien parse_forecast, tous les jours)."""
+    days = {}
+    for forecast in data.get('list', []):
+        day = datetime.fromtimestamp(forecast['dt']).date()
+        main_data = forecast.get('main', {})
+        agg = days.setdefault(day, {"temp_max": None, "pop": None, "humidity": None,
+                                    "pressure": None, "wind_speed": None})
+        current_temp_max = main_data.get('temp_max')
+        current_pop = forecast.get('pop', 0) * 100
+        if agg["temp_max"] is None or (current_temp_max is not None and current_temp_max > agg["temp_max"]):
+            agg["temp_max"] = current_temp_max
+        if agg["pop"] is None or current_pop > agg["pop"]:
+            agg["pop"] = current_pop
+        agg["humidity"] = main_data.get('humidity')
+        agg["pressure"] = main_data.get('pressure')
+        agg["wind_speed"] = forecast.get('wind', {}).get('speed')
+    return days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payloads", type=int, default=2000)
+    args = parser.parse_args()
+
+    payloads = [synthetic_forecast_payload(f"Ville{i}") for i in range(args.payloads)]
+    slots = sum(len(p["list"]) for p in payloads)
+
+    start = time.perf_counter()
+    for p in payloads:
+        _legacy_daily(p)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    weather_api.parse_forecast_payloads(payloads)
+    columnar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    weather_api.parse_forecast_daily(payloads[0])
+    single = time.perf_counter() - start
+
+    print(f"{args.payloads} payloads, {slots} tranches")
+    print(f"Boucle par tranche : {legacy:.3f}s ({slots / legacy:,.0f} tranches/s)")
+    print(f"Colonnes + groupby : {columnar:.3f}s ({slots / columnar:,.0f} tranches/s, x{legacy / columnar:.1f})")
+    print(f"Un seul payload (colonnes) : {single * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# weather_predictor/benchmarks/bench_predict.py
+"""
+Micro-benchmark de l'inférence : ancien chemin (DataFrame d'une ligne, n_jobs=-1, un appel
+par jour) contre FastPredictor (tampon NumPy, arbres évalués directement, les cinq jours J+1..J+5
+en un seul appel).
+
+    python -m benchmarks.bench_predict --iterations 500
+"""
+import argparse
+import os
+import time
+import warnings
+from datetime import date, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.inference import FastPredictor
+from app.model_registry import ModelRegistry
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+
+
+def _percentiles(samples):
+    samples = np.array(samples) * 1000
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def _measure(fn, iterations):
+    fn()  # Échauffement
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--model", default=None, help="Chemin du .pkl (défaut : le plus récent)")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    path = args.model or ModelRegistry(MODELS_DIR).active_model_path()
+    legacy_model = joblib.load(path)
+    legacy_model.n_jobs = -1  # Valeur utilisée à l'entraînement
+    predictor = FastPredictor(joblib.load(path))
+
+    today = date.today()
+    days = [(24.5 + h / 2, today + timedelta(days=h), 60 - h, 1015 - h, 3.2 + h / 10, h) for h in range(1, 6)]
+
+    def legacy_one_day(day):
+        temp, date_prevision, humidity, pressure, wind_speed, horizon = day
+        input_data = pd.DataFrame([[
+            temp, humidity, pressure, wind_speed,
+            date_prevision.timetuple().tm_yday, date_prevision.month, date_prevision.weekday(), horizon
+        ][:len(predictor.columns)]], columns=predictor.columns)
+        return round(float(legacy_model.predict(input_data)[0]), 1)
+
+    cases = [
+        ("1 jour, ancien chemin", lambda: legacy_one_day(days[0])),
+        ("1 jour, FastPredictor", lambda: predictor.predict_rows(days[:1])),
+        ("5 jours, ancien chemin (5 appels)", lambda: [legacy_one_day(d) for d in days]),
+        ("5 jours, FastPredictor (1 appel)", lambda: predictor.predict_rows(days)),
+        ("5 jours, FastPredictor + p10/p50/p90", lambda: predictor.predict_rows_quantiles(days)),
+    ]
+    print(f"Modèle : {os.path.basename(path)}, {args.iterations} itérations")
+    print(f"{'cas':<36}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for label, fn in cases:
+        p50, p99 = _measure(fn, args.iterations)
+        print(f"{label:<36}{p50:>10.3f}{p99:>10.3f}")
+
+    assert [legacy_one_day(d) for d in days] == predictor.predict_rows(days), "Prédictions différentes"
+    assert [r["temp"] for r in predictor.predict_rows_quantiles(days)] == predictor.predict_rows(days), \
+        "Moyenne des quantiles différente de predict"
+
+
+if __name__ == "__main__":
+    main()
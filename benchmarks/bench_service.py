@@ -0,0 +1,97 @@
+# weather_predictor/benchmarks/bench_service.py
+"""
+Test de charge du service HTTP (app.service) contre le serveur de substitution local.
+
+Envoie `--requests` requêtes /forecast réparties sur `--cities` villes avec `--concurrency`
+clients simultanés, cache vidé : le nombre d'appels reçus par le serveur de substitution
+montre le regroupement (au plus un appel en amont par ville).
+
+    python -m benchmarks.bench_service --requests 400 --cities 10 --concurrency 32 --latency 0.2
+
+Avec --metrics, les mesures de app/telemetry.py sont activées et leur résumé affiché
+(temps passé par étape : HTTP amont, analyse, modèle, service).
+"""
+import argparse
+import asyncio
+import http.client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import telemetry, weather_api
+from app.service import ForecastService
+from benchmarks.harness import latency_stats
+from benchmarks.stub_server import StubServer
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        start = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def _run_service(service, loop, ready):
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(service.start())
+    ready.set()
+    loop.run_forever()
+    loop.run_until_complete(service.close())
+    loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8, help="Threads du service")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence du serveur de substitution (s)")
+    parser.add_argument("--metrics", action="store_true", help="Activer et afficher les mesures (telemetry)")
+    args = parser.parse_args()
+    if args.metrics:
+        telemetry.enable()
+
+    with StubServer(latency=args.latency) as stub:
+        weather_api.BASE_URL = stub.url
+        weather_api.OPENWEATHER_API_KEY = "stub"
+        weather_api.forecast_cache.clear()
+
+        service = ForecastService(port=0, workers=args.workers)
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        thread = threading.Thread(target=_run_service, args=(service, loop, ready), daemon=True)
+        thread.start()
+        ready.wait()
+
+        paths = [f"/forecast?city=Ville{i % args.cities}" for i in range(args.requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda path: _get(service.port, path), paths))
+        elapsed = time.perf_counter() - start
+
+        upstream = stub.request_count
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    stats = latency_stats([duration for _, duration in results])
+    errors = sum(1 for status, _ in results if status != 200)
+    print(f"{args.requests} requêtes, {args.cities} villes, {args.concurrency} clients, latence amont {args.latency}s")
+    print(f"Débit      : {args.requests / elapsed:.0f} req/s ({elapsed:.2f}s), erreurs : {errors}")
+    print(f"Latence    : p50 {stats['p50_ms']:.1f} ms | p95 {stats['p95_ms']:.1f} ms | max {stats['max_ms']:.1f} ms")
+    print(f"Amont      : {upstream} appels pour {args.cities} villes "
+          f"(regroupées : {service.stats_counters['coalesced']}, cache : {weather_api.forecast_cache.stats()['hits']} hits)")
+    if args.metrics:
+        print(f"{'span':<20}{'étiquettes':<44}{'nombre':>8}{'moyenne (ms)':>14}")
+        for row in telemetry.metrics.snapshot()['spans']:
+            labels = ", ".join(f"{k}={v}" for k, v in row['labels'].items())
+            print(f"{row['name']:<20}{labels:<44}{row['count']:>8}{row['mean_ms']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# weather_predictor/benchmarks/bench_startup.py
+"""
+Mesure le démarrage à froid de l'application graphique, chaque lancement dans un nouvel
+interpréteur (plateforme Qt « offscreen », aucun affichage nécessaire) :
+
+- import_ms : import de app.main ;
+- first_paint_ms : du lancement du processus à la première image de la fenêtre ;
+- engine_ms / model_ms : du lancement au moteur de prévision prêt, puis au modèle chargé.
+
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import latency_stats
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child(timeout):
+    """Un lancement mesuré (exécuté dans le processus enfant) ; écrit un JSON sur stdout."""
+    started_at, start = time.time(), time.perf_counter()
+    import app.main as main_module
+    import_ms = (time.perf_counter() - start) * 1000
+
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication(sys.argv[:1])
+    window = main_module.WeatherApp()
+    window.showMaximized()
+
+    timings = {"started_at": started_at, "import_ms": import_ms}
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        application.processEvents()
+        now_ms = (time.perf_counter() - start) * 1000
+        if "first_paint_ms" not in timings and window.first_paint_ms is not None:
+            timings["first_paint_ms"] = now_ms
+        if "engine_ms" not in timings and window.engine is not None:
+            timings["engine_ms"] = now_ms
+        if window.model_registry is not None and window.model_registry.current() is not None:
+            timings["model_ms"] = now_ms
+            break
+        time.sleep(0.001)
+    window.close()
+    print("STARTUP " + json.dumps(timings))
+
+
+def _launch(timeout):
+    """Lance un enfant et ajoute aux mesures le démarrage de l'interpréteur."""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONPATH=ROOT_DIR)
+    spawned_at = time.time()
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", "--timeout", str(timeout)],
+                         capture_output=True, text=True, cwd=ROOT_DIR, env=env, check=True).stdout
+    timings = json.loads(next(line[8:] for line in out.splitlines() if line.startswith("STARTUP ")))
+    # Les durées de l'enfant partent de son début : on y ajoute le démarrage de l'interpréteur
+    interpreter_ms = (timings.pop("started_at") - spawned_at) * 1000
+    launch = {"interpreter_ms": interpreter_ms, "import_ms": timings.pop("import_ms")}
+    launch.update({key: value + interpreter_ms for key, value in timings.items()})
+    return launch
+
+
+def heaviest_imports(top=10):
+    """Imports directs les plus coûteux de app.main (temps cumulé, ms), d'après -X importtime."""
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         capture_output=True, text=True, cwd=ROOT_DIR, env=env, check=True).stderr
+    children = []
+    for line in err.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)", line)
+        if not match:
+            continue
+        depth = (len(match.group(2)) - 1) // 2
+        if depth == 1:
+            children.append((int(match.group(1)) / 1000, match.group(3)))
+        elif depth == 0:
+            # Les enfants sont listés avant leur parent : ceux qui précèdent app.main sont les siens
+            if match.group(3) == "app.main":
+                return [(int(match.group(1)) / 1000, "app.main")] + sorted(children, reverse=True)[:top]
+            children = []
+    return []
+
+
+def measure_startup(runs=5, timeout=30.0):
+    """Statistiques de démarrage sur `runs` lancements à froid."""
+    launches = [_launch(timeout) for _ in range(runs)]
+    results = {}
+    for key in ("interpreter_ms", "import_ms", "first_paint_ms", "engine_ms", "model_ms"):
+        samples = [launch[key] / 1000 for launch in launches if key in launch]
+        if samples:
+            stats = latency_stats(samples)
+            results[key] = {"p50": stats["p50_ms"], "max": stats["max_ms"]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Nombre d'imports les plus lents affichés")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Attente maximale du modèle (s)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.timeout)
+        return
+
+    results = measure_startup(args.runs, args.timeout)
+    print(f"Démarrage à froid ({args.runs} lancements, ms depuis le lancement du processus) :")
+    for key, stats in results.items():
+        print(f"  {key:<16} p50 {stats['p50']:8.1f}   max {stats['max']:8.1f}")
+    if args.top:
+        print("Imports les plus lents de app.main (ms cumulées) :")
+        for ms, module in heaviest_imports(args.top):
+            print(f"  {ms:8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
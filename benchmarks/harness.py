@@ -0,0 +1,60 @@
+# weather_predictor/benchmarks/harness.py
+"""Outils communs des benchmarks : percentiles de latence, débit et pic mémoire."""
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def latency_stats(samples):
+    """Statistiques (en ms) d'une liste de durées en secondes."""
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return {}
+    ms = samples * 1000
+    return {
+        "count": int(len(samples)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "throughput_per_s": float(len(samples) / samples.sum()) if samples.sum() > 0 else None,
+    }
+
+
+def measure(fn, iterations, warmup=1):
+    """Appelle `fn` `iterations` fois et retourne latency_stats des appels."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+class PeakMemory:
+    """Résultat de track_peak_memory : pic d'allocation Python/NumPy en Mo."""
+    peak_mb = None
+
+
+@contextmanager
+def track_peak_memory():
+    """
+    Mesure le pic d'allocation pendant le bloc (tracemalloc : objets Python et tampons NumPy,
+    pas les allocations internes des bibliothèques C comme les arbres sklearn).
+    """
+    result = PeakMemory()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield result
+    finally:
+        result.peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        if not already_tracing:
+            tracemalloc.stop()
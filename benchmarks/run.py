@@ -0,0 +1,354 @@
+# weather_predictor/benchmarks/run.py
+"""
+Suite de benchmarks des chemins critiques : fetch, parse, predict, save, train, startup et replay.
+
+Tout tourne hors ligne (serveur /forecast local, payloads et observations synthétiques).
+Chaque étape rapporte latences (p50/p95/p99), débit et pic mémoire (mesuré dans une passe
+séparée : tracemalloc ralentit fortement le code instrumenté) ; les résultats sont
+écrits en JSON dans benchmarks/results/ pour être comparés d'un commit à l'autre :
+
+    python -m benchmarks.run                               # toutes les étapes
+    python -m benchmarks.run --stages predict,save --iterations 2000
+    python -m benchmarks.run --stages train --rows 1000,100000,10000000
+    python -m benchmarks.run --compare results/A.json results/B.json
+
+Au-delà de STREAM_ROWS lignes, l'étape train mesure l'entraînement par tranches (--mode stream
+de train_model) : la base SQLite et le DataFrame complet ne tiendraient pas en mémoire.
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, datetime, timedelta
+
+from benchmarks.harness import latency_stats, measure, track_peak_memory
+from benchmarks.synthetic import synthetic_current_payload, synthetic_forecast_payload, synthetic_observations
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+STAGES = ["fetch", "parse", "predict", "save", "train", "startup", "replay"]
+STREAM_ROWS = 1_000_000  # train : au-delà, chemin par tranches (training/streaming.py)
+
+
+def bench_fetch(args):
+    from app import weather_api
+    from benchmarks.stub_server import StubServer
+
+    cities = [f"Ville{i}" for i in range(args.cities)]
+    with StubServer(latency=args.latency) as server:
+        weather_api.BASE_URL = server.url
+        weather_api.OPENWEATHER_API_KEY = "stub"
+        with weather_api.WeatherClient(base_url=server.url) as client:
+            samples = []
+            for city in cities:
+                start = time.perf_counter()
+                weather_api.fetch_weather_data(city, use_cache=False, client=client)
+                samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            weather_api.fetch_weather_batch(cities, max_workers=8, use_cache=False, client=client)
+            batch_seconds = time.perf_counter() - start
+            with track_peak_memory() as mem:
+                weather_api.fetch_weather_batch(cities, max_workers=8, use_cache=False, client=client)
+
+            cache = weather_api.ForecastCache()
+            for city in cities:
+                weather_api.get_forecast_payload(city, cache=cache, client=client)
+            cached = measure(lambda: weather_api.get_forecast_payload(cities[0], cache=cache, client=client),
+                             args.iterations)
+
+    return {
+        "single": latency_stats(samples),
+        "batch": {"cities": len(cities), "seconds": batch_seconds, "throughput_per_s": len(cities) / batch_seconds},
+        "cache_hit": cached,
+        "peak_mb": mem.peak_mb,
+        "stub_latency_s": args.latency,
+    }
+
+
+def bench_parse(args):
+    from app import weather_api
+
+    payloads = [synthetic_forecast_payload(f"Ville{i}") for i in range(args.payloads)]
+    single = measure(lambda: weather_api.parse_forecast(payloads[0]), args.iterations)
+    start = time.perf_counter()
+    weather_api.parse_forecast_payloads(payloads)
+    bulk_seconds = time.perf_counter() - start
+    with track_peak_memory() as mem:
+        weather_api.parse_forecast_payloads(payloads)
+    slots = sum(len(p["list"]) for p in payloads)
+    return {
+        "single": single,
+        "bulk": {"payloads": len(payloads), "slots": slots, "seconds": bulk_seconds,
+                 "slots_per_s": slots / bulk_seconds},
+        "peak_mb": mem.peak_mb,
+    }
+
+
+def bench_predict(args):
+    import joblib
+    from app.flat_forest import FlatForest, export_forest, is_exportable
+    from app.inference import FastPredictor
+    from app.model_registry import ModelRegistry
+    from training.train_model import MODELS_DIR
+
+    path = ModelRegistry(MODELS_DIR).active_model_path()
+    if path is None:
+        return {"skipped": "aucun modèle dans data/models"}
+    predictor = FastPredictor(joblib.load(path))
+    today = date.today()
+    days = [(24.5 + h / 2, today + timedelta(days=h), 60 - h, 1015 - h, 3.2 + h / 10, h) for h in range(1, 6)]
+    one = measure(lambda: predictor.predict_rows(days[:1]), args.iterations)
+    two = measure(lambda: predictor.predict_rows(days[:2]), args.iterations)
+    five = measure(lambda: predictor.predict_rows(days), args.iterations)
+    five_calls = measure(lambda: [predictor.predict_rows([day]) for day in days], args.iterations)
+    five_quantiles = measure(lambda: predictor.predict_rows_quantiles(days), args.iterations)
+    assert [r["temp"] for r in predictor.predict_rows_quantiles(days)] == predictor.predict_rows(days)
+    flat = {}
+    if is_exportable(predictor.model):
+        # Même modèle exporté en forêt aplatie, évalué sans sklearn
+        with tempfile.TemporaryDirectory() as tmp:
+            flat_path = os.path.join(tmp, 'model_forest')
+            export_forest(predictor.model, flat_path)
+            flat["load"] = measure(lambda: FlatForest.load(flat_path), 20)
+            flat_predictor = FastPredictor(FlatForest.load(flat_path))
+            assert flat_predictor.predict_rows_quantiles(days) == predictor.predict_rows_quantiles(days)
+            flat["one_day"] = measure(lambda: flat_predictor.predict_rows(days[:1]), args.iterations)
+            flat["five_days"] = measure(lambda: flat_predictor.predict_rows(days), args.iterations)
+            flat["five_days_quantiles"] = measure(lambda: flat_predictor.predict_rows_quantiles(days), args.iterations)
+    with track_peak_memory() as mem:
+        predictor.predict_rows(days)
+    return {"model": os.path.basename(path), "schema_columns": len(predictor.columns), "one_day": one,
+            "two_days": two, "five_days": five, "five_days_separate_calls": five_calls,
+            "five_days_quantiles": five_quantiles,
+            "quantiles_overhead_p50": five_quantiles["p50_ms"] / five["p50_ms"] if five["p50_ms"] else None,
+            "flat_forest": flat, "peak_mb": mem.peak_mb}
+
+
+def bench_save(args):
+    from app.observation_store import ObservationStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ObservationStore(os.path.join(tmp, 'bench.db'))
+        row = [None, "Lyon", date.today(), 24.5, 24.0, 60, 1015, 3.2]
+
+        def save_search():
+            # Une recherche GUI : deux lignes, un flush
+            store.append(row)
+            store.append(row)
+            store.flush()
+
+        per_search = measure(save_search, args.iterations)
+        start = time.perf_counter()
+        store.append_many([row] * args.bulk_rows)
+        bulk_seconds = time.perf_counter() - start
+        with track_peak_memory() as mem:
+            store.append_many([row] * args.bulk_rows)
+        store.close()
+    return {
+        "per_search": per_search,
+        "bulk": {"rows": args.bulk_rows, "seconds": bulk_seconds, "rows_per_s": args.bulk_rows / bulk_seconds},
+        "peak_mb": mem.peak_mb,
+    }
+
+
+def write_synthetic_csv(csv_path, n_rows, part_rows=STREAM_ROWS):
+    """CSV synthétique écrit par parties de `part_rows` lignes (mémoire bornée)."""
+    for i, offset in enumerate(range(0, n_rows, part_rows)):
+        part = synthetic_observations(min(part_rows, n_rows - offset), seed=i)
+        part.to_csv(csv_path, index=False, mode='a' if i else 'w', header=not i)
+
+
+def bench_train(args):
+    from app.observation_store import ObservationStore
+    from training import streaming
+    from training.train_model import fit_full, prepare_training_data
+
+    def run_pipeline(csv_path, db_path, timings):
+        store = ObservationStore(db_path)
+        start = time.perf_counter()
+        store.migrate_csv(csv_path)
+        timings["ingest_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = store.read()
+        timings["read_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        X, y, _ = prepare_training_data(df)
+        timings["features_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fit_full(X, y)
+        timings["fit_s"] = time.perf_counter() - start
+        store.close()
+
+    def run_streaming(csv_path, n_rows, timings):
+        # Lecture, features et ajustement entrelacés tranche par tranche : une seule mesure
+        start = time.perf_counter()
+        n_chunks = -(-n_rows // streaming.CHUNK_SIZE)
+        _, _, report = streaming.train_streaming(streaming.iter_csv_chunks(csv_path), n_chunks)
+        timings["stream_s"] = time.perf_counter() - start
+        # tracemalloc doublerait la durée : pic de mémoire résidente du processus à la place
+        timings["peak_rss_mb"] = report['peak_rss_mb']
+
+    results = {}
+    for n_rows in args.rows:
+        timings = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'observations.csv')
+            write_synthetic_csv(csv_path, n_rows)
+            if n_rows > STREAM_ROWS:
+                run_streaming(csv_path, n_rows, timings)
+            else:
+                run_pipeline(csv_path, os.path.join(tmp, 'timed.db'), timings)
+                with track_peak_memory() as mem:
+                    run_pipeline(csv_path, os.path.join(tmp, 'traced.db'), {})
+                timings["peak_mb"] = mem.peak_mb
+        timings["total_s"] = sum(value for key, value in timings.items() if key.endswith("_s"))
+        timings["rows_per_s"] = n_rows / timings["total_s"]
+        results[str(n_rows)] = timings
+    return results
+
+
+def bench_startup(args):
+    from benchmarks.bench_startup import measure_startup
+
+    # Lancements à froid de l'application graphique, chacun dans un nouvel interpréteur
+    return measure_startup(args.startup_runs)
+
+
+def bench_replay(args):
+    from app.observation_store import ObservationStore
+    from app.payload_archive import PayloadRecorder, ReplayClient, replay_observations
+    from app.weather_api import fetch_weather_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, 'payloads')
+        recorder = PayloadRecorder(archive_dir, buffer_size=1000)
+        first_day = int(time.time()) // 86400 * 86400 - args.replay_days * 86400
+        start = time.perf_counter()
+        for d in range(args.replay_days):
+            fetched_at = first_day + d * 86400 + 3600
+            for i in range(args.cities):
+                city = f"Ville{i}"
+                recorder.record('forecast', city, synthetic_forecast_payload(city, fetched_at, seed=f"{city}:{d}"),
+                                fetched_at=fetched_at)
+                recorder.record('weather', city, synthetic_current_payload(city, fetched_at), fetched_at=fetched_at)
+        recorder.close()
+        record_seconds = time.perf_counter() - start
+        archive_mb = sum(os.path.getsize(os.path.join(archive_dir, f)) for f in os.listdir(archive_dir)) / 1e6
+
+        store = ObservationStore(os.path.join(tmp, 'replay.db'))
+        stats = replay_observations(store, archive_dir, max_horizon=5)
+        store.close()
+
+        client = ReplayClient(archive_dir)
+        stand_in = measure(lambda: fetch_weather_data("Ville0", use_cache=False, client=client), args.iterations)
+    return {
+        "payloads": recorder.recorded,
+        "record_payloads_per_s": recorder.recorded / record_seconds,
+        "archive_mb": archive_mb,
+        "replay": stats,
+        "stand_in_fetch": stand_in,
+    }
+
+
+BENCHES = {"fetch": bench_fetch, "parse": bench_parse, "predict": bench_predict,
+           "save": bench_save, "train": bench_train, "startup": bench_startup, "replay": bench_replay}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    """Affiche les métriques communes aux deux fichiers de résultats, avec l'écart relatif."""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old.get('revision')} ({old.get('timestamp')}) -> {new.get('revision')} ({new.get('timestamp')})")
+    old_flat, new_flat = _flatten(old["stages"]), _flatten(new["stages"])
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        a, b = old_flat[name], new_flat[name]
+        delta = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        print(f"{name:<45} {a:>14.4g} {b:>14.4g} {delta:>9}")
+
+
+def main():
+    if hasattr(signal, "SIGPIPE"):
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)  # Sortie tronquée par `| head` sans trace d'erreur
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Étapes parmi {','.join(STAGES)}")
+    parser.add_argument("--iterations", type=int, default=500, help="Itérations des mesures de latence")
+    parser.add_argument("--cities", type=int, default=50, help="fetch : villes interrogées")
+    parser.add_argument("--latency", type=float, default=0.0, help="fetch : latence du serveur local (s)")
+    parser.add_argument("--payloads", type=int, default=2000, help="parse : payloads du lot")
+    parser.add_argument("--bulk-rows", type=int, default=100000, help="save : lignes de l'insertion en lot")
+    parser.add_argument("--rows", default="1000,10000,100000",
+                        help=f"train : tailles des CSV synthétiques (par tranches au-delà de {STREAM_ROWS})")
+    parser.add_argument("--startup-runs", type=int, default=5, help="startup : lancements à froid de l'application")
+    parser.add_argument("--replay-days", type=int, default=20,
+                        help="replay : jours archivés (--cities réponses /forecast et /weather par jour)")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie (défaut : benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANCIEN", "NOUVEAU"), help="Comparer deux résultats")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    args.rows = [int(n) for n in args.rows.split(",") if n]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Étapes inconnues : {', '.join(sorted(unknown))}")
+    warnings.simplefilter("ignore")
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "stages": {},
+    }
+    for stage in stages:
+        print(f"--- {stage} ---")
+        start = time.perf_counter()
+        results["stages"][stage] = BENCHES[stage](args)
+        print(json.dumps(results["stages"][stage], indent=2))
+        print(f"({time.perf_counter() - start:.1f}s)")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{results['revision'] or 'local'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats écrits dans {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# weather_predictor/benchmarks/stub_server.py
+"""
+Serveur HTTP local qui imite les endpoints /forecast et /weather d'OpenWeatherMap.
+Sert des payloads synthétiques pour tester hors ligne, avec injection de latence et d'erreurs :
+- latency : délai ajouté à chaque réponse ;
+- error_rate / error_status : proportion de réponses en erreur et code renvoyé (429, 503...) ;
+- fail_first : les N premières requêtes de chaque ville échouent (scénarios de retry déterministes) ;
+- retry_after : valeur de l'en-tête Retry-After envoyée avec les 429/503 ;
+- stall_cities : villes pour lesquelles le serveur ne répond jamais (test des délais d'attente).
+
+Usage autonome :
+    python -m benchmarks.stub_server --port 8765 --latency 0.2 --error-rate 0.1
+puis OPENWEATHER_BASE_URL=http://127.0.0.1:8765/data/2.5/forecast
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import synthetic_current_payload, synthetic_forecast_payload
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    disable_nagle_algorithm = True  # En-têtes et corps sont écrits séparément
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connection_count += 1
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        city = query.get("q", [""])[0]
+        with server.stats_lock:
+            server.request_count += 1
+            attempt = server.attempts.get(city, 0) + 1
+            server.attempts[city] = attempt
+            inject_error = attempt <= server.fail_first or server.rng.random() < server.error_rate
+
+        if city.lower() in server.stall_cities:
+            time.sleep(3600)
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not city:
+            self._send_json(400, {"cod": "400", "message": "Nothing to geocode"})
+            return
+        if inject_error:
+            headers = {}
+            if server.retry_after is not None and server.error_status in (429, 503):
+                headers["Retry-After"] = str(server.retry_after)
+            self._send_json(server.error_status, {"cod": str(server.error_status), "message": "injected"}, headers)
+            return
+        if url.path.endswith("/weather"):
+            self._send_json(200, synthetic_current_payload(city))
+        else:
+            self._send_json(200, synthetic_forecast_payload(city))
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Silencieux : les benchmarks mesurent, ils n'affichent pas
+
+
+class StubServer:
+    """Serveur de substitution démarré dans un thread (utilisable comme context manager)."""
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, error_status=503,
+                 fail_first=0, retry_after=None, stall_cities=(), seed=0):
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.error_status = error_status
+        self.httpd.fail_first = fail_first
+        self.httpd.retry_after = retry_after
+        self.httpd.stall_cities = {c.lower() for c in stall_cities}
+        self.httpd.rng = random.Random(seed)
+        self.httpd.attempts = {}
+        self.httpd.request_count = 0
+        self.httpd.connection_count = 0
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/data/2.5/forecast"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def connection_count(self):
+        return self.httpd.connection_count
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API /forecast.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence ajoutée par requête (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses en erreur")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0, help="Échecs initiaux par ville")
+    parser.add_argument("--retry-after", type=int, default=None)
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency, args.error_rate, args.error_status,
+                        args.fail_first, args.retry_after)
+    print(f"Serveur de substitution sur {server.url} (latence {args.latency}s)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,160 @@
+# weather_predictor/training/evaluate.py
+"""
+Évaluation continue du modèle : les prédictions enregistrées par l'application, le service et
+le collecteur (--predict) sont comparées aux températures relevées une fois le jour passé.
+
+    python -m training.evaluate                            # MAE et biais par ville et horizon
+    python -m training.evaluate --retrain                  # réentraîner si l'erreur s'est dégradée
+    python -m training.evaluate --window-days 14 --tolerance 0.25 --min-samples 100 --retrain
+
+Chaque passe ne lit que les prédictions pas encore évaluées (ObservationStore.evaluate_predictions) :
+leurs erreurs s'ajoutent aux agrégats par modèle, ville, horizon et jour, et les MAE glissants
+sont calculés sur ces agrégats. Le réentraînement n'est lancé que si le MAE du modèle actif sur
+la fenêtre dépasse de `tolerance` celui de ses BASELINE_DAYS premiers jours évalués (ou
+--max-mae), au plus une fois par modèle.
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app import telemetry
+from app.model_artifacts import MODELS_DIR, ModelArtifacts
+from app.model_registry import ModelRegistry
+from app.observation_store import open_default_store
+
+WINDOW_DAYS = 14      # Fenêtre des MAE glissants (jours de prévision)
+TOLERANCE = 0.25      # Dégradation relative tolérée par rapport à la référence du modèle
+BASELINE_DAYS = 7     # Premiers jours évalués d'un modèle : sa référence
+MIN_SAMPLES = 100     # Prédictions évaluées minimum (référence et fenêtre) avant de juger
+META_RETRAINED = 'evaluation:retrained_model'
+
+
+def _pooled(days):
+    """n, MAE et biais d'un ensemble de jours de prediction_errors (moyennes pondérées par n)."""
+    n = int(days['n'].sum())
+    if not n:
+        return 0, None, None
+    return n, float((days['mae'] * days['n']).sum() / n), float((days['biais'] * days['n']).sum() / n)
+
+
+def drift_check(daily, model, window_days=WINDOW_DAYS, baseline_days=BASELINE_DAYS, tolerance=TOLERANCE,
+                min_samples=MIN_SAMPLES, max_mae=None, today=None):
+    """
+    Décision de réentraînement pour le modèle `model` (nom du fichier, ou None), d'après ses
+    erreurs par jour (`daily` : prediction_errors du modèle regroupé par date).
+
+    La référence est l'erreur du modèle lui-même sur ses `baseline_days` premiers jours évalués,
+    mesurée comme la fenêtre courante (mêmes relevés, mêmes horizons) : le MAE enregistré à
+    l'entraînement n'est pas comparable d'un mode à l'autre (validation croisée, échantillon
+    aléatoire, nouvelles lignes seules, dernière tranche). La fenêtre courante couvre les
+    `window_days` derniers jours, après la période de référence.
+    Retourne un dict {model, n, mae, biais, baseline_n, baseline_mae, threshold, degraded, reason}.
+    """
+    today = today or date.today()
+    dates = pd.to_datetime(daily['date']).dt.date if len(daily) else daily['date']
+    check = {'model': model, 'n': 0, 'mae': None, 'biais': None, 'baseline_n': 0, 'baseline_mae': None,
+             'threshold': max_mae, 'degraded': False}
+    if model is None:
+        check['reason'] = "aucun modèle actif"
+        return check
+    if not len(daily):
+        check['reason'] = "aucune prédiction évaluée"
+        return check
+
+    baseline_end = min(dates) + timedelta(days=baseline_days)
+    check['baseline_n'], check['baseline_mae'], _ = _pooled(daily[dates < baseline_end])
+    window_start = max(today - timedelta(days=window_days), baseline_end)
+    check['n'], check['mae'], check['biais'] = _pooled(daily[dates >= window_start])
+    if check['baseline_n'] >= min_samples:
+        relative = check['baseline_mae'] * (1 + tolerance)
+        check['threshold'] = min(relative, max_mae) if max_mae is not None else relative
+
+    if check['threshold'] is None:
+        check['reason'] = (f"référence en cours ({check['baseline_n']} prédictions évaluées "
+                           f"sur {min_samples} nécessaires)")
+    elif check['n'] < min_samples:
+        check['reason'] = f"{check['n']} prédictions évaluées après la référence, sur {min_samples} nécessaires"
+    elif check['mae'] > check['threshold']:
+        check['degraded'] = True
+        check['reason'] = f"MAE {check['mae']:.2f}°C au-delà du seuil {check['threshold']:.2f}°C"
+    else:
+        check['reason'] = f"MAE {check['mae']:.2f}°C sous le seuil {check['threshold']:.2f}°C"
+    return check
+
+
+def run_evaluation(window_days=WINDOW_DAYS, tolerance=TOLERANCE, min_samples=MIN_SAMPLES, max_mae=None,
+                   retrain=False, mode="full", models_dir=MODELS_DIR, baseline_days=BASELINE_DAYS):
+    """
+    Une passe d'évaluation : résolution des nouvelles prédictions, MAE et biais glissants sur
+    `window_days` jours, puis réentraînement (`mode` de train_and_save_model) si `retrain` et si
+    le modèle actif s'est dégradé par rapport à ses premiers jours (drift_check).
+    Retourne {"stats", "by_city_horizon", "check", "retrained"}.
+    """
+    store = open_default_store()
+    try:
+        with telemetry.span("evaluation"):
+            stats = store.evaluate_predictions()
+            # MAE en production de chaque modèle, seul comparable d'un modèle à l'autre (rétention keep_best)
+            per_model = store.prediction_errors(by=('modele',))
+            ModelArtifacts(models_dir).record_live_scores({
+                row.modele: (int(row.n), float(row.mae)) for row in per_model.itertuples(index=False)
+            })
+            start = date.today() - timedelta(days=window_days)
+            by_city_horizon = store.prediction_errors(start, by=('ville', 'horizon'))
+            # Modèle actif du manifeste, ou .pkl le plus récent sans manifeste (comme le registre)
+            path = ModelRegistry(models_dir).active_model_path()
+            model = os.path.basename(path) if path else None
+            daily = store.prediction_errors(model=model, by=('date',))
+            check = drift_check(daily, model, window_days, baseline_days, tolerance, min_samples, max_mae)
+        already = model is not None and store.get_meta(META_RETRAINED) == model
+        retrained = None
+        if retrain and check['degraded'] and not already:
+            from training.train_model import train_and_save_model  # sklearn : seulement si nécessaire
+
+            print(f"Réentraînement ({check['reason']}).")
+            retrained = train_and_save_model(mode)
+            if retrained:
+                store.set_meta(META_RETRAINED, model)  # Une seule fois par modèle dégradé
+            else:
+                check['reason'] += " (réentraînement sans nouveau modèle, nouvel essai à la prochaine passe)"
+        elif check['degraded'] and already:
+            check['reason'] += " (réentraînement déjà lancé pour ce modèle)"
+        telemetry.incr("evaluation_runs", result="degraded" if check['degraded'] else "ok")
+    finally:
+        store.close()
+    return {"stats": stats, "by_city_horizon": by_city_horizon, "check": check, "retrained": retrained}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évaluation continue du modèle contre les relevés réels.")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Fenêtre des MAE glissants")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Dégradation relative tolérée par rapport à la référence du modèle")
+    parser.add_argument("--baseline-days", type=int, default=BASELINE_DAYS,
+                        help="Premiers jours évalués du modèle servant de référence")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--max-mae", type=float, default=None, help="Seuil absolu de MAE (°C)")
+    parser.add_argument("--retrain", action="store_true", help="Réentraîner si le modèle actif s'est dégradé")
+    parser.add_argument("--mode", choices=["full", "incremental", "search", "stream"], default="full",
+                        help="Mode du réentraînement (voir training.train_model)")
+    args = parser.parse_args()
+    telemetry.configure_from_env()
+
+    result = run_evaluation(args.window_days, args.tolerance, args.min_samples, args.max_mae,
+                            args.retrain, args.mode, baseline_days=args.baseline_days)
+    stats, check = result['stats'], result['check']
+    print(f"Prédictions évaluées : {stats['evaluated']} nouvelles, {stats['expired']} abandonnées (sans relevé)")
+    errors = result['by_city_horizon']
+    if errors.empty:
+        print(f"Aucune prédiction évaluée sur les {args.window_days} derniers jours.")
+    else:
+        print(errors.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"Modèle actif {check['model'] or '-'} : {check['reason']}")
+    if result['retrained']:
+        print(f"Nouveau modèle : {os.path.basename(result['retrained'])}")
+
+
+if __name__ == "__main__":
+    main()
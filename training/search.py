@@ -0,0 +1,142 @@
+# weather_predictor/training/search.py
+"""
+Recherche d'hyperparamètres et comparaison de régresseurs pour train_model.py (--mode search).
+
+Chaque candidat de SEARCH_SPACE est évalué par validation croisée temporelle (TimeSeriesSplit :
+on valide toujours sur des prévisions postérieures aux données d'entraînement). Les couples
+(candidat, pli) sont répartis sur un pool de processus couvrant tous les cœurs ; chaque
+régresseur y tourne sur un seul cœur (n_jobs=1) pour éviter la sursouscription.
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import TimeSeriesSplit
+
+from app.inference import FastPredictor
+
+ESTIMATORS = {
+    "random_forest": RandomForestRegressor,
+    "extra_trees": ExtraTreesRegressor,
+    "hist_gradient_boosting": HistGradientBoostingRegressor,
+}
+
+# Grille par régresseur : toutes les combinaisons sont évaluées
+SEARCH_SPACE = {
+    "random_forest": {"n_estimators": [50, 100, 200], "max_depth": [None, 12, 20], "min_samples_leaf": [1, 3]},
+    "extra_trees": {"n_estimators": [100, 200], "max_depth": [None, 20]},
+    "hist_gradient_boosting": {"max_iter": [100, 300], "learning_rate": [0.05, 0.1], "max_depth": [None, 6]},
+}
+
+N_SPLITS = 5
+MAE_TOLERANCE = 0.02       # Candidats à moins de 2 % du meilleur MAE : le plus rapide l'emporte
+LATENCY_REPEATS = 200      # Prédictions d'une ligne chronométrées par candidat
+
+# Données partagées par les tâches d'un processus du pool (envoyées une fois, à l'initialisation)
+_worker_data = {}
+
+
+def candidates(search_space=None):
+    """Liste de (nom du régresseur, paramètres) pour toutes les combinaisons de la grille."""
+    result = []
+    for name, grid in (search_space or SEARCH_SPACE).items():
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            result.append((name, dict(zip(keys, values))))
+    return result
+
+
+def build_estimator(name, params, n_jobs=1):
+    """Instancie un régresseur ; les forêts gardent warm_start pour l'entraînement incrémental."""
+    params = dict(params, random_state=42)
+    if name in ("random_forest", "extra_trees"):
+        params.update(n_jobs=n_jobs, warm_start=True)
+    return ESTIMATORS[name](**params)
+
+
+def single_row_latency_ms(model, X_row, repeats=LATENCY_REPEATS):
+    """Latence médiane (ms) d'une prédiction d'une ligne par le chemin d'inférence de l'application."""
+    predictor = FastPredictor(model)
+    X_row = np.ascontiguousarray(X_row, dtype=np.float32)
+    predictor.predict(X_row)  # Échauffement
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict(X_row)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples) * 1000)
+
+
+def _init_worker(X, y):
+    _worker_data["X"] = X
+    _worker_data["y"] = y
+
+
+def _evaluate_fold(name, params, train_end, val_end, measure_latency):
+    """Entraîne sur [0, train_end) et valide sur [train_end, val_end) (exécuté dans le pool)."""
+    X, y = _worker_data["X"], _worker_data["y"]
+    start = time.perf_counter()
+    model = build_estimator(name, params)
+    model.fit(X.iloc[:train_end], y.iloc[:train_end])
+    fit_seconds = time.perf_counter() - start
+    mae = mean_absolute_error(y.iloc[train_end:val_end], model.predict(X.iloc[train_end:val_end]))
+    latency_ms = single_row_latency_ms(model, X.iloc[train_end:train_end + 1].to_numpy()) if measure_latency else None
+    return float(mae), fit_seconds, latency_ms
+
+
+def cross_validate(X, y, search_space=None, n_splits=N_SPLITS, max_workers=None):
+    """
+    Évalue tous les candidats par validation croisée temporelle, en parallèle.
+    X et y doivent être triés chronologiquement. Retourne le classement (liste de dicts)
+    trié par MAE moyen croissant.
+
+    La latence est mesurée sur le modèle du dernier pli (le plus grand jeu d'entraînement),
+    dans le pool : les cœurs sont chargés, la valeur sert à comparer les candidats entre eux.
+    """
+    folds = [(train[-1] + 1, val[-1] + 1) for train, val in TimeSeriesSplit(n_splits=n_splits).split(X)]
+    grid = candidates(search_space)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = {
+            (i, f): pool.submit(_evaluate_fold, name, params, train_end, val_end, f == len(folds) - 1)
+            for i, (name, params) in enumerate(grid)
+            for f, (train_end, val_end) in enumerate(folds)
+        }
+        results = {key: future.result() for key, future in futures.items()}
+
+    leaderboard = []
+    for i, (name, params) in enumerate(grid):
+        fold_results = [results[(i, f)] for f in range(len(folds))]
+        maes = [r[0] for r in fold_results]
+        leaderboard.append({
+            "estimator": name,
+            "params": params,
+            "mae": float(np.mean(maes)),
+            "mae_std": float(np.std(maes)),
+            "fold_mae": maes,
+            "fit_seconds": float(sum(r[1] for r in fold_results)),
+            "latency_ms": fold_results[-1][2],
+        })
+    leaderboard.sort(key=lambda row: row["mae"])
+    for rank, row in enumerate(leaderboard, start=1):
+        row["rank"] = rank
+    return leaderboard
+
+
+def select_best(leaderboard, mae_tolerance=MAE_TOLERANCE, max_latency_ms=None):
+    """
+    Choisit le candidat le plus rapide parmi ceux dont le MAE est à moins de `mae_tolerance`
+    (relatif) du meilleur, après exclusion de ceux qui dépassent `max_latency_ms`.
+    """
+    eligible = [row for row in leaderboard if max_latency_ms is None or row["latency_ms"] <= max_latency_ms]
+    if not eligible:
+        print(f"Aucun candidat sous {max_latency_ms} ms : le budget de latence est ignoré.")
+        eligible = leaderboard
+    best_mae = min(row["mae"] for row in eligible)
+    close = [row for row in eligible if row["mae"] <= best_mae * (1 + mae_tolerance)]
+    return min(close, key=lambda row: (row["latency_ms"], row["mae"]))
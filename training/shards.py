@@ -0,0 +1,67 @@
+# weather_predictor/training/shards.py
+"""
+Modèles par ville pour train_model.py (--mode shards).
+
+Chaque ville ayant au moins MIN_ROWS observations exploitables reçoit sa propre petite forêt,
+entraînée sur ses seules lignes ; les villes sont réparties sur un pool de processus (un cœur
+par forêt). Les autres villes restent servies par le modèle global. Les modèles et leur index
+sont écrits dans data/models/shards/ (app/model_shards.py), où l'application les trouve.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sklearn.metrics import mean_absolute_error
+
+from app.features import attach_schema
+from app.model_shards import city_key
+from training.search import build_estimator
+
+MIN_ROWS = 200
+SHARD_ESTIMATOR = "random_forest"
+SHARD_PARAMS = {"n_estimators": 50, "min_samples_leaf": 2}
+HOLDOUT_FRACTION = 0.2  # Dernières observations de chaque ville, réservées au MAE
+
+
+def _fit_city(key, X, y, params):
+    """Entraîne et évalue la forêt d'une ville (exécuté dans le pool)."""
+    start = time.perf_counter()
+    split = int(len(X) * (1 - HOLDOUT_FRACTION))
+    model = build_estimator(SHARD_ESTIMATOR, params)
+    model.fit(X.iloc[:split], y.iloc[:split])
+    mae = float(mean_absolute_error(y.iloc[split:], model.predict(X.iloc[split:])))
+    # Modèle final sur toutes les lignes de la ville
+    model = build_estimator(SHARD_ESTIMATOR, params)
+    model.fit(X, y)
+    return key, attach_schema(model), {
+        'rows': len(X),
+        'mae': mae,
+        'estimator': SHARD_ESTIMATOR,
+        'fit_seconds': round(time.perf_counter() - start, 3),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def train_city_models(X, y, df, min_rows=MIN_ROWS, max_workers=None, params=None):
+    """
+    Entraîne un modèle par ville ayant au moins `min_rows` lignes. `X`, `y`, `df` viennent de
+    prepare_training_data. Retourne {clé de ville: (modèle, métadonnées)}.
+    """
+    order = df.sort_values(['date_prevision', 'id'] if 'id' in df else ['date_prevision']).index
+    keys = df.loc[order, 'ville'].map(city_key)
+    X, y = X.loc[order], y.loc[order]
+    groups = {key: index for key, index in keys.groupby(keys).groups.items() if len(index) >= min_rows}
+    print(f"{len(groups)} villes sur {keys.nunique()} ont au moins {min_rows} observations.")
+    if not groups:
+        return {}
+
+    params = dict(SHARD_PARAMS, **(params or {}))
+    max_workers = min(max_workers or os.cpu_count() or 1, len(groups))
+    shards = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fit_city, key, X.loc[index], y.loc[index], params) for key, index in groups.items()]
+        for future in futures:
+            key, model, meta = future.result()
+            shards[key] = (model, meta)
+            print(f"  {key:<24} {meta['rows']:>7} lignes  MAE {meta['mae']:.2f}°C  ({meta['fit_seconds']:.1f}s)")
+    return shards
@@ -0,0 +1,186 @@
+# weather_predictor/training/streaming.py
+"""
+Entraînement par tranches pour train_model.py (--mode stream), quand l'historique ne tient
+pas en mémoire.
+
+Les observations sont lues par tranches (base SQLite ou CSV) avec des types compacts : float32
+pour les mesures, catégorie pour la ville, int16 pour les features calendaires et l'horizon
+(calculé à la lecture, la date d'enregistrement n'est pas gardée). Chaque tranche
+reçoit quelques arbres de la forêt (warm_start) puis est libérée : la mémoire dépend de la taille
+d'une tranche et de la forêt, pas du nombre total de lignes. La forêt garde au plus N_ESTIMATORS
+arbres : au-delà de N_ESTIMATORS tranches, plusieurs tranches consécutives partagent leurs arbres,
+chacune n'en fournissant qu'un échantillon. La dernière tranche (ou le dernier groupe de tranches,
+les observations les plus récentes) sert d'abord de validation, puis reçoit ses arbres comme les
+autres.
+"""
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from app.features import API_COLUMNS, CALENDAR_COLUMNS, FEATURE_COLUMNS, HORIZON_COLUMN, calendar_features, forecast_horizons
+from app.observation_store import COLUMNS, RESOLVED_COLUMN
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHUNK_SIZE = 500_000
+N_ESTIMATORS = 100
+# Feuilles d'au moins 10 lignes : sur des millions de lignes, des arbres non bornés
+# occuperaient plusieurs Go ; l'erreur n'en souffre pas à cette échelle.
+MIN_SAMPLES_LEAF = 10
+
+# Types compacts d'une tranche (8 octets par mesure en float64 -> 4 en float32)
+COMPACT_DTYPES = {
+    'ville': 'category',
+    'temp_predite_modele': np.float32,
+    'temp_observee_api': np.float32,
+    'humidity_api': np.float32,
+    'pressure_api': np.float32,
+    'wind_speed_api': np.float32,
+}
+TARGET_COLUMN = 'temp_observee_api'
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus (Mo), ou None si indisponible sur la plateforme."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Ko sous Linux
+
+
+def compact_frame(chunk):
+    """Tranche (DataFrame ou liste de tuples (id, *COLUMNS)) -> DataFrame aux types compacts."""
+    if not isinstance(chunk, pd.DataFrame):
+        chunk = pd.DataFrame.from_records(chunk, columns=['id'] + COLUMNS)
+    if 'date_enregistrement' in chunk:
+        horizon = forecast_horizons(
+            pd.to_datetime(chunk['date_enregistrement'], errors='coerce').to_numpy(dtype='datetime64[D]'),
+            pd.to_datetime(chunk['date_prevision']).to_numpy(dtype='datetime64[D]'))
+        chunk = chunk.drop(columns=['date_enregistrement']).assign(**{HORIZON_COLUMN: horizon.astype(np.int16)})
+    else:
+        chunk = chunk.assign(**{HORIZON_COLUMN: np.int16(1)})
+    return chunk.astype({column: dtype for column, dtype in COMPACT_DTYPES.items() if column in chunk})
+
+
+def compact_features(frame):
+    """
+    (X, y) d'une tranche compacte : lignes incomplètes ou historiques, sans relevé réel (voir
+    prepare_training_data), retirées ; calendrier en int16.
+    """
+    frame = frame.dropna(subset=API_COLUMNS + [TARGET_COLUMN, 'date_prevision'])
+    if RESOLVED_COLUMN in frame:
+        frame = frame[frame[RESOLVED_COLUMN].notna()]
+    calendar = calendar_features(pd.to_datetime(frame['date_prevision']).to_numpy(dtype='datetime64[D]'))
+    X = frame[API_COLUMNS + [HORIZON_COLUMN]].assign(**{
+        column: calendar[:, i].astype(np.int16) for i, column in enumerate(CALENDAR_COLUMNS)
+    })[FEATURE_COLUMNS]
+    return X, frame[TARGET_COLUMN]
+
+
+def iter_store_chunks(store, chunk_size=CHUNK_SIZE, resolved_until=None):
+    """Tranches des observations résolues (jusqu'à la passe `resolved_until` si fournie)."""
+    resolved_range = (0, resolved_until) if resolved_until is not None else None
+    for rows in store.iter_chunks(chunk_size, resolved=True, resolved_range=resolved_range):
+        yield compact_frame(rows)
+
+
+def iter_csv_chunks(csv_path, chunk_size=CHUNK_SIZE):
+    """
+    Tranches d'un CSV au schéma historique, lues directement avec les types compacts. Seules
+    les lignes avec resolved_seq (export de la base) sont apprises ; sans cette colonne, toutes
+    sont historiques.
+    """
+    dtypes = dict(COMPACT_DTYPES, date_enregistrement=str, date_prevision=str)
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=dtypes):
+        if RESOLVED_COLUMN not in chunk:
+            chunk = chunk.iloc[:0]
+        yield compact_frame(chunk)
+
+
+def count_csv_rows(csv_path):
+    """Nombre de lignes de données d'un CSV (en-tête exclu), compté par blocs sans le parser."""
+    with open(csv_path, 'rb') as f:
+        lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+    return max(lines - 1, 0)
+
+
+def train_streaming(chunks, n_chunks, n_estimators=N_ESTIMATORS, min_samples_leaf=MIN_SAMPLES_LEAF):
+    """
+    Entraîne une forêt tranche par tranche. `chunks` est un itérable de DataFrames compacts,
+    `n_chunks` leur nombre attendu pour répartir les `n_estimators` arbres. S'il en arrive moins
+    (tranches vides, CSV aux lignes non résolues), le dernier groupe reçoit les arbres restants ;
+    s'il en arrive plus, les tranches en trop ne reçoivent pas d'arbres : compter au plus juste.
+
+    La forêt compte au plus `n_estimators` arbres, quel que soit le nombre de lignes. Au-delà de
+    `n_estimators` tranches, `group` tranches consécutives partagent leurs arbres : chacune n'en
+    fournit qu'un échantillon aléatoire de 1/group, si bien qu'un groupe occupe la mémoire d'une
+    tranche. Le dernier groupe (les observations les plus récentes) sert d'abord de validation.
+
+    Retourne (modèle, MAE sur le dernier groupe ou None, rapport) ; le rapport contient le
+    nombre de lignes lues et apprises, de tranches et de tranches par groupe, la durée et le pic
+    de mémoire.
+    """
+    group = max(1, math.ceil(n_chunks / n_estimators))
+    n_groups = max(1, math.ceil(n_chunks / group))
+    rng = np.random.default_rng(42)
+    model = RandomForestRegressor(n_estimators=0, warm_start=True, n_jobs=-1, random_state=42,
+                                  min_samples_leaf=min_samples_leaf)
+    start = time.perf_counter()
+    report = {'rows': 0, 'rows_fitted': 0, 'chunks': 0, 'chunks_per_group': group}
+    mae = None
+
+    def fit_group(index, X, y, last=False):
+        # Répartition exacte des arbres entre les groupes ; le dernier complète la forêt
+        fitted = len(getattr(model, 'estimators_', []))
+        share = (index + 1) * n_estimators // n_groups - index * n_estimators // n_groups
+        trees = n_estimators - fitted if last else min(share, n_estimators - fitted)
+        if trees > 0:
+            model.set_params(n_estimators=fitted + trees)
+            model.fit(X, y)
+            report['rows_fitted'] += len(X)
+
+    groups = 0
+    sample = []
+    pending = None  # Groupe précédent : le dernier sera évalué avant d'être appris
+
+    def close_group():
+        nonlocal groups, pending
+        if pending is not None:
+            fit_group(groups - 1, *pending)
+        pending = (pd.concat([X for X, _ in sample]), pd.concat([y for _, y in sample]))
+        sample.clear()
+        groups += 1
+
+    for frame in chunks:
+        X, y = compact_features(frame)
+        del frame
+        if len(X) == 0:
+            continue
+        report['rows'] += len(X)
+        report['chunks'] += 1
+        if group > 1:
+            keep = rng.random(len(X)) < 1 / group
+            X, y = X[keep], y[keep]
+        sample.append((X, y))
+        if len(sample) == group:
+            close_group()
+        print(f"Tranche {report['chunks']}/{n_chunks} : {len(X)} lignes, "
+              f"{len(getattr(model, 'estimators_', []))} arbres, pic mémoire {peak_rss_mb() or 0:.0f} Mo")
+    if sample:
+        close_group()
+
+    if pending is None:
+        return None, None, report
+    if hasattr(model, 'estimators_'):
+        mae = float(mean_absolute_error(pending[1], model.predict(pending[0])))
+    fit_group(groups - 1, *pending, last=True)
+
+    report['seconds'] = round(time.perf_counter() - start, 2)
+    report['peak_rss_mb'] = peak_rss_mb()
+    return model, mae, report
@@ -1,104 +1,427 @@
 # weather_predictor/training/train_model.py
 
 import pandas as pd
+import argparse
+import json
+import logging
 import os
 import joblib
 from datetime import datetime
-from sklearn.ensemble import RandomForestRegressor 
+from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 
+from app import telemetry
+from app.observation_store import open_default_store, OBSERVATIONS_DB, RESOLVED_COLUMN
+from app.model_artifacts import ModelArtifacts
+from app.model_shards import ShardIndex
+from app.features import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, add_calendar_features, add_horizon_feature, attach_schema
+from training.search import N_SPLITS, build_estimator, cross_validate, select_best
+from training import shards, streaming
+
+logger = logging.getLogger(__name__)
+
 # --- Chemins des fichiers et dossiers ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-OBSERVATIONS_FILE = os.path.join(BASE_DIR, 'data', 'observations', 'temperature_observations.csv')
 MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
+# Suivi de l'entraînement incrémental : dernière passe de résolution déjà apprise, modèle de base...
+TRAINING_STATE_FILE = os.path.join(MODELS_DIR, 'training_state.json')
 
 # S'assurer que le dossier des modèles existe
 os.makedirs(MODELS_DIR, exist_ok=True)
 
-def train_and_save_model():
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début du processus d'entraînement du modèle...")
-    
-    if not os.path.exists(OBSERVATIONS_FILE):
-        print(f"Erreur: Le fichier d'observations n'existe pas à {OBSERVATIONS_FILE}. Aucune donnée pour l'entraînement.")
-        return
+# Paramètres par défaut de l'entraînement incrémental
+TREES_PER_INCREMENT = 10     # Arbres ajoutés par passe incrémentale
+FULL_REFIT_EVERY = 10        # Réentraînement complet toutes les N passes incrémentales
+MAX_ESTIMATORS = 300         # Au-delà, la forêt est reconstruite de zéro
+# Régresseurs auxquels l'entraînement incrémental (warm_start) peut ajouter des arbres
+INCREMENTAL_ESTIMATORS = ('random_forest', 'extra_trees')
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def prepare_training_data(df):
+    """
+    Nettoie les observations et construit les features (X) et la cible (y).
+    Retourne (X, y, df nettoyé).
+    """
+    # Nettoyage et préparation des données
+    # On s'assure que toutes les colonnes qu'on va utiliser comme features ou cible existent
+    # et n'ont pas de valeurs manquantes.
+    required_columns = [
+        'temp_predite_modele', 'temp_observee_api',
+        'humidity_api', 'pressure_api', 'wind_speed_api',
+        'date_prevision'
+    ]
+
+    # Supprimer les lignes où des valeurs cruciales sont manquantes
+    df = df.dropna(subset=required_columns)
+    # Seules les observations étiquetées par un relevé réel sont apprises : les lignes des
+    # anciennes versions (prévision de l'API, ou prédiction affichée du modèle, en feature et
+    # prévision de l'API en « observation ») n'ont pas de resolved_seq. La base les exclut déjà
+    # (read(resolved=True)) ; ce filtre couvre les tables venues d'ailleurs (CSV).
+    if RESOLVED_COLUMN in df:
+        df = df[df[RESOLVED_COLUMN].notna()]
+
+    # --- Ingénierie des caractéristiques basée sur la date (app/features.py, comme à l'inférence) ---
+    dates = {'date_prevision': pd.to_datetime(df['date_prevision'])}
+    if 'date_enregistrement' in df:
+        dates['date_enregistrement'] = pd.to_datetime(df['date_enregistrement'], errors='coerce')
+    df = add_horizon_feature(add_calendar_features(df.assign(**dates)))
+
+    # Définir les features (X) et la cible (y)
+    X = df[FEATURE_COLUMNS]
+    y = df['temp_observee_api']    # Ce que nous voulons prédire (la température réelle)
+    return X, y, df
+
+
+def split_train_test(X, y):
+    # Séparer les données en ensembles d'entraînement et de test
+    if len(X) < 5:
+        print("Pas assez de données (moins de 5) pour diviser en ensembles d'entraînement/test. Entraînement sur toutes les données.")
+        return X, pd.DataFrame(), y, pd.Series()
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def fit_full(X_train, y_train, n_estimators=100):
+    """Entraîne une nouvelle forêt de zéro. warm_start permet d'y ajouter des arbres ensuite."""
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1, warm_start=True)
+    model.fit(X_train, y_train)
+    return model
+
+
+def fit_incremental(model, X_new, y_new, trees=TREES_PER_INCREMENT):
+    """
+    Ajoute `trees` arbres entraînés uniquement sur les nouvelles observations (warm_start) :
+    le coût dépend du nombre de nouvelles lignes, pas de tout l'historique.
+    """
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees)
+    model.fit(X_new, y_new)
+    return model
+
+
+def refit_increment(model, X_new, y_new, trees=TREES_PER_INCREMENT):
+    """
+    Remplace les `trees` derniers arbres de la forêt par autant d'arbres entraînés sur
+    X_new / y_new : une fois le MAE mesuré sur la part de test, l'incrément apprend aussi ces
+    lignes, qu'aucune passe incrémentale ne relira.
+    """
+    del model.estimators_[-trees:]
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_))
+    return fit_incremental(model, X_new, y_new, trees)
+
+
+def evaluate(model, X_test, y_test):
+    """MAE sur l'ensemble de test, ou None s'il est vide."""
+    if X_test.empty:
+        print("Aucun ensemble de test pour l'évaluation du MAE.")
+        return None
+    y_pred = model.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+    print(f"Erreur Absolue Moyenne (MAE) du modèle sur l'ensemble de test: {mae:.2f}°C")
+    return mae
+
+
+def save_model(model, mae=None, estimator=None):
+    """
+    Sauvegarde le modèle (compressé, sous un nom horodaté), l'active dans le manifeste
+    et applique la politique de rétention. Retourne son chemin.
+    """
+    model_path = ModelArtifacts(MODELS_DIR).save(attach_schema(model), mae=mae, estimator=estimator)
+    print(f"Modèle sauvegardé sous: {model_path}")
+    return model_path
+
+
+def search_model(X, y, df, n_splits=None, max_workers=None, max_latency_ms=None):
+    """
+    Validation croisée temporelle et recherche parallèle (training/search.py), puis
+    réentraînement du candidat retenu sur toutes les données.
+    Retourne (modèle, candidat retenu, classement).
+    """
+    # Ordre chronologique des prévisions (puis d'enregistrement) pour TimeSeriesSplit
+    order = df.sort_values(['date_prevision', 'id'] if 'id' in df else ['date_prevision']).index
+    X, y = X.loc[order], y.loc[order]
+    n_splits = n_splits or N_SPLITS
+
+    start = datetime.now()
+    leaderboard = cross_validate(X, y, n_splits=n_splits, max_workers=max_workers)
+    best = select_best(leaderboard, max_latency_ms=max_latency_ms)
+    best['selected'] = True
+    print(f"{len(leaderboard)} candidats x {n_splits} plis évalués en {(datetime.now() - start).total_seconds():.1f}s.")
+    for row in leaderboard[:5]:
+        print(f"  #{row['rank']} {row['estimator']} {row['params']} : MAE {row['mae']:.2f}°C, {row['latency_ms']:.2f} ms")
+    print(f"Retenu : {best['estimator']} {best['params']} (MAE {best['mae']:.2f}°C, {best['latency_ms']:.2f} ms)")
+
+    model = build_estimator(best['estimator'], best['params'], n_jobs=-1)
+    model.fit(X, y)
+    return model, best, leaderboard
+
+
+def save_leaderboard(model_path, leaderboard, n_rows, n_splits):
+    """Écrit le classement à côté du modèle (weather_model_<...>_leaderboard.json)."""
+    path = os.path.splitext(model_path)[0] + '_leaderboard.json'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_path': os.path.basename(model_path),
+            'created_at': _now(),
+            'rows': n_rows,
+            'n_splits': n_splits,
+            'candidates': leaderboard,
+        }, f, indent=2)
+    print(f"Classement sauvegardé sous: {path}")
+    return path
+
 
+def load_training_state():
+    if not os.path.exists(TRAINING_STATE_FILE):
+        return {}
     try:
-        df = pd.read_csv(OBSERVATIONS_FILE)
-        print(f"Nombre total d'observations lues: {len(df)}")
-        
-        # Nettoyage et préparation des données
-        # On s'assure que toutes les colonnes qu'on va utiliser comme features ou cible existent
-        # et n'ont pas de valeurs manquantes.
-        required_columns = [
-            'temp_predite_modele', 'temp_observee_api', 
-            'humidity_api', 'pressure_api', 'wind_speed_api', 
-            'date_prevision'
-        ]
-        
-        # Supprimer les lignes où des valeurs cruciales sont manquantes
-        df.dropna(subset=required_columns, inplace=True)
-        
-        if df.empty:
-            print("Le fichier d'observations est vide après nettoyage. Impossible d'entraîner le modèle.")
-            return
-
-        # --- Ingénierie des caractéristiques basée sur la date ---
-        df['date_prevision'] = pd.to_datetime(df['date_prevision'])
-        df['day_of_year'] = df['date_prevision'].dt.dayofyear 
-        df['month'] = df['date_prevision'].dt.month           
-        df['day_of_week'] = df['date_prevision'].dt.dayofweek 
-
-        # Définir les features (X) et la cible (y)
-        # NOUVEAU : Inclure les nouvelles colonnes d'humidité, pression, vent dans les features
-        X = df[[
-            'temp_predite_modele', 
-            'humidity_api', 
-            'pressure_api', 
-            'wind_speed_api', 
-            'day_of_year', 
-            'month', 
-            'day_of_week'
-        ]] 
-        y = df['temp_observee_api']    # Ce que nous voulons prédire (la température réelle)
-
-        # Séparer les données en ensembles d'entraînement et de test
-        if len(df) < 5: 
-            print("Pas assez de données (moins de 5) pour diviser en ensembles d'entraînement/test. Entraînement sur toutes les données.")
-            X_train, y_train = X, y
-            X_test, y_test = pd.DataFrame(), pd.Series() 
+        with open(TRAINING_STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"État d'entraînement illisible ({e}) : un réentraînement complet sera effectué.")
+        return {}
+
+
+def save_training_state(state):
+    tmp_path = TRAINING_STATE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, TRAINING_STATE_FILE)
+
+
+def _full_refit_reason(state, trees_per_increment, full_refit_every, max_estimators):
+    """Raison d'un retour au réentraînement complet en mode incrémental, ou None."""
+    model_path = state.get('model_path')
+    if not model_path or not os.path.exists(model_path):
+        return "aucun modèle de base"
+    if 'resolved_mark' not in state:
+        return "repère d'entraînement antérieur à la résolution des observations"
+    if state.get('feature_schema', 1) != FEATURE_SCHEMA_VERSION:
+        return "schéma de features modifié"
+    if state.get('estimator', 'random_forest') not in INCREMENTAL_ESTIMATORS:
+        return f"modèle de base {state['estimator']} non incrémental"
+    if state.get('incremental_runs', 0) >= full_refit_every:
+        return f"{full_refit_every} passes incrémentales depuis le dernier réentraînement complet"
+    if state.get('n_estimators', 0) + trees_per_increment > max_estimators:
+        return f"plus de {max_estimators} arbres"
+    return None
+
+
+def _save_run(model, mae, estimator, mode, state, resolved_mark, **extra):
+    """Sauvegarde le modèle et l'état d'entraînement d'une passe. Retourne le chemin du modèle."""
+    model_path = save_model(model, mae=mae, estimator=estimator)
+    save_training_state({
+        'model_path': model_path,
+        'estimator': estimator,
+        'resolved_mark': resolved_mark,
+        'n_estimators': len(getattr(model, 'estimators_', [])),
+        'incremental_runs': state.get('incremental_runs', 0) + 1 if mode == "incremental" else 0,
+        'last_full_refit': state.get('last_full_refit') if mode == "incremental" else _now(),
+        'last_run': _now(),
+        'last_mode': mode,
+        'mae': mae,
+        'feature_schema': FEATURE_SCHEMA_VERSION,
+        **extra,
+    })
+    return model_path
+
+
+def train_streaming_model(state, chunk_size=streaming.CHUNK_SIZE, csv_path=None):
+    """
+    Entraînement par tranches (training/streaming.py) : les observations ne sont jamais
+    chargées en entier. Source : la base d'observations, ou `csv_path` s'il est fourni.
+    """
+    store = None
+    # Depuis un CSV, les passes de résolution de la base ne sont pas connues : le repère est conservé
+    resolved_mark = state.get('resolved_mark', 0)
+    if csv_path:
+        n_rows = streaming.count_csv_rows(csv_path)
+        chunks = streaming.iter_csv_chunks(csv_path, chunk_size)
+        print(f"Lecture par tranches de {csv_path} ({n_rows} lignes, {chunk_size} par tranche).")
+    else:
+        store = open_default_store()
+        resolved_mark = store.max_resolved_seq()
+        # Exactement les lignes que produira iter_store_chunks : les arbres sont répartis d'après ce nombre
+        n_rows = store.count(resolved=True, resolved_range=(0, resolved_mark))
+        chunks = streaming.iter_store_chunks(store, chunk_size, resolved_mark)
+        print(f"Lecture par tranches de la base ({n_rows} observations résolues, {chunk_size} par tranche).")
+    try:
+        with telemetry.span("train_stage", stage="fit", mode="stream"):
+            model, mae, report = streaming.train_streaming(chunks, n_chunks=max(1, -(-n_rows // chunk_size)))
+    finally:
+        if store is not None:
+            store.close()
+
+    if model is None:
+        print("Aucune observation exploitable. Impossible d'entraîner le modèle.")
+        return None
+    print(f"Modèle entraîné par tranches : {report['rows']} lignes ({report['rows_fitted']} apprises), "
+          f"{report['chunks']} tranches, {len(model.estimators_)} arbres en {report['seconds']}s.")
+    if mae is not None:
+        print(f"MAE sur la dernière tranche : {mae:.2f}°C | pic mémoire : {report['peak_rss_mb'] or 0:.0f} Mo")
+    else:
+        print(f"Une seule tranche : pas de MAE | pic mémoire : {report['peak_rss_mb'] or 0:.0f} Mo")
+
+    with telemetry.span("train_stage", stage="save", mode="stream"):
+        return _save_run(model, mae, 'random_forest', "stream", state, resolved_mark,
+                         rows=report['rows'], peak_rss_mb=report['peak_rss_mb'])
+
+
+def train_shard_models(min_rows=shards.MIN_ROWS, max_workers=None):
+    """
+    Entraîne un modèle par ville (training/shards.py) et remplace l'ensemble des modèles par
+    ville. Le modèle global et l'état d'entraînement ne sont pas modifiés.
+    Retourne l'index des modèles par ville, ou None.
+    """
+    store = open_default_store()
+    df = store.read(with_id=True, resolved=True)
+    store.close()
+    X, y, df = prepare_training_data(df)
+    if df.empty:
+        print(f"La base d'observations ({OBSERVATIONS_DB}) est vide après nettoyage. Impossible d'entraîner le modèle.")
+        return None
+
+    start = datetime.now()
+    with telemetry.span("train_stage", stage="fit", mode="shards"):
+        models = shards.train_city_models(X, y, df, min_rows, max_workers)
+    with telemetry.span("train_stage", stage="save", mode="shards"):
+        index = ShardIndex().save(models)
+    print(f"{len(models)} modèles par ville entraînés en {(datetime.now() - start).total_seconds():.1f}s "
+          f"et sauvegardés sous: {os.path.dirname(ShardIndex().index_path)}")
+    return index
+
+
+def train_and_save_model(mode="full", trees_per_increment=TREES_PER_INCREMENT,
+                         full_refit_every=FULL_REFIT_EVERY, max_estimators=MAX_ESTIMATORS,
+                         n_splits=None, max_workers=None, max_latency_ms=None,
+                         chunk_size=streaming.CHUNK_SIZE, csv_path=None, min_rows=shards.MIN_ROWS):
+    """
+    Entraîne et sauvegarde un modèle. Retourne le chemin du modèle sauvegardé, ou None.
+
+    - mode="full" : relit toutes les observations et entraîne une forêt de zéro.
+    - mode="incremental" : ne lit que les observations résolues (étiquetées par un relevé)
+      depuis le dernier entraînement (resolved_seq > resolved_mark) et leur consacre quelques
+      nouveaux arbres. Retour automatique au mode complet sans modèle de base, toutes les
+      `full_refit_every` passes, ou quand la forêt dépasserait `max_estimators` arbres.
+    - mode="search" : relit toutes les observations, compare forêts et HistGradientBoosting par
+      validation croisée temporelle (`n_splits` plis, `max_workers` processus) et retient le
+      plus rapide des candidats proches du meilleur MAE (sous `max_latency_ms` si fourni) ;
+      le classement est sauvegardé à côté du modèle.
+    - mode="stream" : lit les observations (ou `csv_path`) par tranches de `chunk_size` lignes
+      aux types compacts et ajoute des arbres tranche par tranche, pour les historiques qui ne
+      tiennent pas en mémoire ; le pic de mémoire est enregistré avec le MAE.
+    - mode="shards" : voir train_shard_models (un modèle par ville, le modèle global est conservé).
+    """
+    print(f"[{_now()}] Début du processus d'entraînement du modèle...")
+
+    try:
+        state = load_training_state()
+        if mode == "stream":
+            model_path = train_streaming_model(state, chunk_size, csv_path)
+            print(f"[{_now()}] Processus d'entraînement terminé.")
+            return model_path
+        if mode == "shards":
+            train_shard_models(min_rows, max_workers)
+            print(f"[{_now()}] Processus d'entraînement terminé.")
+            return state.get('model_path')
+        if mode == "incremental":
+            reason = _full_refit_reason(state, trees_per_increment, full_refit_every, max_estimators)
+            if reason:
+                print(f"Réentraînement complet ({reason}).")
+                mode = "full"
+
+        # Repère par passe de résolution, pas par id : une observation est insérée sans étiquette
+        # et résolue plus tard, après des lignes d'id supérieur déjà apprises
+        store = open_default_store()
+        new_resolved_mark = store.max_resolved_seq()
+        resolved_mark = state.get('resolved_mark', 0) if mode == "incremental" else 0
+        with telemetry.span("train_stage", stage="read", mode=mode):
+            df = store.read(with_id=True, resolved=True, resolved_range=(resolved_mark, new_resolved_mark))
+        store.close()
+        if mode == "incremental":
+            print(f"Observations résolues depuis la passe {resolved_mark}: {len(df)}")
         else:
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        print(f"Taille de l'ensemble d'entraînement: {len(X_train)} | Taille de l'ensemble de test: {len(X_test)}")
-        print(f"Features utilisées: {X.columns.tolist()}") 
-
-        # --- Entraînement du modèle ---
-        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1) 
-        model.fit(X_train, y_train)
-        print("Modèle entraîné (RandomForestRegressor).")
-
-        # --- Évaluation du modèle ---
-        if not X_test.empty:
-            y_pred = model.predict(X_test)
-            mae = mean_absolute_error(y_test, y_pred)
-            print(f"Erreur Absolue Moyenne (MAE) du modèle sur l'ensemble de test: {mae:.2f}°C")
+            print(f"Nombre total d'observations lues: {len(df)}")
+
+        with telemetry.span("train_stage", stage="prepare", mode=mode):
+            X, y, df = prepare_training_data(df)
+
+        if df.empty:
+            if mode == "incremental":
+                print("Aucune nouvelle observation exploitable. Le modèle actuel est conservé.")
+            else:
+                print(f"La base d'observations ({OBSERVATIONS_DB}) est vide après nettoyage. Impossible d'entraîner le modèle.")
+            return None
+
+        if mode == "search" and len(X) < 2 * ((n_splits or N_SPLITS) + 1):
+            print(f"Pas assez de données ({len(X)} lignes) pour la validation croisée. Réentraînement complet.")
+            mode = "full"
+
+        # --- Entraînement et évaluation du modèle ---
+        leaderboard = None
+        if mode == "search":
+            print(f"Features utilisées: {X.columns.tolist()}")
+            with telemetry.span("train_stage", stage="fit", mode=mode):
+                model, best, leaderboard = search_model(X, y, df, n_splits, max_workers, max_latency_ms)
+            estimator, mae = best['estimator'], best['mae']
         else:
-            print("Aucun ensemble de test pour l'évaluation du MAE.")
+            X_train, X_test, y_train, y_test = split_train_test(X, y)
+            print(f"Taille de l'ensemble d'entraînement: {len(X_train)} | Taille de l'ensemble de test: {len(X_test)}")
+            print(f"Features utilisées: {X.columns.tolist()}")
+            with telemetry.span("train_stage", stage="fit", mode=mode):
+                if mode == "incremental":
+                    model = joblib.load(state['model_path'])
+                    fit_incremental(model, X_train, y_train, trees_per_increment)
+                    estimator = state.get('estimator', 'random_forest')
+                else:
+                    model = fit_full(X_train, y_train)
+                    estimator = 'random_forest'
+                    print("Modèle entraîné (RandomForestRegressor).")
+            with telemetry.span("train_stage", stage="evaluate", mode=mode):
+                mae = evaluate(model, X_test, y_test)
+            if mode == "incremental":
+                if not X_test.empty:
+                    with telemetry.span("train_stage", stage="refit", mode=mode):
+                        refit_increment(model, X, y, trees_per_increment)
+                print(f"Modèle mis à jour (+{trees_per_increment} arbres sur {len(X)} nouvelles lignes, "
+                      f"{len(model.estimators_)} au total).")
 
         # --- Sauvegarde du modèle ---
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        model_filename = f'weather_model_{timestamp}.pkl'
-        model_path = os.path.join(MODELS_DIR, model_filename)
-        
-        joblib.dump(model, model_path)
-        print(f"Modèle sauvegardé sous: {model_path}")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processus d'entraînement terminé.")
-
-    except pd.errors.EmptyDataError:
-        print(f"Le fichier {OBSERVATIONS_FILE} est vide. Aucune donnée pour l'entraînement.")
+        with telemetry.span("train_stage", stage="save", mode=mode):
+            model_path = _save_run(model, mae, estimator, mode, state, new_resolved_mark)
+            if leaderboard is not None:
+                save_leaderboard(model_path, leaderboard, len(X), n_splits or N_SPLITS)
+        print(f"[{_now()}] Processus d'entraînement terminé.")
+        return model_path
+
     except Exception as e:
-        print(f"Une erreur est survenue lors de l'entraînement du modèle : {e}")
+        logger.exception("Une erreur est survenue lors de l'entraînement du modèle : %s", e)
+        return None
+
 
 if __name__ == "__main__":
-    train_and_save_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entraînement du modèle de prédiction.")
+    parser.add_argument("--mode", choices=["full", "incremental", "search", "stream", "shards"], default="full",
+                        help="full : tout réentraîner ; incremental : seulement les nouvelles observations ; "
+                             "search : validation croisée et recherche d'hyperparamètres ; "
+                             "stream : lecture par tranches, pour les historiques plus grands que la mémoire ; "
+                             "shards : un modèle par ville, en parallèle")
+    parser.add_argument("--trees-per-increment", type=int, default=TREES_PER_INCREMENT)
+    parser.add_argument("--full-refit-every", type=int, default=FULL_REFIT_EVERY)
+    parser.add_argument("--max-estimators", type=int, default=MAX_ESTIMATORS)
+    parser.add_argument("--folds", type=int, default=None, help="search : plis de la validation croisée temporelle")
+    parser.add_argument("--max-workers", type=int, default=None,
+                        help="search, shards : processus (défaut : tous les cœurs)")
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="search : latence maximale d'une prédiction d'une ligne")
+    parser.add_argument("--chunk-size", type=int, default=streaming.CHUNK_SIZE, help="stream : lignes par tranche")
+    parser.add_argument("--csv", default=None, help="stream : lire ce CSV au lieu de la base d'observations")
+    parser.add_argument("--min-rows", type=int, default=shards.MIN_ROWS,
+                        help="shards : observations minimales pour qu'une ville ait son modèle")
+    args = parser.parse_args()
+    telemetry.configure_from_env()
+    train_and_save_model(args.mode, args.trees_per_increment, args.full_refit_every, args.max_estimators,
+                         args.folds, args.max_workers, args.max_latency_ms, args.chunk_size, args.csv, args.min_rows)